@@ -0,0 +1,263 @@
+"""Scripted players for soak tests and load generation.
+
+main.py --autopilot hands the controls to a bot, headless or on screen:
+
+    python main.py --headless --autopilot --autopilot-runs 50 --event-log soak.ndjson --metrics
+
+Each frame a policy looks at the game and returns an Intent: which way to
+move, whether to press SPACE and for which charge stage, and whether to
+drop an egg bomb (Q) or set off the golden orbs (E). Pilot turns intents
+into the KEYDOWN/KEYUP events and held keys a player would produce, and
+main.py's read_input passes those on like keyboard input. The bot therefore
+goes through the same event handlers and Player.update as a person at the
+keys, and --record captures its runs for --replay.
+
+--autopilot-policy picks a policy from POLICIES by name, or loads any class
+given as module:attribute. A policy has decide(game, dt) -> Intent, where
+game is the main module, to be read and never written. Policies draw from
+their own random generator, so the game's RNG sees the same calls it would
+with a human playing and recorded runs replay exactly.
+"""
+import importlib
+import math
+import random
+
+import pygame
+
+class Intent:
+    def __init__(self, move_x=0, move_y=0, fire_stage=None, bomb=False, burst=False):
+        self.move_x = move_x          # -1, 0 or 1
+        self.move_y = move_y
+        self.fire_stage = fire_stage  # None, or the charge stage to shoot at
+        self.bomb = bomb
+        self.burst = burst
+
+IDLE = Intent()
+
+CHARGE_MARGIN = 0.03  # seconds SPACE stays down past the stage it aims for
+
+class Pilot:
+    # Presses keys for a policy. A charge shot holds SPACE over as many
+    # frames as its stage takes; other intents are ignored until it is out.
+    def __init__(self, policy):
+        self.policy = policy
+        self.held = set()
+        self.fire_hold = None  # Seconds until SPACE is let go, while charging
+
+    def frame(self, game, dt):
+        # This frame's key events as (type, key) pairs, and the keys held
+        intent = self.policy.decide(game, dt)
+        held = set()
+        if intent.move_x:
+            held.add(pygame.K_RIGHT if intent.move_x > 0 else pygame.K_LEFT)
+        if intent.move_y:
+            held.add(pygame.K_DOWN if intent.move_y > 0 else pygame.K_UP)
+        # Released keys first, so a turn sets the facing from the new key
+        events = [(pygame.KEYUP, key) for key in sorted(self.held - held - {pygame.K_SPACE})]
+        events += [(pygame.KEYDOWN, key) for key in sorted(held - self.held)]
+
+        if self.fire_hold is not None:
+            self.fire_hold -= dt
+            if self.fire_hold > 0:
+                held.add(pygame.K_SPACE)
+            else:
+                events.append((pygame.KEYUP, pygame.K_SPACE))
+                self.fire_hold = None
+        elif intent.fire_stage is not None and self.can_fire(game):
+            events.append((pygame.KEYDOWN, pygame.K_SPACE))
+            if intent.fire_stage == 0:
+                events.append((pygame.KEYUP, pygame.K_SPACE))
+            else:
+                stage_time = game.CHARGE_STAGE_1 if intent.fire_stage == 1 else game.CHARGE_STAGE_2
+                self.fire_hold = game.CHARGE_INPUT_THRESHOLD + stage_time + CHARGE_MARGIN
+                held.add(pygame.K_SPACE)
+        else:
+            for wanted, key in ((intent.bomb, pygame.K_q), (intent.burst, pygame.K_e)):
+                if wanted:
+                    events += [(pygame.KEYDOWN, key), (pygame.KEYUP, key)]
+
+        self.held = held
+        return events, held
+
+    @staticmethod
+    def can_fire(game):
+        player = game.player
+        return not game.game_over and not (player.firing or player.charging or player.pending_fire)
+
+def sign(value, dead_zone=0.0):
+    if value > dead_zone:
+        return 1
+    if value < -dead_zone:
+        return -1
+    return 0
+
+# Charge stage each enemy type needs to go down to a bullet
+STAGE_NEEDED = {"chicken": 0, "goose": 1, "crab": 2}
+
+KITE_RADIUS = 80          # Game pixels; enemies closer than this push the bot away
+SAFE_RADIUS = 100         # Items are only fetched with no enemy this close
+SHOT_RANGE = (50, 170)    # Horizontal distance the bot likes to shoot from
+CHARGE_CLEARANCE = 70     # No charge shots with any other enemy this close
+DODGE_MARGIN = 20         # Added to an enemy's radius for the width of its charge lane
+WALL_MARGIN = 24
+BOMB_RADIUS = 60          # A little inside the egg bomb's reach
+BOMB_CROWD = 3
+BURST_RADIUS = 120
+BURST_CROWD = 6
+BUTTON_COOLDOWN = 0.5     # seconds between bombs or bursts
+WANDER_INTERVAL = (1.0, 2.5)
+
+class KitePolicy:
+    # Backs away from whatever is close and sidesteps charges, lines up
+    # level with the nearest enemy to shoot it with the stage it needs,
+    # fetches items when nothing is near, and bombs or bursts out of crowds
+    def __init__(self):
+        self.rng = random.Random()
+        self.wander = (0.0, 0.0)
+        self.wander_timer = 0.0
+        self.button_timer = 0.0
+
+    def decide(self, game, dt):
+        if game.game_over:
+            return IDLE
+        self.button_timer -= dt
+        player = game.player
+        px, py, _ = player.get_circle()
+        view_left, view_top = game.camera_x, game.camera_y
+        view_right, view_bottom = view_left + game.VIEW_WIDTH, view_top + game.VIEW_HEIGHT
+
+        enemies = []  # (enemy, x, y, radius, distance) for those in view
+        for enemy in game.chickens + game.geese + game.crabs:
+            ex, ey, er = enemy.get_circle()
+            if view_left <= ex < view_right and view_top <= ey < view_bottom:
+                enemies.append((enemy, ex, ey, er, math.hypot(ex - px, ey - py)))
+        enemies.sort(key=lambda entry: entry[4])
+
+        fx = fy = 0.0
+        for enemy, ex, ey, er, distance in enemies:
+            if 0 < distance < KITE_RADIUS + er:
+                weight = (KITE_RADIUS + er - distance) / KITE_RADIUS
+                fx += (px - ex) / distance * weight * 2
+                fy += (py - ey) / distance * weight * 2
+            if enemy.type != "chicken" and (enemy.is_winding_up or enemy.is_charging):
+                # Step out of the lane it is about to run, or running, along
+                _, _, duration, speed, _ = game.charge_settings(enemy)
+                along = (px - ex) * enemy.charge_dx + (py - ey) * enemy.charge_dy
+                across = (px - ex) * -enemy.charge_dy + (py - ey) * enemy.charge_dx
+                if 0 < along < duration * speed + er and abs(across) < er + DODGE_MARGIN:
+                    side = 1 if across >= 0 else -1
+                    fx += -enemy.charge_dy * side * 3
+                    fy += enemy.charge_dx * side * 3
+
+        fire_stage = None
+        move_x_override = 0
+        if enemies:
+            target, ex, ey, er, distance = enemies[0]
+            stage = STAGE_NEEDED[target.type]
+            lane_y = player.y + game.FRAME_HITBOXES[game.fireball_variants[stage][0]].cy
+            dx = ex - px
+            # Level up with the target, and keep it at shooting distance
+            fy += max(-1.0, min(1.0, (ey - lane_y) / 16))
+            if abs(dx) < SHOT_RANGE[0]:
+                fx -= sign(dx) * 0.8
+            elif abs(dx) > SHOT_RANGE[1]:
+                fx += sign(dx) * 0.8
+            clear = len(enemies) < 2 or enemies[1][4] > CHARGE_CLEARANCE
+            lined_up = abs(ey - lane_y) < max(6, er * 0.7)
+            if lined_up and (stage == 0 or clear) and Pilot.can_fire(game):
+                fire_stage = stage
+                move_x_override = sign(dx)  # Face it as the shot goes off
+
+        if not enemies or enemies[0][4] > SAFE_RADIUS:
+            item = self.wanted_item(game, px, py)
+            if item is not None:
+                ix, iy = item
+                distance = math.hypot(ix - px, iy - py) or 1.0
+                fx += (ix - px) / distance * 1.5
+                fy += (iy - py) / distance * 1.5
+            elif not enemies:
+                self.wander_timer -= dt
+                if self.wander_timer <= 0:
+                    angle = self.rng.uniform(0.0, 2 * math.pi)
+                    self.wander = (math.cos(angle), math.sin(angle))
+                    self.wander_timer = self.rng.uniform(*WANDER_INTERVAL)
+                fx += self.wander[0]
+                fy += self.wander[1]
+
+        # Keep off the arena edges, where kiting runs out of room
+        if px < WALL_MARGIN:
+            fx += 1.5
+        elif px > game.ARENA_WIDTH - WALL_MARGIN:
+            fx -= 1.5
+        if py < WALL_MARGIN:
+            fy += 1.5
+        elif py > game.ARENA_HEIGHT - WALL_MARGIN:
+            fy -= 1.5
+
+        move_x = move_x_override or sign(fx, 0.3)
+        move_y = sign(fy, 0.3)
+
+        bomb = burst = False
+        if self.button_timer <= 0:
+            near_bomb = sum(1 for entry in enemies if entry[4] < BOMB_RADIUS and entry[0].type != "crab")
+            near_burst = sum(1 for entry in enemies if entry[4] < BURST_RADIUS)
+            low = game.player_health == 1
+            if game.egg_inventory > 0 and near_bomb >= (2 if low else BOMB_CROWD):
+                bomb = True
+            elif game.golden_power > 0 and near_burst >= (3 if low else BURST_CROWD):
+                burst = True
+            if bomb or burst:
+                self.button_timer = BUTTON_COOLDOWN
+        return Intent(move_x, move_y, fire_stage, bomb, burst)
+
+    @staticmethod
+    def wanted_item(game, px, py):
+        # Centre of the nearest item worth the walk, or None
+        best = None
+        best_distance = math.inf
+        for item in game.items:
+            if item.kind == "heart" and game.player_health >= game.MAX_HEALTH:
+                continue
+            ix = item.x + item.frame.get_width() / 2
+            iy = item.y + item.frame.get_height() / 2
+            distance = math.hypot(ix - px, iy - py)
+            if distance < best_distance:
+                best = (ix, iy)
+                best_distance = distance
+        return best
+
+class RandomPolicy:
+    # Mashes the controls: a random intent held for a random short while.
+    # Finds the input combinations a sensible player never tries.
+    def __init__(self):
+        self.rng = random.Random()
+        self.intent = IDLE
+        self.timer = 0.0
+
+    def decide(self, game, dt):
+        self.timer -= dt
+        if self.timer > 0:
+            # Buttons are pressed once, on the frame the intent is drawn
+            return Intent(self.intent.move_x, self.intent.move_y)
+        rng = self.rng
+        self.timer = rng.uniform(0.05, 0.6)
+        self.intent = Intent(rng.randint(-1, 1), rng.randint(-1, 1),
+                             rng.choice((None, None, 0, 1, 2)),
+                             rng.random() < 0.05, rng.random() < 0.03)
+        return self.intent
+
+POLICIES = {
+    "kite": KitePolicy,
+    "random": RandomPolicy,
+}
+
+def load_policy(spec):
+    # A name from POLICIES, or module:attribute for a policy class elsewhere
+    if ":" in spec:
+        module_name, _, attribute = spec.partition(":")
+        policy_class = getattr(importlib.import_module(module_name), attribute)
+    elif spec in POLICIES:
+        policy_class = POLICIES[spec]
+    else:
+        raise ValueError("Unknown autopilot policy: " + spec)
+    return policy_class()
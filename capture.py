@@ -0,0 +1,173 @@
+"""Raw frame capture for attract loops and bug-report footage.
+
+main.py --capture PATH writes every frame of game_surface as row-major RGB
+(width * height * 3 bytes, no header) to a file, a FIFO or "-" for stdout,
+so an external encoder can take it from there:
+
+    PYGAME_HIDE_SUPPORT_PROMPT=1 python main.py --headless --replay run.replay --capture - |
+        ffmpeg -f rawvideo -pix_fmt rgb24 -s 400x300 -r 60 -i - footage.mp4
+
+main.py --capture-ring PATH instead writes into a memory-mapped ring of
+RING_SLOTS frames that a reader drains at its own pace; the game waits when
+the ring is full. If the reader takes no frame for RING_STALL_TIMEOUT (it
+never attached, or it died), the ring is closed and the game stops, as it
+does when a --capture encoder goes away. Drain one to stdout with:
+
+    python capture.py PATH
+
+Pixels are read through a surfarray view of the surface, so the only copy per
+frame is the one into the output buffer, which for the ring is the mapped
+file itself. Needs numpy.
+"""
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy
+import pygame
+
+RING_SLOTS = 8
+RING_MAGIC = b"EGGRING1"
+RING_POLL_INTERVAL = 0.0005  # seconds between checks while waiting on the other side
+RING_STALL_TIMEOUT = 10.0    # seconds the writer waits on a full ring without the reader moving
+
+# magic, width, height, slots, closed flag, frames written, frames read
+RING_HEADER = struct.Struct("<8sIIIIQQ")
+RING_HEADER_SIZE = 64
+RING_CLOSED_OFFSET = 20
+RING_WRITTEN_OFFSET = 24
+RING_READ_OFFSET = 32
+FLAG = struct.Struct("<I")
+COUNTER = struct.Struct("<Q")
+
+def copy_rgb(surface, out):
+    # pixels3d is a (width, height, 3) view straight into the surface, so the
+    # transposing copy into out is the only one. The view locks the surface
+    # until it is released.
+    pixels = pygame.surfarray.pixels3d(surface)
+    numpy.copyto(out, pixels.transpose(1, 0, 2))
+    del pixels
+
+class StreamCapture:
+    def __init__(self, path, size):
+        width, height = size
+        self.frame = numpy.empty((height, width, 3), numpy.uint8)
+        self.frames = 0
+        self.closed = False
+        if path == "-":
+            # Keep the real stdout for frames and point fd 1 at stderr, so
+            # stray prints cannot corrupt the stream
+            sys.stdout.flush()
+            self.fd = os.dup(1)
+            os.dup2(2, 1)
+        else:
+            self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    def write(self, surface):
+        if self.closed:
+            return
+        copy_rgb(surface, self.frame)
+        view = memoryview(self.frame).cast("B")
+        try:
+            while view:
+                view = view[os.write(self.fd, view):]
+        except BrokenPipeError:
+            # The encoder went away; the game checks closed and stops
+            self.close()
+            return
+        self.frames += 1
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            os.close(self.fd)
+
+class RingCapture:
+    def __init__(self, path, size, slots=RING_SLOTS):
+        width, height = size
+        self.slots = slots
+        self.frames = 0
+        self.closed = False
+        frame_size = width * height * 3
+        with open(path, "w+b") as f:
+            f.truncate(RING_HEADER_SIZE + slots * frame_size)
+            self.map = mmap.mmap(f.fileno(), 0)
+        RING_HEADER.pack_into(self.map, 0, RING_MAGIC, width, height, slots, 0, 0, 0)
+        self.ring = numpy.frombuffer(self.map, numpy.uint8, slots * frame_size, RING_HEADER_SIZE)
+        self.ring = self.ring.reshape(slots, height, width, 3)
+
+    def write(self, surface):
+        # Wait for the reader to free a slot, then publish the frame by
+        # bumping the written counter only after its pixels are in place
+        if self.closed:
+            return
+        read = COUNTER.unpack_from(self.map, RING_READ_OFFSET)[0]
+        deadline = time.monotonic() + RING_STALL_TIMEOUT
+        while self.frames - read >= self.slots:
+            if time.monotonic() > deadline:
+                # No reader, or a dead one; the game checks closed and stops
+                self.close()
+                return
+            time.sleep(RING_POLL_INTERVAL)
+            now_read = COUNTER.unpack_from(self.map, RING_READ_OFFSET)[0]
+            if now_read != read:
+                read = now_read
+                deadline = time.monotonic() + RING_STALL_TIMEOUT
+        copy_rgb(surface, self.ring[self.frames % self.slots])
+        self.frames += 1
+        COUNTER.pack_into(self.map, RING_WRITTEN_OFFSET, self.frames)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            FLAG.pack_into(self.map, RING_CLOSED_OFFSET, 1)
+            del self.ring
+            self.map.close()
+
+class RingReader:
+    def __init__(self, path):
+        with open(path, "r+b") as f:
+            self.map = mmap.mmap(f.fileno(), 0)
+        magic, width, height, slots, _, _, _ = RING_HEADER.unpack_from(self.map, 0)
+        if magic != RING_MAGIC:
+            raise ValueError("Not a capture ring: " + path)
+        self.size = (width, height)
+        self.slots = slots
+        self.ring = numpy.frombuffer(self.map, numpy.uint8, slots * width * height * 3, RING_HEADER_SIZE)
+        self.ring = self.ring.reshape(slots, height, width, 3)
+
+    def frames(self):
+        # Yields each frame as a view into the ring; the slot is handed back
+        # to the writer once the caller asks for the next one
+        read = COUNTER.unpack_from(self.map, RING_READ_OFFSET)[0]
+        while True:
+            _, _, _, _, closed, written, _ = RING_HEADER.unpack_from(self.map, 0)
+            if read < written:
+                yield self.ring[read % self.slots]
+                read += 1
+                COUNTER.pack_into(self.map, RING_READ_OFFSET, read)
+            elif closed:
+                return
+            else:
+                time.sleep(RING_POLL_INTERVAL)
+
+    def close(self):
+        del self.ring
+        self.map.close()
+
+def drain_ring(path, out):
+    reader = RingReader(path)
+    frame = None
+    try:
+        for frame in reader.frames():
+            out.write(frame.data)
+        frame = None  # Release the last view so the map can close
+    finally:
+        reader.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python capture.py RING_PATH > frames.rgb")
+    drain_ring(sys.argv[1], sys.stdout.buffer)
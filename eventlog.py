@@ -0,0 +1,111 @@
+"""Gameplay event log for per-cabinet statistics.
+
+main.py --event-log PATH appends one compact JSON object per line:
+
+    {"t":1760870000.123,"sim":42.5,"run":3,"ev":"kill","enemy":"goose","weapon":"bullet","stage":1}
+
+t is wall-clock time, sim the game clock and run counts runs since the game
+started. Every run ends with a "run_end" summary. main.py lists the events.
+
+The game never waits on the file. log() only appends a tuple to a deque; a
+writer thread wakes every FLUSH_INTERVAL, formats whatever has piled up and
+writes it in one call. Past MAX_BYTES the file is rotated the way
+logging.handlers.RotatingFileHandler does it: PATH moves to PATH.1, PATH.1
+to PATH.2 and so on, keeping BACKUPS old files. If the writer falls
+MAX_PENDING records behind (a stalled disk, say), new records are dropped
+and counted instead of piling up, and a "dropped" record says how many.
+"""
+import collections
+import json
+import os
+import threading
+import time
+
+FLUSH_INTERVAL = 0.5        # seconds
+MAX_BYTES = 4 * 1024 * 1024
+BACKUPS = 5
+MAX_PENDING = 65536         # records
+
+class EventLog:
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.pending = collections.deque()  # append and popleft are safe across threads
+        self.dropped = 0         # Counted by the game thread
+        self.failed = 0          # Counted by the writer: records a write lost
+        self.reported_drops = 0
+        self.written = 0
+        self.file = open(path, "ab")
+        self.size = self.file.tell()
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="event log", daemon=True)
+        self.thread.start()
+
+    def log(self, event, sim_time, run, fields):
+        # Called from the game loop; must stay cheap
+        if len(self.pending) >= MAX_PENDING:
+            self.dropped += 1
+            return
+        self.pending.append((time.time(), sim_time, run, event, fields))
+
+    def run(self):
+        while not self.closing.wait(FLUSH_INTERVAL):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        lines = []
+        pending = self.pending
+        while pending:
+            stamp, sim_time, run, event, fields = pending.popleft()
+            record = {"t": round(stamp, 3), "sim": round(sim_time, 3), "run": run, "ev": event}
+            record.update(fields)
+            lines.append(json.dumps(record, separators=(",", ":")))
+        records = len(lines)
+        dropped = self.dropped + self.failed - self.reported_drops
+        if dropped:
+            lines.append(json.dumps({"t": round(time.time(), 3), "ev": "dropped", "count": dropped},
+                                    separators=(",", ":")))
+        if not lines:
+            return
+        data = ("\n".join(lines) + "\n").encode()
+        try:
+            if self.file.closed:
+                self.reopen()  # A rotation could not open the new file
+            if self.size and self.size + len(data) > self.max_bytes:
+                self.rotate()
+            self.file.write(data)
+            self.file.flush()
+        except OSError:
+            # Reported once the disk takes writes again; the "dropped" line
+            # is not a record, and its count is carried to the next one
+            self.failed += records
+            return
+        self.reported_drops += dropped
+        self.size += len(data)
+        self.written += records
+
+    def rotate(self):
+        self.file.close()
+        try:
+            if self.backups:
+                for index in range(self.backups - 1, 0, -1):
+                    older = f"{self.path}.{index}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{self.path}.{index + 1}")
+                os.replace(self.path, self.path + ".1")
+        finally:
+            # With no backups, or if a rename failed, carry on in the same
+            # file. If this open fails too, the next flush tries again.
+            self.reopen("ab" if self.backups else "wb")
+
+    def reopen(self, mode="ab"):
+        self.file = open(self.path, mode)
+        self.size = self.file.tell()
+
+    def close(self):
+        # Writes out what is left; only for shutdown
+        self.closing.set()
+        self.thread.join()
+        self.file.close()
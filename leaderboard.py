@@ -0,0 +1,322 @@
+"""Shared leaderboard: the client main.py runs, and a stand-in server.
+
+main.py --leaderboard URL sends every finished run to a leaderboard server
+and shows the global top list on the game over screen. To try it locally:
+
+    python leaderboard.py serve 8765 scores.json &
+    python main.py --leaderboard http://127.0.0.1:8765
+
+The game never waits on the network, or on the disk. submit() only appends
+to a deque; a background thread moves runs into the outbox (OUTBOX_FILE,
+one JSON run per line), fsyncing before it tries to send them, so a run
+survives the game, the machine or the network going down. The outbox goes
+up BATCH_SIZE runs at a time over one keep-alive connection; once the
+server has taken a batch it is cut from the file. Failures back off
+exponentially, with jitter, from RETRY_MIN up to RETRY_MAX. Every run
+carries a random id and the server ignores ids it has already seen, so a
+batch resent after a lost reply is not counted twice. At shutdown close()
+waits at most CLOSE_TIMEOUT seconds for a last try; whatever is left stays
+in the outbox and goes up on the next start.
+
+The top list is fetched every TOP_REFRESH seconds and after each batch
+that goes up. top holds the latest one, replaced whole, so the game thread
+can read it at any time.
+
+Protocol, JSON both ways:
+    POST /scores      {"runs": [{"id", "cabinet", "score", "seconds", "reason", "time", "bot"}]}
+                      -> {"accepted": count of runs not seen before}
+    GET  /top?limit=N -> {"top": [{"cabinet", "score", "time"}]}, best first,
+                         leaving out runs played by the autopilot ("bot")
+
+The stand-in server keeps runs in memory, and in a JSON file if given one.
+"""
+import collections
+import http.client
+import http.server
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+
+OUTBOX_FILE = "leaderboard_outbox.ndjson"
+BATCH_SIZE = 50            # runs per request
+REQUEST_TIMEOUT = 5.0      # seconds
+CLOSE_TIMEOUT = 1.0        # seconds, for the last try at shutdown
+RETRY_MIN = 1.0            # seconds
+RETRY_MAX = 120.0
+TOP_REFRESH = 60.0         # seconds
+TOP_SIZE = 5
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_TOP = 100
+
+class LeaderboardClient:
+    def __init__(self, url, outbox_path=OUTBOX_FILE, top_size=TOP_SIZE):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("Leaderboard URL must be http(s)://host[:port][/path]: " + url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip("/")
+        self.outbox_path = outbox_path
+        self.top_size = top_size
+        self.incoming = collections.deque()  # append and popleft are safe across threads
+        self.outbox = []          # Runs on disk the server has not taken
+        self.outbox_lock = threading.Lock()  # Held while the outbox and its file change
+        self.top = ()             # (cabinet, score) pairs, best first
+        self.connection = None
+        self.sent = 0             # Runs the server has taken
+        self.rejected = 0         # Runs in batches the server refused outright
+        self.failures = 0         # Requests that failed and will be retried
+        self.wake = threading.Event()
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="leaderboard", daemon=True)
+        self.thread.start()
+
+    @property
+    def queued(self):
+        return len(self.incoming) + len(self.outbox)
+
+    def submit(self, run):
+        # Called from the game loop with a dict of the fields in the protocol
+        # above, less the id; must stay cheap
+        self.incoming.append(dict(run, id=uuid.uuid4().hex))
+        self.wake.set()
+
+    def run(self):
+        self.outbox = self.load_outbox()
+        retry_delay = 0.0
+        next_attempt = 0.0
+        next_top = 0.0
+        while True:
+            self.store_incoming()
+            closing = self.closing.is_set()
+            now = time.monotonic()
+            if now >= next_attempt:
+                ok = True
+                while self.outbox and ok:
+                    ok = self.send_batch()
+                    next_top = now  # New scores may have moved the list
+                if ok and now >= next_top and not closing:
+                    ok = self.fetch_top()
+                    if ok:
+                        next_top = now + TOP_REFRESH
+                if ok:
+                    retry_delay = 0.0
+                else:
+                    self.failures += 1
+                    retry_delay = min(max(retry_delay * 2, RETRY_MIN), RETRY_MAX)
+                    next_attempt = now + retry_delay * random.uniform(0.5, 1.0)
+            if closing:
+                break
+            wake_at = next_attempt if next_attempt > now else next_top
+            self.wake.wait(max(0.0, wake_at - time.monotonic()))
+            self.wake.clear()
+        if self.connection is not None:
+            self.connection.close()
+
+    def load_outbox(self):
+        runs = []
+        try:
+            with open(self.outbox_path) as f:
+                for line in f:
+                    try:
+                        runs.append(json.loads(line))
+                    except ValueError:
+                        pass  # A line cut short by a crash mid-write
+        except FileNotFoundError:
+            pass
+        return runs
+
+    def store_incoming(self):
+        with self.outbox_lock:
+            runs = []
+            while self.incoming:
+                runs.append(self.incoming.popleft())
+            if not runs:
+                return
+            try:
+                with open(self.outbox_path, "a") as f:
+                    f.write("".join(json.dumps(run, separators=(",", ":")) + "\n" for run in runs))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError:
+                pass  # Kept in memory; the next rewrite of the outbox saves them
+            self.outbox += runs
+
+    def rewrite_outbox(self):
+        temporary = self.outbox_path + ".tmp"
+        try:
+            with open(temporary, "w") as f:
+                f.write("".join(json.dumps(run, separators=(",", ":")) + "\n" for run in self.outbox))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.outbox_path)
+        except OSError:
+            pass  # Runs already taken may be sent again; the server drops repeats
+
+    def request(self, method, path, body=None):
+        # (status, decoded JSON) over the kept-alive connection, or None if
+        # the request failed. A kept-alive connection may have been closed
+        # by the server while idle, so a failure on one is tried once more
+        # on a new connection.
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        timeout = CLOSE_TIMEOUT if self.closing.is_set() else REQUEST_TIMEOUT
+        while True:
+            reused = self.connection is not None
+            try:
+                if not reused:
+                    self.connection = self.connection_class(self.host, self.port, timeout=timeout)
+                elif self.connection.sock is not None:
+                    self.connection.sock.settimeout(timeout)
+                self.connection.request(method, self.path + path, body, headers)
+                response = self.connection.getresponse()
+                data = response.read()  # All of it, or the connection cannot be reused
+                return response.status, json.loads(data) if data else None
+            except (OSError, http.client.HTTPException, ValueError):
+                self.connection.close()
+                self.connection = None
+                if not reused:
+                    return None
+
+    def send_batch(self):
+        batch = self.outbox[:BATCH_SIZE]
+        result = self.request("POST", "/scores", json.dumps({"runs": batch}).encode())
+        if result is None or result[0] >= 500:
+            return False
+        status, _ = result
+        if status >= 300:
+            self.rejected += len(batch)  # Sending it again would not change the answer
+        else:
+            self.sent += len(batch)
+        with self.outbox_lock:
+            self.outbox = self.outbox[len(batch):]
+            self.rewrite_outbox()
+        return True
+
+    def fetch_top(self):
+        result = self.request("GET", f"/top?limit={self.top_size}")
+        if result is None or result[0] != 200:
+            return False
+        try:
+            self.top = tuple((str(entry["cabinet"]), int(entry["score"])) for entry in result[1]["top"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        # Makes one last try at sending what is queued, unless backing off,
+        # and leaves the rest in the outbox for next time; only for shutdown.
+        # Waits at most timeout seconds for the try. If the thread is still
+        # stuck in a request by then, the runs it has not stored yet are
+        # written to the outbox here.
+        self.closing.set()
+        self.wake.set()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            self.store_incoming()
+
+# --- Stand-in server ---
+
+class ScoreStore:
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.runs = {}  # id -> run
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for run in json.load(f):
+                    self.runs[run["id"]] = run
+
+    def add(self, runs):
+        with self.lock:
+            accepted = 0
+            for run in runs:
+                if run["id"] not in self.runs:
+                    self.runs[run["id"]] = run
+                    accepted += 1
+            if accepted and self.path:
+                temporary = self.path + ".tmp"
+                with open(temporary, "w") as f:
+                    json.dump(list(self.runs.values()), f)
+                os.replace(temporary, self.path)
+        return accepted
+
+    def top(self, limit):
+        with self.lock:
+            runs = [run for run in self.runs.values() if not run.get("bot")]
+        runs.sort(key=lambda run: (-run["score"], run.get("time", 0)))
+        return [{"cabinet": run.get("cabinet"), "score": run["score"], "time": run.get("time")}
+                for run in runs[:limit]]
+
+class LeaderboardHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, as the client expects
+    store = None
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if urllib.parse.urlsplit(self.path).path != "/scores":
+            self.reply(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            runs = json.loads(self.rfile.read(length))["runs"]
+            for run in runs:
+                if not isinstance(run["id"], str) or not isinstance(run["score"], int):
+                    raise ValueError
+        except (KeyError, TypeError, ValueError):
+            self.reply(400, {"error": "expected {\"runs\": [{\"id\": str, \"score\": int, ...}]}"})
+            return
+        self.reply(200, {"accepted": self.store.add(runs)})
+
+    def do_GET(self):
+        parts = urllib.parse.urlsplit(self.path)
+        if parts.path != "/top":
+            self.reply(404, {"error": "not found"})
+            return
+        query = urllib.parse.parse_qs(parts.query)
+        try:
+            limit = min(int(query.get("limit", ["10"])[0]), SERVER_MAX_TOP)
+        except ValueError:
+            self.reply(400, {"error": "limit must be a number"})
+            return
+        self.reply(200, {"top": self.store.top(limit)})
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the terminal
+
+def make_server(host=SERVER_HOST, port=SERVER_PORT, path=None):
+    # A bound server that is not serving yet; port 0 picks a free one, see
+    # server.server_address. The store is server.RequestHandlerClass.store.
+    handler = type("Handler", (LeaderboardHandler,), {"store": ScoreStore(path)})
+    return http.server.ThreadingHTTPServer((host, port), handler)
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, path=None):
+    server = make_server(host, port, path)
+    print(f"Leaderboard on http://{host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "serve":
+        sys.exit("usage: python leaderboard.py serve [port] [scores.json]")
+    serve(SERVER_HOST,
+          int(sys.argv[2]) if len(sys.argv) > 2 else SERVER_PORT,
+          sys.argv[3] if len(sys.argv) > 3 else None)
@@ -1,7 +1,20 @@
+import time
+STARTUP_BEGIN = time.perf_counter()  # Taken first, importing pygame is part of cold start
+
 import pygame
 import math
 import random
 import os
+import sys
+import threading
+import marshal
+import heapq
+import bisect
+import gc
+import importlib.util
+import tracemalloc
+
+import spectator
 
 # === CONFIG ===
 FRAME_WIDTH, FRAME_HEIGHT = 8, 8
@@ -18,16 +31,133 @@ WINDOW_WIDTH, WINDOW_HEIGHT = 1066, 800
 GAME_WIDTH = 400
 GAME_HEIGHT = int(GAME_WIDTH / (1066 / 800))
 PANEL_HEIGHT = 56
+VIEW_WIDTH, VIEW_HEIGHT = GAME_WIDTH, GAME_HEIGHT - PANEL_HEIGHT  # The playfield above the panel
 FLICKER_START = 5.0 
 FLICKER_MIN_SPEED = 0.5  # Hz
 FLICKER_MAX_SPEED = 5.0 # Hz
 CHARGE_INPUT_THRESHOLD = 0.12  # seconds
 
 # === INIT ===
-pygame.init()
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-clock = pygame.time.Clock()
-font = pygame.font.Font("PressStart2P.ttf", 12)
+def arg_value(flag, default=None):
+    # The word after a flag on the command line, e.g. --replay run.replay
+    if flag in sys.argv:
+        index = sys.argv.index(flag) + 1
+        if index < len(sys.argv):
+            return sys.argv[index]
+    return default
+
+# --headless runs without a window or audio device; frames are still drawn to
+# game_surface (see CAPTURE) but never scaled or flipped
+HEADLESS = "--headless" in sys.argv
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+# --pacing and --tick-rate, see FRAME PACING. Read this early because vsync
+# has to be asked for when the window is created.
+PACING_MODES = ("hybrid", "vsync", "uncapped")
+PACING_MODE = arg_value("--pacing", "hybrid")
+if PACING_MODE not in PACING_MODES:
+    sys.exit("--pacing must be one of: " + ", ".join(PACING_MODES))
+TICK_RATE = float(arg_value("--tick-rate", 60))
+
+# --arena WIDTHxHEIGHT makes the world bigger than the view, and
+# --arena-population N scatters N chickens over it, see ARENA. Read early
+# since the flow field and the playfield clamp are sized from it.
+ARENA_WIDTH, ARENA_HEIGHT = VIEW_WIDTH, VIEW_HEIGHT
+if "--arena" in sys.argv:
+    try:
+        ARENA_WIDTH, ARENA_HEIGHT = (int(n) for n in arg_value("--arena", "").split("x"))
+    except ValueError:
+        sys.exit("--arena must be WIDTHxHEIGHT, e.g. 4000x3000")
+    if ARENA_WIDTH < VIEW_WIDTH or ARENA_HEIGHT < VIEW_HEIGHT:
+        sys.exit(f"--arena must be at least {VIEW_WIDTH}x{VIEW_HEIGHT}")
+ARENA_SCROLLS = (ARENA_WIDTH, ARENA_HEIGHT) != (VIEW_WIDTH, VIEW_HEIGHT)
+ARENA_POPULATION = int(arg_value("--arena-population", 0))
+
+# --profile-startup prints where the time to the first frame went. Phases are
+# laps of the module-level setup; lazy loads (font, sounds) are timed where
+# they happen and kept out of the lap they interrupt.
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+
+class StartupProfile:
+    def __init__(self):
+        self.phases = {}
+        self.last_lap = STARTUP_BEGIN
+        self.lazy = 0.0      # Lazy load time since the last lap
+        self.reported = False
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - self.last_lap - self.lazy)
+        self.last_lap = now
+        self.lazy = 0.0
+
+    def add(self, name, seconds, detail=""):
+        self.lazy += seconds
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if self.reported and PROFILE_STARTUP:
+            print(f"Late load: {name} {detail} {seconds * 1000:.1f} ms")
+
+    def report(self):
+        total = time.perf_counter() - STARTUP_BEGIN
+        print(f"Startup: {total * 1000:.1f} ms to the first frame")
+        for name, seconds in self.phases.items():
+            print(f"  {name:<28}{seconds * 1000:8.1f} ms {seconds / total:6.1%}")
+
+startup_profile = StartupProfile()
+startup_profile.lap("pygame import")
+
+# Subsystems come up on first use rather than through pygame.init(). The
+# window only exists when main.py runs the game; importing it (rl_env.py)
+# gets unconverted sprites and no window.
+screen = None
+vsync_enabled = False
+font = None
+FONT_FILE = os.path.abspath("PressStart2P.ttf")  # Resolved now, loaded later
+mixer_ready = None  # None until the first sound plays, then whether audio works
+
+def open_window():
+    global screen, vsync_enabled
+    start = time.perf_counter()
+    pygame.display.init()
+    startup_profile.add("pygame init", time.perf_counter() - start)
+    start = time.perf_counter()
+    if PACING_MODE == "vsync":
+        # pygame only offers vsync through its renderer, hence SCALED
+        try:
+            screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SCALED, vsync=1)
+            vsync_enabled = True
+        except pygame.error:
+            pass  # The pacer falls back to hybrid
+    if screen is None:
+        screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    startup_profile.add("display creation", time.perf_counter() - start)
+    return screen
+
+def get_font():
+    global font
+    if font is None:
+        start = time.perf_counter()
+        pygame.font.init()
+        font = pygame.font.Font(FONT_FILE, 12)
+        startup_profile.add("font load", time.perf_counter() - start)
+    return font
+
+def init_mixer():
+    global mixer_ready
+    if mixer_ready is None:
+        start = time.perf_counter()
+        try:
+            pygame.mixer.init()
+            mixer_ready = True
+        except pygame.error:
+            mixer_ready = False  # No audio device; play silently
+        startup_profile.add("audio init", time.perf_counter() - start)
+    return mixer_ready
+
+if __name__ == "__main__":
+    open_window()
 
 HIGHSCORE_FILE = "highscore.txt"
 highscore = 0
@@ -48,22 +178,62 @@ def load_highscore():
 highscore = load_highscore()
 
 # === SOUND ===
-fire_sound = pygame.mixer.Sound("fire.wav")
-hit_sound = pygame.mixer.Sound("hit.wav")
-pickup_sound = pygame.mixer.Sound("pickup.wav")
-explosion_sound = pygame.mixer.Sound("explosion.wav")
-hurt_sound = pygame.mixer.Sound("hurt.wav")
-dull_hit_sound = pygame.mixer.Sound("dull_hit.wav")
-super_sound = pygame.mixer.Sound("super.wav")
-empty_sound = pygame.mixer.Sound("empty.wav")
-charge_full_sound = pygame.mixer.Sound("charge_full.wav")
-charge_gain_sound = pygame.mixer.Sound("charge_gain.wav")
-charge1_sound = pygame.mixer.Sound("charge_1.wav")
-charge2_sound = pygame.mixer.Sound("charge_2.wav")
+# Sounds are decoded on first play, or by warm_sounds() in the background
+# once the first frame is up, whichever comes first
+sound_lock = threading.Lock()
+lazy_sounds = []
+
+class LazySound:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.sound = None
+        lazy_sounds.append(self)
+
+    def load(self):
+        with sound_lock:
+            if self.sound is None and init_mixer():
+                start = time.perf_counter()
+                self.sound = pygame.mixer.Sound(self.path)
+                startup_profile.add("sound decode", time.perf_counter() - start, os.path.basename(self.path))
+        return self.sound
+
+    def play(self):
+        sound = self.sound or self.load()
+        if sound is not None:
+            sound.play()
+
+def warm_sounds():
+    for sound in lazy_sounds:
+        sound.load()
+
+fire_sound = LazySound("fire.wav")
+hit_sound = LazySound("hit.wav")
+pickup_sound = LazySound("pickup.wav")
+explosion_sound = LazySound("explosion.wav")
+hurt_sound = LazySound("hurt.wav")
+dull_hit_sound = LazySound("dull_hit.wav")
+super_sound = LazySound("super.wav")
+empty_sound = LazySound("empty.wav")
+charge_full_sound = LazySound("charge_full.wav")
+charge_gain_sound = LazySound("charge_gain.wav")
+charge1_sound = LazySound("charge_1.wav")
+charge2_sound = LazySound("charge_2.wav")
+
+startup_profile.lap("config and high score")
 
 # === SPRITES ===
+def load_sheet(path):
+    sheet = pygame.image.load(path)
+    if screen is not None:
+        return sheet.convert_alpha()
+    # No window when imported: convert to the same ARGB layout through a
+    # reference surface, which only needs the display module. Blitting the
+    # sheets as loaded is an order of magnitude slower.
+    pygame.display.init()
+    return sheet.convert(pygame.Surface((1, 1), pygame.SRCALPHA, 32))
+
 # -- Player --
-player_sheet = pygame.image.load("player.png").convert_alpha()
+player_sheet = load_sheet("player.png")
 def get_player_frames(row):
     return [pygame.transform.scale(
         player_sheet.subsurface((i * FRAME_WIDTH, row * FRAME_HEIGHT, FRAME_WIDTH, FRAME_HEIGHT)),
@@ -77,7 +247,7 @@ frames_charge_right = get_player_frames(4)  # Assuming row 4 for charging (right
 frames_charge_left  = get_player_frames(5)  # Assuming row 5 for charging (left)
 
 # -- Fireball/Explosion --
-fireball_sheet = pygame.image.load("fireball.png").convert_alpha()
+fireball_sheet = load_sheet("fireball.png")
 def get_fireball_frames(row=0):
     return [pygame.transform.scale(
         fireball_sheet.subsurface((i * FRAME_WIDTH, row * FRAME_HEIGHT, FRAME_WIDTH, FRAME_HEIGHT)),
@@ -125,7 +295,7 @@ def get_orb_explosion_frames(row):
 piercing_orb_explosion_frames = get_orb_explosion_frames(3)  # 4th row, 0-indexed
 
 # -- Chickens --
-chicken_sheet = pygame.image.load("chicken.png").convert_alpha()
+chicken_sheet = load_sheet("chicken.png")
 def get_chicken_frames(row):
     return [pygame.transform.scale(
         chicken_sheet.subsurface((i * FRAME_WIDTH, row * FRAME_HEIGHT, FRAME_WIDTH, FRAME_HEIGHT)),
@@ -135,7 +305,7 @@ chicken_frames_right = get_chicken_frames(0)
 chicken_frames_left  = get_chicken_frames(1)
 
 # -- Goose --
-goose_sheet = pygame.image.load("goose.png").convert_alpha()
+goose_sheet = load_sheet("goose.png")
 def get_goose_frames(row):
     return [pygame.transform.scale(
         goose_sheet.subsurface((i * FRAME_WIDTH, row * FRAME_HEIGHT, FRAME_WIDTH, FRAME_HEIGHT)),
@@ -145,7 +315,7 @@ goose_frames_right = get_goose_frames(0)
 goose_frames_left  = get_goose_frames(1)
 
 # -- Crab (Armored Enemy) --
-crab_sheet = pygame.image.load("crab.png").convert_alpha()
+crab_sheet = load_sheet("crab.png")
 def get_crab_frames(row):
     return [pygame.transform.scale(
         crab_sheet.subsurface((i * FRAME_WIDTH, row * FRAME_HEIGHT, FRAME_WIDTH, FRAME_HEIGHT)),
@@ -155,7 +325,7 @@ crab_frames_right = get_crab_frames(0)
 crab_frames_left  = get_crab_frames(1)
 
 # -- Eggs & Hearts --
-egg_sheet = pygame.image.load("egg.png").convert_alpha()
+egg_sheet = load_sheet("egg.png")
 egg_frames = [pygame.transform.scale(
     egg_sheet.subsurface((i * FRAME_WIDTH, 0, FRAME_WIDTH, FRAME_HEIGHT)),
     (FRAME_WIDTH * SCALE, FRAME_HEIGHT * SCALE)
@@ -165,7 +335,7 @@ golden_egg_frames = [pygame.transform.scale(
     (FRAME_WIDTH * SCALE, FRAME_HEIGHT * SCALE)
 ) for i in range(1)]
 
-heart_sheet = pygame.image.load("heart.png").convert_alpha()
+heart_sheet = load_sheet("heart.png")
 heart_full = pygame.transform.scale(
     heart_sheet.subsurface((0, 0, FRAME_WIDTH, FRAME_HEIGHT)),
     (FRAME_WIDTH * SCALE, FRAME_HEIGHT * SCALE)
@@ -176,7 +346,7 @@ heart_empty = pygame.transform.scale(
 )
 
 # -- Meter/Battery (Golden Power Meter) --
-meter_sheet = pygame.image.load("meter.png").convert_alpha()
+meter_sheet = load_sheet("meter.png")
 
 def get_meter_frames(row):
     return [
@@ -194,7 +364,7 @@ charge_frames = get_meter_frames(0)       # 0 = empty, 1/2/3 = filled
 charge_full_anim = get_meter_frames(1)    # 4-frame animation for full
 CHARGE_EFFECT_SCALE = 2 * SCALE
 
-charge_anim_img = pygame.image.load("charge.png").convert_alpha()
+charge_anim_img = load_sheet("charge.png")
 charge_anim_frames = [
     pygame.transform.scale(
         charge_anim_img.subsurface((i * FRAME_WIDTH, 0, FRAME_WIDTH, FRAME_HEIGHT)),
@@ -203,6 +373,1171 @@ charge_anim_frames = [
     for i in range(4)
 ]
 
+startup_profile.lap("sprite slicing and scaling")
+
+# === HITBOXES ===
+# Collision data is derived once from each frame's alpha: a mask, the tight
+# opaque bounds and the smallest circle around their centre that encloses
+# every opaque pixel. Circles are the cheap broadphase, masks the narrowphase.
+class Hitbox:
+    def __init__(self, mask, rect, cx, cy, radius):
+        self.mask = mask
+        self.rect = rect      # Opaque bounds, relative to the frame origin
+        self.cx = cx
+        self.cy = cy
+        self.radius = radius
+
+def build_hitbox(frame):
+    mask = pygame.mask.from_surface(frame)
+    rects = mask.get_bounding_rects()
+    rect = rects[0].unionall(rects[1:]) if rects else frame.get_rect()
+    cx = rect.x + rect.w / 2
+    cy = rect.y + rect.h / 2
+    radius_sq = 0
+    for y in range(rect.top, rect.bottom):
+        for x in range(rect.left, rect.right):
+            if mask.get_at((x, y)):
+                # Far corner of the pixel, not its centre
+                dx = abs(x + 0.5 - cx) + 0.5
+                dy = abs(y + 0.5 - cy) + 0.5
+                radius_sq = max(radius_sq, dx * dx + dy * dy)
+    return Hitbox(mask, rect, cx, cy, math.sqrt(radius_sq))
+
+def build_circle_hitbox(radius, size):
+    surf = pygame.Surface((size, size), pygame.SRCALPHA)
+    pygame.draw.circle(surf, (255, 255, 255), (size // 2, size // 2), radius)
+    return build_hitbox(surf)
+
+FRAME_HITBOXES = {}  # frame surface -> Hitbox
+
+def register_hitboxes(*frame_sets):
+    for frames in frame_sets:
+        for frame in frames:
+            if frame not in FRAME_HITBOXES:
+                FRAME_HITBOXES[frame] = build_hitbox(frame)
+
+register_hitboxes(
+    chicken_frames_right, chicken_frames_left,
+    goose_frames_right, goose_frames_left,
+    crab_frames_right, crab_frames_left,
+    egg_frames, golden_egg_frames, [heart_full],
+    *fireball_variants,
+)
+
+# The player's hurtbox stays a small core circle so grazes don't count
+PLAYER_HURTBOX_RADIUS = int(FRAME_WIDTH * SCALE * 0.1)
+PLAYER_HITBOX = build_circle_hitbox(PLAYER_HURTBOX_RADIUS, FRAME_WIDTH * SCALE)
+
+ORB_HITBOXES = {}  # radius -> Hitbox
+
+def get_orb_hitbox(radius):
+    hitbox = ORB_HITBOXES.get(radius)
+    if hitbox is None:
+        hitbox = build_circle_hitbox(radius, int(radius * 2))
+        ORB_HITBOXES[radius] = hitbox
+    return hitbox
+
+def collides(a, b):
+    return hitboxes_overlap(*a.get_hitbox(), *b.get_hitbox())
+
+def hitboxes_overlap(a_hitbox, ax, ay, b_hitbox, bx, by):
+    dx = (bx + b_hitbox.cx) - (ax + a_hitbox.cx)
+    dy = (by + b_hitbox.cy) - (ay + a_hitbox.cy)
+    reach = a_hitbox.radius + b_hitbox.radius
+    if dx * dx + dy * dy > reach * reach:
+        return False
+    offset = (int(bx) - int(ax), int(by) - int(ay))
+    return a_hitbox.mask.overlap(b_hitbox.mask, offset) is not None
+
+def sprite_bounds(x, y, frame):
+    # A circle holding the whole sprite, so it holds the hitbox of any frame
+    # the same size. The extra pixel covers collides() truncating positions.
+    w, h = frame.get_size()
+    return (x + w / 2, y + h / 2, math.hypot(w, h) / 2 + 1)
+
+startup_profile.lap("hitbox masks")
+
+# === RENDER QUEUE ===
+# Everything drawn onto game_surface goes through the queue as a small
+# display list. Sprites are sorted by layer, then y so lower sprites overlap
+# higher ones, and runs of sprites go out in one Surface.blits call.
+#
+# Layers below LAYER_PANEL are the world: positions there are in world
+# pixels and the queue moves them by the camera, dropping sprites that end
+# up wholly outside the view. The panel, HUD and debug layers are drawn
+# where they are given.
+#
+# With --dirty-rects, DirtyTracker compares each frame's list against the
+# last one and only repaints (and presents) the regions that changed.
+LAYER_GROUND = 0
+LAYER_TELEGRAPH = 1
+LAYER_ACTORS = 2
+LAYER_CHARGE_EFFECT = 3
+LAYER_PROJECTILES = 4
+LAYER_EFFECTS = 5
+LAYER_ITEMS = 6
+LAYER_PANEL = 7
+LAYER_HUD = 8
+LAYER_DEBUG = 9
+
+DRAW_BLIT, DRAW_LINE, DRAW_FILL, DRAW_CIRCLE, DRAW_PARTICLES = range(5)
+
+BACKGROUND_COLOR = (32, 32, 40)
+DIRTY_RECTS = "--dirty-rects" in sys.argv
+DIRTY_FULL_REDRAW_RATIO = 0.5  # Past this share of the surface, repaint it all
+
+camera_x = camera_y = 0  # Top left of the view in world pixels, see ARENA
+
+def draw_sort_key(entry):
+    return (entry[0], entry[1])
+
+def entry_rect(entry):
+    op, args = entry[2], entry[3]
+    if op == DRAW_BLIT:
+        surface, pos = args
+        return pygame.Rect(pos, surface.get_size())
+    if op == DRAW_LINE:
+        _, (x1, y1), (x2, y2), width = args
+        rect = pygame.Rect(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1)
+        return rect.inflate(width * 2, width * 2)
+    if op == DRAW_FILL:
+        return pygame.Rect(args[1])
+    if op == DRAW_PARTICLES:
+        return args[0].rect
+    _, (cx, cy), radius, _ = args
+    return pygame.Rect(cx - radius, cy - radius, radius * 2 + 1, radius * 2 + 1)
+
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect = rect.union(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+class RenderQueue:
+    def __init__(self):
+        self.entries = []
+        self.culled = 0
+
+    def add(self, surface, pos, layer):
+        if layer < LAYER_PANEL:
+            x = pos[0] - camera_x
+            y = pos[1] - camera_y
+            w, h = surface.get_size()
+            if x >= VIEW_WIDTH or y >= VIEW_HEIGHT or x + w <= 0 or y + h <= 0:
+                self.culled += 1
+                return
+            pos = (x, y)
+        self.entries.append((layer, pos[1], DRAW_BLIT, (surface, pos)))
+
+    def add_line(self, color, start, end, width, layer):
+        if layer < LAYER_PANEL:
+            start = (start[0] - camera_x, start[1] - camera_y)
+            end = (end[0] - camera_x, end[1] - camera_y)
+        self.entries.append((layer, min(start[1], end[1]), DRAW_LINE, (color, start, end, width)))
+
+    def add_fill(self, color, rect, layer):
+        if layer < LAYER_PANEL:
+            rect = (rect[0] - camera_x, rect[1] - camera_y, rect[2], rect[3])
+        self.entries.append((layer, rect[1], DRAW_FILL, (color, tuple(rect))))
+
+    def add_circle(self, color, center, radius, width, layer):
+        if layer < LAYER_PANEL:
+            center = (center[0] - camera_x, center[1] - camera_y)
+        self.entries.append((layer, center[1] - radius, DRAW_CIRCLE, (color, center, radius, width)))
+
+    def add_particles(self, system, layer):
+        # The whole system goes in as one entry, drawn over the layer's sprites
+        batch = system.snapshot(camera_x, camera_y, VIEW_WIDTH, VIEW_HEIGHT)
+        if batch is not None:
+            self.entries.append((layer, math.inf, DRAW_PARTICLES, (batch,)))
+
+    def take(self):
+        # Hands over this frame's list; it is never touched again by the queue
+        entries = self.entries
+        self.entries = []
+        self.culled = 0
+        return entries
+
+def replay_entries(target, entries):
+    batch = []
+    for _, _, op, args in entries:
+        if op == DRAW_BLIT:
+            batch.append(args)
+            continue
+        if batch:
+            target.blits(batch, doreturn=False)
+            batch = []
+        if op == DRAW_LINE:
+            pygame.draw.line(target, *args)
+        elif op == DRAW_FILL:
+            target.fill(args[0], args[1])
+        elif op == DRAW_PARTICLES:
+            particles.draw_batch(target, args[0])
+        else:
+            pygame.draw.circle(target, *args)
+    if batch:
+        target.blits(batch, doreturn=False)
+
+def draw_entries(target, entries):
+    entries.sort(key=draw_sort_key)
+    target.fill(BACKGROUND_COLOR)
+    replay_entries(target, entries)
+
+class DirtyTracker:
+    def __init__(self):
+        self.prev_rects = None  # (op, args) -> rect, from the last draw
+
+    def draw(self, target, entries):
+        entries.sort(key=draw_sort_key)
+        bounds = target.get_rect()
+        placed = []
+        current = {}
+        for entry in entries:
+            rect = entry_rect(entry)
+            placed.append((entry, rect))
+            current[(entry[2], entry[3])] = rect
+
+        if self.prev_rects is None:
+            dirty = [bounds]
+        else:
+            changed = [rect for key, rect in current.items() if key not in self.prev_rects]
+            changed += [rect for key, rect in self.prev_rects.items() if key not in current]
+            dirty = merge_rects([rect.clip(bounds) for rect in changed if rect.colliderect(bounds)])
+            if sum(rect.w * rect.h for rect in dirty) > bounds.w * bounds.h * DIRTY_FULL_REDRAW_RATIO:
+                dirty = [bounds]
+        self.prev_rects = current
+
+        for rect in dirty:
+            target.set_clip(rect)
+            target.fill(BACKGROUND_COLOR, rect)
+            replay_entries(target, [entry for entry, entry_r in placed if entry_r.colliderect(rect)])
+        target.set_clip(None)
+        return dirty
+
+text_cache = {}  # (text, color) -> rendered surface
+
+def render_text(text, color):
+    # Reusing surfaces keeps unchanged HUD text out of the dirty regions
+    key = (text, color)
+    surface = text_cache.get(key)
+    if surface is None:
+        if len(text_cache) > 256:
+            text_cache.clear()
+        surface = get_font().render(text, False, color)
+        text_cache[key] = surface
+    return surface
+
+def scale_full():
+    return [(pygame.transform.scale(game_surface, (WINDOW_WIDTH, WINDOW_HEIGHT)), (0, 0))]
+
+# transform.scale samples source row floor(Y * GAME_HEIGHT / WINDOW_HEIGHT), so
+# a full-width band whose edges sit on a multiple of this step scales to
+# exactly the pixels a full-frame scale would produce.
+DIRTY_BAND_STEP = GAME_HEIGHT // math.gcd(GAME_HEIGHT, WINDOW_HEIGHT)
+
+def scale_dirty(rects):
+    step = DIRTY_BAND_STEP
+    bands = []
+    for rect in rects:
+        top = rect.top // step * step
+        bottom = min(-(-rect.bottom // step) * step, GAME_HEIGHT)
+        bands.append(pygame.Rect(0, top, GAME_WIDTH, bottom - top))
+    pieces = []
+    for band in merge_rects(bands):
+        y0 = band.top * WINDOW_HEIGHT // GAME_HEIGHT
+        y1 = band.bottom * WINDOW_HEIGHT // GAME_HEIGHT
+        pieces.append((pygame.transform.scale(game_surface.subsurface(band), (WINDOW_WIDTH, y1 - y0)), (0, y0)))
+    return pieces
+
+def render_frame(entries, full=False):
+    # Draws a frame into game_surface and scales it for the window. Returns
+    # the window's new pixels as (surface, position) pieces, or None when
+    # headless, and whether they cover the whole window. full scales the
+    # whole surface, for when the window lost its contents.
+    pieces = None
+    if DIRTY_RECTS:
+        rects = dirty_tracker.draw(game_surface, entries)
+        if not HEADLESS:
+            pieces = scale_full() if full else scale_dirty(rects)
+    else:
+        draw_entries(game_surface, entries)
+        full = True
+        if not HEADLESS:
+            pieces = scale_full()
+    if frame_capture is not None:
+        frame_capture.write(game_surface)
+    return pieces, full
+
+def show_frame(rendered, input_times=()):
+    # Puts a rendered frame on the window. Main thread only: SDL's video
+    # calls belong to the thread that made the window, and macOS enforces
+    # it. input_times are the arrival stamps of the key events the frame
+    # answered; once it is on screen their latency is known.
+    pieces, full = rendered
+    if pieces is not None:
+        rects = [screen.blit(surface, position) for surface, position in pieces]
+        if full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+    if input_times:
+        shown = time.perf_counter()
+        for stamp in input_times:
+            input_latency.add((shown - stamp) * 1000)
+
+# === PARTICLES ===
+# Feathers, shell shards, impact sparks and the egg-bomb shockwave, see
+# particles.py. It needs numpy, which takes longer to import than the rest of
+# startup, so it is loaded in the background once the first frame is up.
+# Effects asked for before then, or without numpy, or with --no-particles,
+# are skipped; the sprite explosions still play. Importing main (rl_env.py)
+# never loads it.
+PARTICLES_ENABLED = "--no-particles" not in sys.argv
+particles = None
+particle_system = None
+
+def load_particles():
+    global particles, particle_system
+    start = time.perf_counter()
+    try:
+        import particles as module
+    except ImportError:
+        return
+    particles = module
+    particle_system = module.ParticleSystem()
+    startup_profile.add("particles", time.perf_counter() - start, "numpy")
+
+ENEMY_DEATH_PARTICLES = {"chicken": "feathers", "goose": "goose_feathers", "crab": "shell_shards"}
+
+def emit_particles(effect, x, y):
+    if particle_system is not None:
+        particle_system.burst(effect, x, y)
+
+# === PIPELINED RENDERING ===
+# With --pipelined the main thread keeps events and simulation, and a render
+# thread draws and scales the previous frame's list while the next one is
+# simulated. Most of that cost is blits and scaling, which release the GIL.
+# The lists only hold sprites that are never modified, so they are safe to
+# hand across as snapshots. The finished frame comes back to the main thread,
+# which puts it on the window when it hands over the next one (see
+# show_frame), so frames reach the screen one frame later than without.
+PIPELINED = "--pipelined" in sys.argv
+
+class FramePipeline:
+    def __init__(self, render):
+        self.render = render
+        self.cond = threading.Condition()
+        self.pending = None     # Back buffer: finished, not yet drawn
+        self.drawing = False
+        self.finished = None    # (rendered, input times) waiting for show_frame
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="render", daemon=True)
+        self.thread.start()
+
+    def submit(self, entries, input_times, full):
+        # Returns the last frame, drawn and ready for show_frame, or None
+        with self.cond:
+            # Wait for the renderer to finish the last frame so the
+            # simulation never runs more than one frame ahead
+            while (self.pending is not None or self.drawing) and self.running:
+                self.cond.wait()
+            finished, self.finished = self.finished, None
+            self.pending = (entries, input_times, full)
+            self.cond.notify_all()
+        return finished
+
+    def collect(self):
+        # The last frame once it is drawn, for when no new one follows it
+        with self.cond:
+            while (self.pending is not None or self.drawing) and self.running:
+                self.cond.wait()
+            finished, self.finished = self.finished, None
+        return finished
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.pending is None and self.running:
+                    self.cond.wait()
+                if self.pending is None:
+                    return
+                entries, input_times, full = self.pending
+                self.pending = None
+                self.drawing = True
+            rendered = self.render(entries, full)
+            with self.cond:
+                self.finished = (rendered, input_times)
+                self.drawing = False
+                self.cond.notify_all()
+
+    def stop(self):
+        # Returns the last frame, as collect() does
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join()
+        finished, self.finished = self.finished, None
+        return finished
+
+last_presented = None  # Copy of the last draw list put on screen, see POWER SAVING
+
+def present_frame():
+    # Returns whether anything was drawn: a draw list equal to the last one,
+    # or a hidden window, leaves the screen as it is
+    global frame_input_times, last_presented, window_exposed
+    entries = render_queue.take()
+    input_times, frame_input_times = frame_input_times, ()
+    if frame_capture is None and (not window_visible or (entries == last_presented and not window_exposed)):
+        if window_visible:
+            metrics.inc("frames_unchanged")
+        if frame_pipeline is not None:
+            # The frame still in the pipeline is what the screen should show
+            finished = frame_pipeline.collect()
+            if finished is not None:
+                show_frame(*finished)
+        return False
+    last_presented = list(entries)  # The renderer sorts entries in place
+    full, window_exposed = window_exposed, False
+    if frame_pipeline is not None:
+        finished = frame_pipeline.submit(entries, input_times, full)
+        if finished is not None:
+            show_frame(*finished)
+    else:
+        show_frame(render_frame(entries, full), input_times)
+    return True
+
+
+# === METRICS ===
+# Named counters and gauges. With --metrics a one-line summary is printed
+# every METRICS_REPORT_INTERVAL seconds.
+METRICS_ENABLED = "--metrics" in sys.argv
+METRICS_REPORT_INTERVAL = 5.0  # seconds
+
+METRICS_WINDOW = 2048           # Samples kept per tracked measurement
+METRICS_PERCENTILES = (50, 95, 99)
+
+class SampleWindow:
+    # The last size samples of a measurement. Adding is cheap; sorting for
+    # percentiles only happens when a report is made.
+    def __init__(self, size=METRICS_WINDOW):
+        self.samples = [0.0] * size
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+
+    def percentiles(self, points=METRICS_PERCENTILES):
+        filled = sorted(self.samples[:min(self.count, len(self.samples))])
+        if not filled:
+            return {}
+        return {point: filled[min(len(filled) - 1, len(filled) * point // 100)] for point in points}
+
+class Metrics:
+    def __init__(self):
+        self.values = {}
+        self.windows = {}
+        self.last_report = time.perf_counter()
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def inc(self, name, amount=1):
+        self.values[name] = self.values.get(name, 0) + amount
+
+    def track(self, name, window):
+        # Reported as name_p50, name_p95, ... over the window's samples
+        self.windows[name] = window
+
+    def report(self):
+        values = dict(self.values)
+        for name, window in self.windows.items():
+            for point, value in window.percentiles().items():
+                values[f"{name}_p{point}"] = value
+        return values
+
+    def print_report(self):
+        print(" ".join(f"{name}={value:.2f}" if isinstance(value, float) else f"{name}={value}"
+                       for name, value in sorted(self.report().items())))
+
+    def maybe_print(self):
+        now = time.perf_counter()
+        if now - self.last_report < METRICS_REPORT_INTERVAL:
+            return
+        self.last_report = now
+        self.print_report()
+
+metrics = Metrics()
+
+# === FRAME PACING ===
+# Paces the live loop at TICK_RATE (--tick-rate, default 60) against absolute
+# deadlines, so one late frame does not push back every frame after it.
+# --pacing picks how:
+#   hybrid    nap until PACER_SPIN_MARGIN before the deadline, then spin;
+#             naps alone overshoot by however much the OS timer slips
+#   vsync     presenting waits for the display (asked for in open_window);
+#             the pacer only waits itself if flips turn out not to block
+#   uncapped  no waiting, for benchmarks
+# Input is polled all through the wait, see INPUT. frame_interval_ms tracks
+# the time between frames and pacing_error_ms how far each strays from
+# 1 / TICK_RATE. --headless and capture runs use a fixed step and no pacer.
+# While the screen is not changing the pacer naps instead, see POWER SAVING.
+PACER_SPIN_MARGIN = 0.002     # seconds
+PACER_DT_SNAP = 0.0005        # Intervals this close to the target give dt exactly 1 / TICK_RATE
+PACER_VSYNC_MIN_SHARE = 0.75  # A shorter vsync interval means the flip did not wait
+
+class FramePacer:
+    def __init__(self, mode, rate):
+        self.mode = mode
+        self.interval = 1 / rate
+        self.last = time.perf_counter()
+        self.deadline = self.last + self.interval
+        self.intervals = SampleWindow()
+        self.error = SampleWindow()
+        metrics.track("frame_interval_ms", self.intervals)
+        if mode != "uncapped":
+            metrics.track("pacing_error_ms", self.error)
+
+    def wait_until(self, deadline):
+        while True:
+            input_queue.poll()
+            now = time.perf_counter()
+            left = deadline - now
+            if left <= 0:
+                return now
+            if left > PACER_SPIN_MARGIN:
+                time.sleep(min(INPUT_POLL_INTERVAL, left - PACER_SPIN_MARGIN))
+
+    def nap_until(self, deadline):
+        # One sleep and no spinning, for when nothing on screen is changing
+        left = deadline - time.perf_counter()
+        if left > 0:
+            time.sleep(left)
+        input_queue.poll()
+        return time.perf_counter()
+
+    def restart(self):
+        # After a pause, so the time spent paused is not handed out as dt
+        self.last = time.perf_counter()
+        self.deadline = self.last + self.interval
+
+    def tick(self, idle=False, background=False):
+        # Waits for the next frame and returns its dt. idle naps instead of
+        # polling and spinning; background also slows to BACKGROUND_TICK_RATE
+        # while still returning a full step, see POWER SAVING.
+        if background:
+            now = self.nap_until(self.last + 1 / BACKGROUND_TICK_RATE)
+            self.last = now
+            self.deadline = now + self.interval
+            return self.interval
+        if idle and self.mode != "uncapped":
+            now = self.nap_until(self.deadline)
+        elif self.mode == "hybrid" or (
+            self.mode == "vsync"
+            and time.perf_counter() - self.last < self.interval * PACER_VSYNC_MIN_SHARE
+        ):
+            now = self.wait_until(self.deadline)
+        else:
+            input_queue.poll()
+            now = time.perf_counter()
+
+        interval = now - self.last
+        self.last = now
+        self.intervals.add(interval * 1000)
+        dt = interval
+        if self.mode != "uncapped":
+            if not idle:
+                self.error.add(abs(interval - self.interval) * 1000)
+            if abs(interval - self.interval) < PACER_DT_SNAP:
+                dt = self.interval
+
+        self.deadline += self.interval
+        if self.deadline <= now:
+            self.deadline = now + self.interval  # Fell a whole frame behind; start over from here
+        return dt
+
+# === MEMORY ===
+# --memory traces Python allocations with tracemalloc and every
+# MEMORY_REPORT_INTERVAL seconds prints what grew since the last report,
+# grouped by subsystem, with live instance counts of the entity classes.
+# An allocation belongs to the innermost main.py function on its traceback:
+# names in MEMORY_SUBSYSTEMS pick the subsystem, anything else goes by the
+# section it sits in. Instances the game no longer lists (an enemy only a hit
+# set still holds, say) show as "unlisted". Surface pixels are allocated by
+# SDL, out of tracemalloc's sight, so the surface caches are sized directly.
+# After each game reset the traced total is taken as a baseline. If it ends
+# higher MEMORY_LEAK_RESETS resets in a row, by MEMORY_LEAK_MIN_GROWTH
+# overall, a leak alert names where the growth went. Tracing roughly doubles
+# the cost of allocating, so this is off by default.
+MEMORY_ENABLED = "--memory" in sys.argv
+MEMORY_REPORT_INTERVAL = 60.0        # seconds
+MEMORY_TRACE_FRAMES = 8              # Deep enough to get out of pygame and the stdlib
+MEMORY_TOP_LINES = 5
+MEMORY_LEAK_RESETS = 4
+MEMORY_LEAK_MIN_GROWTH = 64 * 1024   # bytes
+
+MEMORY_SUBSYSTEMS = {
+    "ENTITY CLASSES": "entities", "HELPERS": "entities",
+    "Explosion": "effects", "OrbExplosion": "effects",
+    "colorize_frame": "effects", "get_scaled_frames": "effects",
+    "RENDER QUEUE": "rendering", "PIPELINED RENDERING": "rendering", "CAPTURE": "rendering",
+    "render_text": "hud",
+    "SOUND": "audio",
+}
+
+class MemoryMonitor:
+    def __init__(self):
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+        self.main_file = os.path.abspath(__file__)
+        self.main_files = {__file__, self.main_file}  # Code may carry either spelling
+        self.build_line_map()
+        self.last_report = time.perf_counter()
+        self.last_snapshot = self.take_snapshot()
+        self.leak_start = None  # (traced bytes, snapshot) at the reset a growth run began
+        self.leak_last = 0
+        self.leak_resets = 0
+
+    def build_line_map(self):
+        # Start lines of every top-level def and class, and of every section
+        import ast
+        with open(self.main_file) as f:
+            source = f.read()
+        section_starts = []
+        for lineno, line in enumerate(source.splitlines(), 1):
+            if line.startswith("# === ") and line.rstrip().endswith(" ==="):
+                section_starts.append((lineno, line.strip("#= \n")))
+        self.section_lines = [lineno for lineno, _ in section_starts]
+        self.section_names = [name for _, name in section_starts]
+        self.defs = []  # (first line, last line, name)
+        for node in ast.parse(source).body:
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                self.defs.append((node.lineno, node.end_lineno, node.name))
+        self.def_lines = [first for first, _, _ in self.defs]
+
+    def subsystem_at(self, lineno):
+        index = bisect.bisect_right(self.def_lines, lineno) - 1
+        if index >= 0:
+            first, last, name = self.defs[index]
+            if lineno <= last and name in MEMORY_SUBSYSTEMS:
+                return MEMORY_SUBSYSTEMS[name]
+        index = bisect.bisect_right(self.section_lines, lineno) - 1
+        section = self.section_names[index] if index >= 0 else "CONFIG"
+        return MEMORY_SUBSYSTEMS.get(section, section.lower())
+
+    def subsystem_of(self, traceback):
+        # Tracebacks run oldest first
+        for frame in reversed(traceback):
+            if frame.filename in self.main_files:
+                return self.subsystem_at(frame.lineno)
+        return "other"
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def traced(self, snapshot):
+        # Totalled from a filtered snapshot; get_traced_memory() would count
+        # the snapshots this monitor keeps
+        return sum(stat.size for stat in snapshot.statistics("filename"))
+
+    def growth(self, old, new):
+        # Byte change per subsystem and the biggest changes by line
+        by_subsystem = {}
+        for stat in new.compare_to(old, "traceback"):
+            name = self.subsystem_of(stat.traceback)
+            by_subsystem[name] = by_subsystem.get(name, 0) + stat.size_diff
+        lines = new.compare_to(old, "lineno")[:MEMORY_TOP_LINES]
+        return by_subsystem, lines
+
+    def object_counts(self):
+        # Live instances per class against how many the game still lists
+        listed = {
+            "Player": 1, "Enemy": len(chickens) + len(geese) + len(crabs)
+                + (chunk_streamer.asleep if chunk_streamer is not None else 0),
+            "Item": len(items),
+            "Explosion": len(explosions), "OrbExplosion": len(orb_explosions),
+        }
+        counted = dict.fromkeys(listed, 0)
+        for obj in gc.get_objects():
+            name = type(obj).__name__
+            if name in counted and type(obj) is globals()[name]:
+                counted[name] += 1
+        return {name: (counted[name], listed[name]) for name in listed}
+
+    def surface_cache_sizes(self):
+        def size(surfaces):
+            return sum(s.get_width() * s.get_height() * s.get_bytesize() for s in surfaces)
+        scaled = [frame for frames in scaled_frames_cache.values() for frame in frames]
+        return {
+            "text": (len(text_cache), size(text_cache.values())),
+            "scaled": (len(scaled), size(scaled)),
+        }
+
+    def print_growth(self, title, by_subsystem, lines):
+        print(title)
+        for name, size in sorted(by_subsystem.items(), key=lambda item: -abs(item[1])):
+            if size:
+                print(f"  {name:<20}{size / 1024:+10.1f} KB")
+        for stat in lines:
+            if stat.size_diff:
+                frame = stat.traceback[0]
+                print(f"  {os.path.basename(frame.filename)}:{frame.lineno}  {stat.size_diff / 1024:+.1f} KB"
+                      f" ({stat.count_diff:+d} blocks)")
+
+    def maybe_report(self):
+        now = time.perf_counter()
+        if now - self.last_report < MEMORY_REPORT_INTERVAL:
+            return
+        snapshot = self.take_snapshot()
+        traced = self.traced(snapshot)
+        by_subsystem, lines = self.growth(self.last_snapshot, snapshot)
+        self.print_growth(f"Memory: {traced / 1024:.0f} KB traced, change over {now - self.last_report:.0f} s:",
+                          by_subsystem, lines)
+        print("  objects: " + ", ".join(
+            f"{name} {live}" + (f" ({live - shown:+d} unlisted)" if live != shown else "")
+            for name, (live, shown) in self.object_counts().items()))
+        print("  surface caches: " + ", ".join(
+            f"{name} {count} ({size / 1024:.0f} KB)" for name, (count, size) in self.surface_cache_sizes().items()))
+        metrics.set("memory_traced_kb", traced / 1024)
+        self.last_snapshot = snapshot
+        self.last_report = now
+
+    def on_reset(self):
+        # Called once reset_game has cleared the world, so every baseline is
+        # taken with the same things alive
+        gc.collect()
+        snapshot = self.take_snapshot()
+        traced = self.traced(snapshot)
+        if self.leak_start is None or traced <= self.leak_last:
+            self.leak_start = (traced, snapshot)
+            self.leak_resets = 0
+        else:
+            self.leak_resets += 1
+        self.leak_last = traced
+        start_traced, start_snapshot = self.leak_start
+        if self.leak_resets >= MEMORY_LEAK_RESETS and traced - start_traced >= MEMORY_LEAK_MIN_GROWTH:
+            by_subsystem, lines = self.growth(start_snapshot, snapshot)
+            self.print_growth(f"Memory leak alert: {(traced - start_traced) / 1024:.0f} KB more over the"
+                              f" last {self.leak_resets} resets, growing after each", by_subsystem, lines)
+            metrics.inc("memory_leak_alerts")
+            self.leak_start = (traced, snapshot)
+            self.leak_resets = 0
+
+memory_monitor = MemoryMonitor() if MEMORY_ENABLED else None
+
+# === SAMPLING PROFILER ===
+# --sample-profile PATH samples the main thread's stack from a background
+# thread (--sample-rate HZ times a second) and writes collapsed stacks for
+# flame graphs, see sampler.py. Each sample is filed under loop_phase, which
+# the main loop and simulate_frame set as they go; setting it is all the
+# markers cost, so they stay in whether or not anything is sampling.
+SAMPLE_PROFILE_FILE = arg_value("--sample-profile")
+loop_phase = "setup"
+
+sampling_profiler = None
+if SAMPLE_PROFILE_FILE:
+    import sampler
+    sampling_profiler = sampler.SamplingProfiler(
+        SAMPLE_PROFILE_FILE, float(arg_value("--sample-rate", sampler.SAMPLE_RATE)), lambda: loop_phase)
+
+# === FRAME GOVERNOR ===
+# Watches how long each tick takes against the frame budget. Under sustained
+# pressure it steps up one level at a time: first shedding cosmetics, then
+# throttling spawns. It steps back down once there is headroom again.
+GOVERNOR_ENABLED = "--no-governor" not in sys.argv
+FRAME_BUDGET = 1 / TICK_RATE
+GOVERNOR_SMOOTHING = 0.1       # EMA weight of the newest frame time
+GOVERNOR_PRESSURE = 0.9        # Share of the budget that counts as overloaded
+GOVERNOR_HEADROOM = 0.6        # Share of the budget that counts as relaxed
+GOVERNOR_ESCALATE_FRAMES = 30  # Overloaded frames in a row before stepping up
+GOVERNOR_RELAX_FRAMES = 180    # Relaxed frames in a row before stepping down
+
+# Levels, in the order load is shed
+LOD_EXPLOSION_FRAMES = 1   # Explosions skip every other animation frame
+LOD_CHARGE_EFFECT = 2      # No charge overlay around the player
+LOD_TELEGRAPHS = 3         # No wind-up lines for geese and crabs
+LOD_SPAWNS = 4             # Spawns slowed and chicken cap lowered, see below
+GOVERNOR_MAX_LEVEL = 5
+
+# Per spawn-throttle level: (spawn interval multiplier, chicken cap multiplier).
+# The cap never drops below BASE_MAX_CHICKENS.
+GOVERNOR_SPAWN_THROTTLE = [(1.25, 0.75), (1.5, 0.5)]
+
+class FrameGovernor:
+    def __init__(self, budget=FRAME_BUDGET):
+        self.budget = budget
+        self.level = 0
+        self.frame_time = 0.0
+        self.over_frames = 0
+        self.under_frames = 0
+
+    def record(self, frame_time):
+        self.frame_time += (frame_time - self.frame_time) * GOVERNOR_SMOOTHING
+        if self.frame_time > self.budget * GOVERNOR_PRESSURE:
+            self.over_frames += 1
+            self.under_frames = 0
+        elif self.frame_time < self.budget * GOVERNOR_HEADROOM:
+            self.under_frames += 1
+            self.over_frames = 0
+        else:
+            self.over_frames = 0
+            self.under_frames = 0
+
+        if GOVERNOR_ENABLED:
+            if self.over_frames >= GOVERNOR_ESCALATE_FRAMES and self.level < GOVERNOR_MAX_LEVEL:
+                self.level += 1
+                self.over_frames = 0
+                metrics.inc("governor_escalations")
+            elif self.under_frames >= GOVERNOR_RELAX_FRAMES and self.level > 0:
+                self.level -= 1
+                self.under_frames = 0
+                metrics.inc("governor_relaxations")
+
+        metrics.set("frame_ms", self.frame_time * 1000)
+        metrics.set("governor_level", self.level)
+        metrics.set("spawn_interval_scale", self.spawn_interval_scale)
+
+    @property
+    def explosion_frame_step(self):
+        return 2 if self.level >= LOD_EXPLOSION_FRAMES else 1
+
+    @property
+    def show_charge_effect(self):
+        return self.level < LOD_CHARGE_EFFECT
+
+    @property
+    def show_telegraphs(self):
+        return self.level < LOD_TELEGRAPHS
+
+    @property
+    def spawn_interval_scale(self):
+        if self.level < LOD_SPAWNS:
+            return 1.0
+        return GOVERNOR_SPAWN_THROTTLE[self.level - LOD_SPAWNS][0]
+
+    def chicken_cap(self, cap):
+        if self.level < LOD_SPAWNS:
+            return cap
+        factor = GOVERNOR_SPAWN_THROTTLE[self.level - LOD_SPAWNS][1]
+        return max(BASE_MAX_CHICKENS, int(cap * factor))
+
+governor = FrameGovernor()
+
+# === FLOW FIELD ===
+# One navigation grid over the arena, shared by every enemy. Its distances to
+# the player's cell are only searched again when the player moves to another
+# cell, the search window moves or the walls change. Cells that can see the
+# player's cell sample as None and enemies there steer straight at the
+# player. The others get a unit vector along the shortest 8-way path around
+# the walls. A cell's direction is worked out the first time an enemy there
+# asks for it and kept until the next search, so only occupied cells pay for
+# the line of sight check. With no walls nothing is ever searched.
+#
+# In a scrolling arena the search only covers the awake chunks around the
+# view (see ARENA). Cells outside them sample as None too, so drowsy enemies
+# walk straight at the player like dormant ones, and a search costs the same
+# however big the arena is.
+#
+# --walls X,Y,W,H[:X,Y,W,H...] puts walls into the arena, in arena pixels.
+FLOW_CELL_SIZE = 16
+WALL_COLOR = (70, 70, 90)
+
+ARENA_WALLS = []  # Rects in arena pixels, e.g. (120, 80, 16, 96)
+if "--walls" in sys.argv:
+    try:
+        ARENA_WALLS = [tuple(int(n) for n in rect.split(",")) for rect in arg_value("--walls", "").split(":")]
+    except ValueError:
+        ARENA_WALLS = None
+    if not ARENA_WALLS or any(len(rect) != 4 for rect in ARENA_WALLS):
+        sys.exit("--walls must be X,Y,W,H[:X,Y,W,H...], e.g. 120,80,16,96")
+
+FLOW_NEIGHBOURS = [(dc, dr, math.hypot(dc, dr))
+                   for dc in (-1, 0, 1) for dr in (-1, 0, 1) if dc or dr]
+
+class FlowField:
+    def __init__(self, width, height, cell_size=FLOW_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cols = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
+        self.blocked = bytearray(self.cols * self.rows)
+        self.wall_count = 0
+        self.wall_boxes = []  # Each wall's cells, in cell units, see line_of_sight
+        self.dist = None      # Path length to the goal per cell, from the last search
+        self.dirs = {}        # Cell -> direction, filled in by sample()
+        self.goal = None
+        self.window = None    # (col0, row0, col1, row1) of the cells searched
+
+    def set_walls(self, rects):
+        self.blocked = bytearray(self.cols * self.rows)
+        self.wall_boxes = []
+        for x, y, w, h in rects:
+            rows = range(max(0, y // self.cell_size), min(self.rows, -(-(y + h) // self.cell_size)))
+            cols = range(max(0, x // self.cell_size), min(self.cols, -(-(x + w) // self.cell_size)))
+            for row in rows:
+                for col in cols:
+                    self.blocked[row * self.cols + col] = 1
+            if rows and cols:
+                # Half a cell wider all round, as line_of_sight rounds to cells
+                self.wall_boxes.append((cols[0] - 0.501, rows[0] - 0.501, cols[-1] + 0.501, rows[-1] + 0.501))
+        self.wall_count = sum(self.blocked)
+        self.dist = None
+        self.dirs = {}
+        self.goal = None
+
+    def cell_index(self, x, y):
+        col = min(max(int(x) // self.cell_size, 0), self.cols - 1)
+        row = min(max(int(y) // self.cell_size, 0), self.rows - 1)
+        return row * self.cols + col
+
+    def sample(self, x, y):
+        index = self.cell_index(x, y)
+        if index not in self.dirs:
+            self.dirs[index] = self.direction(index)
+        return self.dirs[index]
+
+    def update(self, target_x, target_y, window=None):
+        # window: (left, top, right, bottom) in pixels to search, or None for
+        # the whole field
+        goal = self.cell_index(target_x, target_y)
+        if window is None:
+            cells = (0, 0, self.cols - 1, self.rows - 1)
+        else:
+            left, top, right, bottom = window
+            size = self.cell_size
+            cells = (max(left // size, 0), max(top // size, 0),
+                     min((right - 1) // size, self.cols - 1), min((bottom - 1) // size, self.rows - 1))
+        if goal == self.goal and cells == self.window:
+            return
+        self.goal = goal
+        self.window = cells
+        if self.wall_count:
+            self.rebuild()
+            metrics.inc("flow_field_rebuilds")
+
+    def line_of_sight(self, a, b):
+        # Steps from cell a to cell b, rounding to the nearest cell, and
+        # reports whether none of the cells in between is a wall
+        cols, blocked = self.cols, self.blocked
+        c0, r0 = a % cols, a // cols
+        c1, r1 = b % cols, b // cols
+        dc, dr = c1 - c0, r1 - r0
+        steps = max(abs(dc), abs(dr))
+        # A stepped cell lies within half a cell of the line, so a wall cell
+        # can only be stepped on where the line crosses a wall box. Only
+        # those stretches (clipped the Liang-Barsky way) are walked.
+        for left, top, right, bottom in self.wall_boxes:
+            t0, t1 = 0.0, 1.0
+            if dc:
+                ta, tb = (left - c0) / dc, (right - c0) / dc
+                if ta > tb:
+                    ta, tb = tb, ta
+                t0, t1 = max(t0, ta), min(t1, tb)
+            elif not left <= c0 <= right:
+                continue
+            if dr:
+                ta, tb = (top - r0) / dr, (bottom - r0) / dr
+                if ta > tb:
+                    ta, tb = tb, ta
+                t0, t1 = max(t0, ta), min(t1, tb)
+            elif not top <= r0 <= bottom:
+                continue
+            for i in range(max(1, math.ceil(t0 * steps)), min(steps - 1, math.floor(t1 * steps)) + 1):
+                col = round(c0 + dc * i / steps)
+                row = round(r0 + dr * i / steps)
+                if blocked[row * cols + col]:
+                    return False
+        return True
+
+    def rebuild(self):
+        cols, blocked = self.cols, self.blocked
+        col0, row0, col1, row1 = self.window
+        dist = [math.inf] * (cols * self.rows)
+        dist[self.goal] = 0.0
+        heap = [(0.0, self.goal)]
+        while heap:
+            d, index = heapq.heappop(heap)
+            if d > dist[index]:
+                continue
+            col, row = index % cols, index // cols
+            for dc, dr, cost in FLOW_NEIGHBOURS:
+                c, r = col + dc, row + dr
+                if not (col0 <= c <= col1 and row0 <= r <= row1):
+                    continue
+                n = r * cols + c
+                # No cutting corners past a wall
+                if blocked[n] or (dc and dr and (blocked[row * cols + c] or blocked[r * cols + col])):
+                    continue
+                if d + cost < dist[n]:
+                    dist[n] = d + cost
+                    heapq.heappush(heap, (d + cost, n))
+        self.dist = dist
+        self.dirs = {}
+
+    def direction(self, index):
+        # Towards the neighbour closest to the goal, or None to go straight
+        dist, blocked, cols = self.dist, self.blocked, self.cols
+        if dist is None or blocked[index] or dist[index] == math.inf or self.line_of_sight(index, self.goal):
+            return None
+        col, row = index % cols, index // cols
+        best, best_dc, best_dr = dist[index], 0, 0
+        for dc, dr, _ in FLOW_NEIGHBOURS:
+            c, r = col + dc, row + dr
+            # Cells outside the window were never reached, so their distance
+            # is still inf
+            if 0 <= c < cols and 0 <= r < self.rows and dist[r * cols + c] < best:
+                if dc and dr and (blocked[row * cols + c] or blocked[r * cols + col]):
+                    continue
+                best, best_dc, best_dr = dist[r * cols + c], dc, dr
+        length = math.hypot(best_dc, best_dr)
+        if length:
+            return (best_dc / length, best_dr / length)
+        return None
+
+flow_field = FlowField(ARENA_WIDTH, ARENA_HEIGHT)
+flow_field.set_walls(ARENA_WALLS)
+
+# === TIMERS ===
+# Countdowns (spawns, warnings, invincibility, charge phases, item and orb
+# lifetimes) sit on a hierarchical timing wheel instead of being decremented
+# every frame. Level 0 has TIMER_SLOTS slots of one TIMER_TICK each, and a
+# slot on each level above spans a whole turn of the level below. A timer
+# waits on the coarsest level that can hold it and drops down as its slot
+# comes round, so a frame only visits the slots it passes and a timer far
+# from expiry costs nothing until then.
+TIMER_TICK = 0.001  # seconds
+TIMER_SLOTS = 64
+TIMER_LEVELS = 4    # Turns of 64 ms, 4 s, 4 min and 4.7 h; longer waits in overflow
+
+class Timer:
+    def __init__(self, wheel, deadline, callback, args):
+        self.wheel = wheel
+        self.deadline = deadline  # In ticks
+        self.callback = callback
+        self.args = args
+        self.active = True
+
+    @property
+    def remaining(self):
+        if not self.active:
+            return 0.0
+        return max(0, self.deadline - self.wheel.tick) * TIMER_TICK
+
+    def cancel(self):
+        # Skipped, rather than removed, when its slot comes round
+        self.active = False
+
+class TimingWheel:
+    def __init__(self):
+        self.tick = 0
+        self.clear()
+
+    def clear(self):
+        self.slots = [[[] for _ in range(TIMER_SLOTS)] for _ in range(TIMER_LEVELS)]
+        self.overflow = []
+        self.due = []
+        self.carry = 0.0  # Time not yet making up a whole tick
+
+    def after(self, delay, callback=None, *args):
+        ticks = max(0, math.ceil(delay / TIMER_TICK - 1e-6))
+        timer = Timer(self, self.tick + ticks, callback, args)
+        self.insert(timer)
+        return timer
+
+    def insert(self, timer):
+        delta = timer.deadline - self.tick
+        if delta <= 0:
+            self.due.append(timer)
+            return
+        span = 1
+        for level in range(TIMER_LEVELS):
+            if delta < span * TIMER_SLOTS:
+                self.slots[level][timer.deadline // span % TIMER_SLOTS].append(timer)
+                return
+            span *= TIMER_SLOTS
+        self.overflow.append(timer)
+
+    def advance(self, dt):
+        self.carry += dt
+        ticks = int(self.carry / TIMER_TICK + 1e-6)
+        self.carry -= ticks * TIMER_TICK
+        self.fire_due()
+        for _ in range(ticks):
+            self.tick += 1
+            # Each level turns over once the one below has wrapped; its
+            # current slot is spread over the levels below
+            span = TIMER_SLOTS
+            for level in range(1, TIMER_LEVELS + 1):
+                if self.tick % span:
+                    break
+                if level == TIMER_LEVELS:
+                    bucket, self.overflow = self.overflow, []
+                else:
+                    index = self.tick // span % TIMER_SLOTS
+                    bucket = self.slots[level][index]
+                    self.slots[level][index] = []
+                for timer in bucket:
+                    if timer.active:
+                        self.insert(timer)
+                span *= TIMER_SLOTS
+            index = self.tick % TIMER_SLOTS
+            if self.slots[0][index]:
+                self.due.extend(self.slots[0][index])
+                self.slots[0][index] = []
+            self.fire_due()
+
+    def fire_due(self):
+        # Callbacks may schedule timers that are already due
+        while self.due:
+            due, self.due = self.due, []
+            for timer in due:
+                if timer.active:
+                    timer.active = False
+                    if timer.callback is not None:
+                        timer.callback(*timer.args)
+
+timers = TimingWheel()
+
+# === ANIMATION ===
+# Animations keep no per-frame state. An entity stores when its clip started,
+# and the frame to show is worked out from sim_time only when it is drawn or
+# its hitbox is needed. sim_time is the world clock: simulate_frame advances
+# it, and it stops while the game-over screen is up.
+sim_time = 0.0
+
+class Clip:
+    # Clips hold a frame count rather than frames, since most entities pick a
+    # left or right frame list by facing
+    def __init__(self, length, fps, loop=True):
+        self.length = length
+        self.fps = fps
+        self.loop = loop
+
+    def index(self, start, step=1):
+        # Whole frame periods since start; step > 1 skips frames, which also
+        # shortens a one-shot clip
+        index = int((sim_time - start) * self.fps + 1e-6) * step
+        if self.loop:
+            return index % self.length
+        return min(index, self.length - 1)
+
+    def finished(self, start, step=1):
+        return not self.loop and int((sim_time - start) * self.fps + 1e-6) * step >= self.length
+
+RUN_CLIP = Clip(NUM_FRAMES, ANIMATION_FPS)
+FIRE_CLIP = Clip(4, ANIMATION_FPS, loop=False)
+CHARGE_CLIP = Clip(NUM_FRAMES, ANIMATION_FPS)
+FIREBALL_CLIP = Clip(NUM_FRAMES, ANIMATION_FPS)
+ORB_CLIP = Clip(4, 1 / 0.12)
+EXPLOSION_CLIP = Clip(len(frames_explosion), ANIMATION_FPS, loop=False)
+ORB_EXPLOSION_CLIP = Clip(len(piercing_orb_explosion_frames), 1 / 0.07, loop=False)
+CHARGE_FULL_CLIP = Clip(len(charge_full_anim), 1 / 0.15)
 
 # === HELPERS ===
 def clamp(n, smallest, largest):
@@ -214,11 +1549,12 @@ def colorize_frame(base_frame, rgb):
     return frame
 
 def clamp_to_playfield(x, y, w, h):
-    clamped_x = clamp(x, 0, GAME_WIDTH - w)
-    clamped_y = clamp(y, 0, GAME_HEIGHT - PANEL_HEIGHT - h)
+    clamped_x = clamp(x, 0, ARENA_WIDTH - w)
+    clamped_y = clamp(y, 0, ARENA_HEIGHT - h)
     return clamped_x, clamped_y
 
 def spawn_entity_outside(frames_right, frames_left, type, speed=32):
+    # Just off one edge of the view
     side = random.choice([0, 1, 2, 3])
     if side == 0:
         x = -FRAME_WIDTH * SCALE
@@ -232,22 +1568,26 @@ def spawn_entity_outside(frames_right, frames_left, type, speed=32):
     else:
         x = random.randint(0, GAME_WIDTH - FRAME_WIDTH * SCALE)
         y = GAME_HEIGHT
-    return Enemy(x, y, frames_right, frames_left, type, speed=speed)
+    return Enemy(camera_x + x, camera_y + y, frames_right, frames_left, type, speed=speed)
 
-def animate_entity(entity, dt, move_x=0, move_y=0, num_frames=4, anim_fps=7):
-    if move_x or move_y:
+def animate_entity(entity, dt, move_x=0, move_y=0):
+    # Moves the entity; its run cycle restarts from frame 0 whenever it sets
+    # off, and it shows frame 0 while standing
+    moving = bool(move_x or move_y)
+    if moving:
         entity.x += move_x * entity.speed * dt
         entity.y += move_y * entity.speed * dt
         if move_x > 0:
             entity.facing = "right"
         elif move_x < 0:
             entity.facing = "left"
-        entity.timer += dt
-        if entity.timer >= 1 / anim_fps:
-            entity.timer -= 1 / anim_fps
-            entity.frame_idx = (entity.frame_idx + 1) % num_frames
-    else:
-        entity.frame_idx = 0
+        if not entity.moving:
+            entity.anim_start = sim_time
+    entity.moving = moving
+
+# Chickens closer than two radii get pushed apart; see simulate_frame
+CHICKEN_SEPARATION_CELL = math.ceil(2 * max(FRAME_HITBOXES[frame].radius
+                                            for frame in chicken_frames_right + chicken_frames_left))
 
 def push_chickens_away_from_enemy(enemy, chickens, fudge=2):
     ex, ey, er = enemy.get_circle()
@@ -263,74 +1603,135 @@ def push_chickens_away_from_enemy(enemy, chickens, fudge=2):
             chicken.x += nx * overlap
             chicken.y += ny * overlap
 
-def handle_enemy_charge(enemy, player_x, player_y, dt, *,
-                        charge_cooldown_range,
-                        charge_duration,
-                        charge_speed,
-                        charge_windup,
-                        charge_degree_limit=None):
-    # Charging phase
-    if getattr(enemy, 'is_charging', False):
+def charge_settings(enemy):
+    # (cooldown range, windup, duration, speed, degree limit) for geese and crabs
+    if enemy.type == "goose":
+        return (GOOSE_CHARGE_COOLDOWN, GOOSE_CHARGE_WINDUP, GOOSE_CHARGE_DURATION,
+                GOOSE_CHARGE_SPEED, None)
+    return (CRAB_CHARGE_COOLDOWN, CRAB_CHARGE_WINDUP, CRAB_CHARGE_DURATION,
+            CRAB_CHARGE_SPEED, CRAB_CHARGE_DEGREE_LIMIT)
+
+def init_enemy_charge(enemy):
+    enemy.is_charging = False
+    enemy.charge_dx = 0.0
+    enemy.charge_dy = 0.0
+    enemy.is_winding_up = False
+    enemy.charge_target_x = 0.0
+    enemy.charge_target_y = 0.0
+    schedule_charge_phase(enemy)
+
+def schedule_charge_phase(enemy, time_left=None):
+    # A charge cycles cooldown -> windup -> charge, each phase ending in a
+    # timer callback. time_left restores a phase from a snapshot.
+    cooldown_range, windup, duration, _, _ = charge_settings(enemy)
+    if enemy.is_charging:
+        callback = end_charge
+        length = duration
+    elif enemy.is_winding_up:
+        callback = begin_charge
+        length = windup
+    else:
+        callback = begin_windup
+        length = None  # Drawn below, so restoring does not touch the RNG
+    if time_left is None:
+        time_left = length if length is not None else random.uniform(*cooldown_range)
+    enemy.phase_timer = timers.after(time_left, callback, enemy)
+
+def enemy_list(enemy):
+    if enemy.type == "goose":
+        return geese
+    if enemy.type == "crab":
+        return crabs
+    return chickens
+
+def enemy_alive(enemy):
+    return enemy in enemy_list(enemy)
+
+def begin_windup(enemy):
+    if not enemy_alive(enemy):
+        return
+    _, _, charge_duration, charge_speed, charge_degree_limit = charge_settings(enemy)
+    dx = player.x - enemy.x
+    dy = player.y - enemy.y
+    angle = math.atan2(dy, dx)
+    if charge_degree_limit is not None:
+        base_angle = 0 if dx >= 0 else math.pi
+        delta_angle = angle - base_angle
+
+        while delta_angle < -math.pi:
+            delta_angle += 2 * math.pi
+        while delta_angle > math.pi:
+            delta_angle -= 2 * math.pi
+
+        max_rad = math.radians(charge_degree_limit)
+        clamped_delta = max(-max_rad, min(max_rad, delta_angle))
+        charge_angle = base_angle + clamped_delta
+        enemy.charge_dx = math.cos(charge_angle)
+        enemy.charge_dy = math.sin(charge_angle)
+    else:
+        dist = math.hypot(dx, dy)
+        if dist == 0:
+            enemy.charge_dx = 0
+            enemy.charge_dy = 0
+        else:
+            enemy.charge_dx = dx / dist
+            enemy.charge_dy = dy / dist
+    enemy.charge_target_x = enemy.x + enemy.charge_dx * int(charge_speed * charge_duration)
+    enemy.charge_target_y = enemy.y + enemy.charge_dy * int(charge_speed * charge_duration)
+    enemy.is_winding_up = True
+    schedule_charge_phase(enemy)
+
+def begin_charge(enemy):
+    if enemy_alive(enemy):
+        enemy.is_winding_up = False
+        enemy.is_charging = True
+        schedule_charge_phase(enemy)
+
+def end_charge(enemy):
+    if enemy_alive(enemy):
+        enemy.is_charging = False
+        schedule_charge_phase(enemy)
+
+def handle_enemy_charge(enemy, player_x, player_y, dt):
+    # Phase changes happen in the callbacks above; this only moves the enemy
+    if enemy.is_charging:
+        charge_speed = charge_settings(enemy)[3]
         enemy.x += enemy.charge_dx * charge_speed * dt
         enemy.y += enemy.charge_dy * charge_speed * dt
         w = enemy.frames_right[0].get_width()
         h = enemy.frames_right[0].get_height()
         enemy.x, enemy.y = clamp_to_playfield(enemy.x, enemy.y, w, h)
-        enemy.charge_time_left -= dt
-        if enemy.charge_time_left <= 0:
-            enemy.is_charging = False
-            enemy.charge_timer = random.uniform(*charge_cooldown_range)
-    elif getattr(enemy, 'is_winding_up', False):
-        enemy.windup_time_left -= dt
-        if enemy.windup_time_left <= 0:
-            enemy.is_winding_up = False
-            enemy.is_charging = True
-            enemy.charge_time_left = charge_duration
-    else:
-        enemy.charge_timer -= dt
-        if enemy.charge_timer <= 0:
-            dx = player_x - enemy.x
-            dy = player_y - enemy.y
-            angle = math.atan2(dy, dx)
-            if charge_degree_limit is not None:
-                base_angle = 0 if dx >= 0 else math.pi
-                delta_angle = angle - base_angle
-
-                while delta_angle < -math.pi:
-                    delta_angle += 2 * math.pi
-                while delta_angle > math.pi:
-                    delta_angle -= 2 * math.pi
-
-                max_rad = math.radians(charge_degree_limit)
-                clamped_delta = max(-max_rad, min(max_rad, delta_angle))
-                charge_angle = base_angle + clamped_delta
-                enemy.charge_dx = math.cos(charge_angle)
-                enemy.charge_dy = math.sin(charge_angle)
-            else:
-                dist = math.hypot(dx, dy)
-                if dist == 0:
-                    enemy.charge_dx = 0
-                    enemy.charge_dy = 0
-                else:
-                    enemy.charge_dx = dx / dist
-                    enemy.charge_dy = dy / dist
-            enemy.charge_target_x = enemy.x + enemy.charge_dx * int(charge_speed * charge_duration)
-            enemy.charge_target_y = enemy.y + enemy.charge_dy * int(charge_speed * charge_duration)
-            enemy.is_winding_up = True
-            enemy.windup_time_left = charge_windup
-        else:
-            # Move slowly towards player (homing)
-            enemy.update(dt, player_x, player_y)
+    elif not enemy.is_winding_up:
+        # Move slowly towards player (homing)
+        enemy.update(dt, player_x, player_y)
+
+def charge_stage_after(seconds):
+    # Stage reached after charging for this long
+    if seconds >= CHARGE_STAGE_2:
+        return 2
+    if seconds >= CHARGE_STAGE_1:
+        return 1
+    return 0
 
 def spawn_fireball(player, direction, charge_stage):
     BULLET_SPAWN_FACTOR = 0.5 # half way from the player origin
     x = player.x + (FRAME_WIDTH * SCALE * BULLET_SPAWN_FACTOR if direction == "right" else -FRAME_WIDTH * SCALE * BULLET_SPAWN_FACTOR)
     y = player.y  # Adjust for your origin
-    bullets.append(Bullet(x, y, direction, charge_stage=charge_stage))
+    vx = BULLET_SPEED if direction == "right" else -BULLET_SPEED
+    get_projectile_store().add(projectiles.BULLET, x, y, vx, 0.0, sim_time,
+                               stage=charge_stage, pierce=charge_stage >= 1)  # Only stage 1 and 2 pierce
 
-def handle_enemy_death(enemy, kind, items, explosions, explosion_type="normal"):
+def handle_enemy_death(enemy, kind, items, explosions, explosion_type="normal", weapon="bullet", stage=None):
     global score
 
+    if stage is None:
+        log_event("kill", enemy=kind, weapon=weapon)
+    else:
+        log_event("kill", enemy=kind, weapon=weapon, stage=stage)
+
+    w, h = enemy.frames_right[0].get_size()
+    emit_particles(ENEMY_DEATH_PARTICLES[kind], enemy.x + w / 2, enemy.y + h / 2)
+
     if explosion_type == "orb":
         orb_explosions.append(OrbExplosion(enemy.x, enemy.y))
     else:
@@ -346,18 +1747,70 @@ def handle_enemy_death(enemy, kind, items, explosions, explosion_type="normal"):
     elif kind == "crab":
         score += SCORE_CRAB
 
+def invincibility_left():
+    return invincibility_timer.remaining if invincibility_timer is not None else 0.0
+
+def spawn_chicken():
+    global chicken_spawn_timer
+    chicken_spawn_timer = None
+    chickens.append(spawn_entity_outside(chicken_frames_right, chicken_frames_left, "chicken"))
+
+def start_goose_warning():
+    global goose_spawn_timer, goose_warning_timer, goose_pending_spawn
+    goose_spawn_timer = None
+    goose_pending_spawn = True
+    goose_warning_timer = timers.after(GOOSE_WARNING_TIME, spawn_goose)
+
+def spawn_goose():
+    global goose_warning_timer, goose_pending_spawn
+    goose_warning_timer = None
+    goose_pending_spawn = False
+    new_goose = spawn_entity_outside(goose_frames_right, goose_frames_left, "goose", speed=GOOSE_SPEED)
+    geese.append(new_goose)
+    init_enemy_charge(new_goose)
+
+def start_crab_warning():
+    global crab_spawn_timer, crab_warning_timer, crab_pending_spawn
+    crab_spawn_timer = None
+    crab_pending_spawn = True
+    crab_warning_timer = timers.after(CRAB_WARNING_TIME, spawn_crab)
+
+def spawn_crab():
+    global crab_warning_timer, crab_pending_spawn
+    crab_warning_timer = None
+    crab_pending_spawn = False
+    new_crab = spawn_entity_outside(crab_frames_right, crab_frames_left, "crab", speed=CRAB_SPEED)
+    crabs.append(new_crab)
+    init_enemy_charge(new_crab)
+
+def reset_spawn_timers():
+    # Drops pending spawns and warnings. The first crab comes straight away.
+    global chicken_spawn_timer, goose_spawn_timer, goose_warning_timer, goose_pending_spawn
+    global crab_spawn_timer, crab_warning_timer, crab_pending_spawn
+    for timer in (chicken_spawn_timer, goose_spawn_timer, goose_warning_timer,
+                  crab_spawn_timer, crab_warning_timer):
+        if timer is not None:
+            timer.cancel()
+    chicken_spawn_timer = None
+    goose_spawn_timer = None
+    goose_warning_timer = None
+    goose_pending_spawn = False
+    crab_spawn_timer = None
+    crab_pending_spawn = True
+    crab_warning_timer = timers.after(0, spawn_crab)
+
 def reset_game():
     global player
-    player = Player(GAME_WIDTH // 2, GAME_HEIGHT // 2)
-    global player_health, egg_inventory, score, chickens, bullets, items, explosions, invincibility_timer
+    player = Player(*PLAYER_START)
+    update_camera()
+    global player_health, egg_inventory, score, chickens, items, explosions, invincibility_timer
     player_health = MAX_HEALTH
     egg_inventory = 0
     score = 0
     chickens.clear()
     geese.clear()
     crabs.clear()
-    global chicken_spawn_timer
-    chicken_spawn_timer = CHICKEN_SPAWN_INTERVAL
+    reset_spawn_timers()
     global goose_present, goose_enemy, goose_respawn_timer
     global goose_ready_to_spawn, goose_random_delay
     goose_present = False
@@ -366,22 +1819,24 @@ def reset_game():
     goose_ready_to_spawn = False
     goose_random_delay = 0.0
     global crab_present, crab_enemy, crab_respawn_timer, crab_ready_to_spawn, crab_random_delay
-    global crab_warning_timer
-    crab_warning_timer = 0.0
     crab_present = False
     crab_enemy = None
     crab_respawn_timer = CRAB_SPAWN_INTERVAL
     crab_ready_to_spawn = False
     crab_random_delay = 0.0
-    global charge_anim_timer, charge_anim_idx
-    charge_anim_timer = 0.0
-    charge_anim_idx = 0
-    bullets.clear()
+    if projectile_store is not None:
+        projectile_store.clear(projectiles.BULLET)
     items.clear()
     explosions.clear()
     for _ in range(BASE_MAX_CHICKENS):
         chickens.append(spawn_entity_outside(chicken_frames_right, chicken_frames_left, "chicken"))
-    invincibility_timer = 0.0
+    invincibility_timer = None
+    clear_contacts()
+    if chunk_streamer is not None:
+        chunk_streamer.reset()
+    start_run()
+    if memory_monitor is not None:
+        memory_monitor.on_reset()
 
 def maybe_drop_item(chicken, items):
     rand = random.random()
@@ -418,22 +1873,21 @@ class Player:
         self.x = x
         self.y = y
         self.facing = "right"
-        self.frame_idx = 0
-        self.timer = 0
+        self.moving = False
+        self.anim_start = sim_time
         self.speed = speed
         self.firing = False
-        self.fire_frame = 0
-        self.fire_timer = 0
+        self.fire_start = sim_time
         self.charging = False
         self.charge_timer = 0.0
         self.charge_stage = 0
-        self.charge_anim_frame = 0
-        self.charge_anim_timer = 0.0
+        self.charge_anim_start = sim_time
         self.pending_bullet_stage = None  # Stage to use when firing animation finishes
         self.facing_locked = False
         self.facing_locked_dir = self.facing
         self.charge_sfx_played = [False, False]  # For stage 1 and 2
         self.pending_fire = False
+        self.fire_press_time = sim_time  # When space went down, see event_time
 
     def update(self, dt, keys, firing_allowed, is_charging=False):
         move_x = (keys[pygame.K_RIGHT] or keys[pygame.K_d]) - (keys[pygame.K_LEFT] or keys[pygame.K_a])
@@ -452,55 +1906,60 @@ class Player:
         elif is_charging:
             move_mult = PLAYER_CHARGE_MOVE_MULT
 
-        animate_entity(self, dt, norm_x * move_mult, norm_y * move_mult, num_frames=NUM_FRAMES, anim_fps=ANIMATION_FPS)
+        animate_entity(self, dt, norm_x * move_mult, norm_y * move_mult)
 
         self.x, self.y = clamp_to_playfield(self.x, self.y, FRAME_WIDTH * SCALE, FRAME_HEIGHT * SCALE)
 
+    @property
+    def frame_idx(self):
+        return RUN_CLIP.index(self.anim_start) if self.moving else 0
+
+    @property
+    def fire_frame(self):
+        return FIRE_CLIP.index(self.fire_start)
+
+    @property
+    def charge_anim_frame(self):
+        return CHARGE_CLIP.index(self.charge_anim_start)
+
+    def get_hitbox(self):
+        return (PLAYER_HITBOX, self.x, self.y)
+
     def get_circle(self):
-        w = frames_run_right[0].get_width()
-        h = frames_run_right[0].get_height()
-        cx = self.x + w // 2
-        cy = self.y + h // 2
-        radius = int(w * 0.1)
-        return (cx, cy, radius)
+        return (self.x + PLAYER_HITBOX.cx, self.y + PLAYER_HITBOX.cy, PLAYER_HITBOX.radius)
 
     def get_rect(self):
-        w = frames_run_right[0].get_width()
-        h = frames_run_right[0].get_height()
-        return pygame.Rect(self.x, self.y, w, h)
+        return pygame.Rect(self.x, self.y, FRAME_WIDTH * SCALE, FRAME_HEIGHT * SCALE)
+
+    def get_bounds(self):
+        return sprite_bounds(self.x, self.y, frames_run_right[0])
 
-    def draw(self, surface, invincible, firing):
+    def draw(self, queue, invincible, firing):
         sprite = None
         facing = self.facing_locked_dir if self.facing_locked else self.facing
         if self.charging:
             charge_frames = frames_charge_right if facing == "right" else frames_charge_left
-            sprite = charge_frames[self.charge_anim_frame % NUM_FRAMES]
+            sprite = charge_frames[self.charge_anim_frame]
         elif firing:
-            sprite = frames_fire_right[min(self.fire_frame, 3)] if facing == "right" else frames_fire_left[min(self.fire_frame, 3)]
+            sprite = frames_fire_right[self.fire_frame] if facing == "right" else frames_fire_left[self.fire_frame]
         else:
-            if invincible and int(invincibility_timer * 10) % 2 == 0:
+            if invincible and int(invincibility_left() * 10) % 2 == 0:
                 sprite = None  # Flicker effect
             else:
                 sprite = frames_run_right[self.frame_idx] if facing == "right" else frames_run_left[self.frame_idx]
         if sprite:
-            surface.blit(sprite, (int(self.x), int(self.y)))
+            queue.add(sprite, (int(self.x), int(self.y)), LAYER_ACTORS)
     
-    def update_firing(self, dt):
-        if player.firing:
-            player.fire_timer += dt
-            if player.fire_timer >= 1 / ANIMATION_FPS:
-                player.fire_timer -= 1 / ANIMATION_FPS
-                player.fire_frame += 1
-                if player.fire_frame >= 4:
-                    player.firing = False
-                    player.fire_frame = 0
-                    return True
+    def update_firing(self):
+        # The shot leaves once the firing animation has played through
+        if player.firing and FIRE_CLIP.finished(player.fire_start):
+            player.firing = False
+            return True
         return False
 
     def start_firing(self):
         player.firing = True
-        player.fire_frame = 0
-        player.fire_timer = 0
+        player.fire_start = sim_time
 
 class Enemy:
     def __init__(self, x, y, frames_right, frames_left, type, speed=32):
@@ -509,180 +1968,114 @@ class Enemy:
         self.frames_right = frames_right
         self.frames_left = frames_left
         self.facing = "right"
-        self.frame_idx = 0
-        self.timer = 0
+        self.moving = False
+        self.anim_start = sim_time
         self.speed = speed
         self.type = type
 
-    def update(self, dt, target_x, target_y):
-        dx = target_x - self.x
-        dy = target_y - self.y
-        distance = math.hypot(dx, dy)
-        if distance != 0:
-            move_x = dx / distance
-            move_y = dy / distance
-        else:
-            move_x, move_y = 0, 0
-        animate_entity(self, dt, move_x, move_y, num_frames=NUM_FRAMES, anim_fps=ANIMATION_FPS)
+    @property
+    def frame_idx(self):
+        # RUN_CLIP.index spelled out, since every hitbox lookup lands here
+        if self.moving:
+            return int((sim_time - self.anim_start) * ANIMATION_FPS + 1e-6) % NUM_FRAMES
+        return 0
 
+    def update(self, dt, target_x, target_y):
         w = self.frames_right[0].get_width()
         h = self.frames_right[0].get_height()
+
+        steer = flow_field.sample(self.x + w // 2, self.y + h // 2)
+        if steer is not None:
+            move_x, move_y = steer
+        else:
+            # Clear line of sight: head straight for the target
+            dx = target_x - self.x
+            dy = target_y - self.y
+            distance = math.hypot(dx, dy)
+            if distance != 0:
+                move_x = dx / distance
+                move_y = dy / distance
+            else:
+                move_x, move_y = 0, 0
+        animate_entity(self, dt, move_x, move_y)
+
         center_x = self.x + w // 2
         center_y = self.y + h // 2
 
         margin = 20  # Tweak as needed
 
-        min_x, max_x = 0 + margin, GAME_WIDTH - margin
-        min_y, max_y = 0 + margin, GAME_HEIGHT - PANEL_HEIGHT - margin
+        min_x, max_x = 0 + margin, ARENA_WIDTH - margin
+        min_y, max_y = 0 + margin, ARENA_HEIGHT - margin
 
         if min_x < center_x < max_x and min_y < center_y < max_y:
             self.x, self.y = clamp_to_playfield(self.x, self.y, w, h)
 
-    def draw(self, surface):
+    def draw(self, queue):
         frames = self.frames_right if self.facing == "right" else self.frames_left
-        surface.blit(frames[self.frame_idx], (int(self.x), int(self.y)))
+        queue.add(frames[self.frame_idx], (int(self.x), int(self.y)), LAYER_ACTORS)
 
-    def get_rect(self):
+    def get_hitbox(self):
         frames = self.frames_right if self.facing == "right" else self.frames_left
-        frame = frames[self.frame_idx]
-        w, h = frame.get_width(), frame.get_height()
-        return pygame.Rect(self.x, self.y, w, h)
+        return (FRAME_HITBOXES[frames[self.frame_idx]], self.x, self.y)
+
+    def get_rect(self):
+        hitbox, x, y = self.get_hitbox()
+        return hitbox.rect.move(int(x), int(y))
 
     def get_circle(self):
-        frames = self.frames_right if self.facing == "right" else self.frames_left
-        frame = frames[self.frame_idx]
-        w, h = frame.get_width(), frame.get_height()
-        cx = self.x + w // 2
-        cy = self.y + h // 2
-        radius = w // 2
-        return (cx, cy, radius)
-
-class Bullet:
-    def __init__(self, x, y, direction, charge_stage=0):
-        self.x = x
-        self.y = y
-        self.direction = direction
-        self.charge_stage = charge_stage
-        self.frame_idx = 0
-        self.timer = 0
-        self.piercing = charge_stage >= 1  # Only stage 1 and 2 pierce
-        self.hit_enemies = set()
+        hitbox, x, y = self.get_hitbox()
+        return (x + hitbox.cx, y + hitbox.cy, hitbox.radius)
 
-    def get_frame(self):
-        return fireball_variants[self.charge_stage][self.frame_idx]
+    def get_bounds(self):
+        return sprite_bounds(self.x, self.y, self.frames_right[0])
 
-    def update(self, dt):
-        dx = 200 * dt * (1 if self.direction == "right" else -1)
-        self.x += dx
-        self.timer += dt
-        if self.timer >= 1 / ANIMATION_FPS:
-            self.timer -= 1 / ANIMATION_FPS
-            self.frame_idx = (self.frame_idx + 1) % NUM_FRAMES
-
-    def draw(self, surface):
-        surface.blit(bullet.get_frame(), (bullet.x, bullet.y))
-        if False:
-            cx, cy, radius = self.get_circle()
-            pygame.draw.circle(surface, (0,255,0), (int(cx), int(cy)), radius, 1)
+scaled_frames_cache = {}  # (id(frames), scale) -> scaled frames
 
-    def get_circle(self):
-        frame = frames_fireball[self.frame_idx]
-        w, h = frame.get_width(), frame.get_height()
-        cx = self.x + w // 2
-        cy = self.y + h // 2
-        radius = 2 * SCALE  # Logical hitbox matches game scale
-        return (cx, cy, radius)
+def get_scaled_frames(frames, scale):
+    key = (id(frames), scale)
+    scaled = scaled_frames_cache.get(key)
+    if scaled is None:
+        scaled = [pygame.transform.scale(frame, (int(frame.get_width() * scale), int(frame.get_height() * scale)))
+                  for frame in frames]
+        scaled_frames_cache[key] = scaled
+    return scaled
 
 class Explosion:
     def __init__(self, x, y, frames=frames_explosion, scale=1):
         self.x = x
         self.y = y
-        self.frames = frames
-        self.frame_idx = 0
-        self.timer = 0
-        self.finished = False
+        self.frames = frames if scale == 1 else get_scaled_frames(frames, scale)
+        self.start = sim_time
+        self.frame_step = governor.explosion_frame_step  # Fixed for the explosion's life
         self.scale = scale
 
-    def update(self, dt):
-        self.timer += dt
-        if self.timer >= 1 / ANIMATION_FPS:
-            self.timer -= 1 / ANIMATION_FPS
-            self.frame_idx += 1
-            if self.frame_idx >= len(self.frames):
-                self.finished = True
-
-    def draw(self, surface):
+    @property
+    def finished(self):
+        return EXPLOSION_CLIP.finished(self.start, self.frame_step)
+
+    def draw(self, queue):
         if not self.finished:
-            frame = self.frames[self.frame_idx % len(self.frames)]
-            if self.scale != 1:
-                w = frame.get_width() * self.scale
-                h = frame.get_height() * self.scale
-                scaled_frame = pygame.transform.scale(frame, (int(w), int(h)))
-                surface.blit(scaled_frame, (int(self.x), int(self.y)))
-            else:
-                surface.blit(frame, (int(self.x), int(self.y)))
+            frame = self.frames[EXPLOSION_CLIP.index(self.start, self.frame_step)]
+            queue.add(frame, (int(self.x), int(self.y)), LAYER_EFFECTS)
 
 class OrbExplosion:
     def __init__(self, x, y, frames=piercing_orb_explosion_frames):
         self.x = x
         self.y = y
         self.frames = frames
-        self.frame_idx = 0
-        self.timer = 0.0
-        self.finished = False
+        self.start = sim_time
+        self.frame_step = governor.explosion_frame_step
 
-    def update(self, dt):
-        self.timer += dt
-        if self.timer >= 0.07:
-            self.timer -= 0.07
-            self.frame_idx += 1
-            if self.frame_idx >= len(self.frames):
-                self.finished = True
-
-    def draw(self, surface):
+    @property
+    def finished(self):
+        return ORB_EXPLOSION_CLIP.finished(self.start, self.frame_step)
+
+    def draw(self, queue):
         if not self.finished:
-            frame = self.frames[self.frame_idx % len(self.frames)]
+            frame = self.frames[ORB_EXPLOSION_CLIP.index(self.start, self.frame_step)]
             draw_x = int(self.x - frame.get_width() // 2)
             draw_y = int(self.y - frame.get_height() // 2)
-            surface.blit(frame, (draw_x, draw_y))
-
-class PiercingOrb:
-    def __init__(self, x, y, direction, super_mode=False, custom_speed=None):
-        self.x = x
-        self.y = y
-        self.dx, self.dy = direction
-        self.super_mode = super_mode
-        self.radius = (FRAME_WIDTH * SCALE) if not super_mode else (FRAME_WIDTH * SCALE * 1.5)
-        self.speed = custom_speed if custom_speed is not None else (120 if super_mode else 80)
-        self.frame_idx = 0
-        self.anim_timer = 0.0
-        self.enemies_hit = set()
-        self.lifetime = 2.5 if super_mode else 2.0
-        self.alive = True
-
-    def update(self, dt):
-        self.x += self.dx * self.speed * dt
-        self.y += self.dy * self.speed * dt
-        self.lifetime -= dt
-        if (
-            self.x < -self.radius or self.x > GAME_WIDTH + self.radius
-            or self.y < -self.radius or self.y > GAME_HEIGHT + self.radius
-            or self.lifetime <= 0
-        ):
-            self.alive = False
-        self.anim_timer += dt
-        if self.anim_timer > 0.12:
-            self.anim_timer -= 0.12
-            self.frame_idx = (self.frame_idx + 1) % 4
-
-    def draw(self, surface):
-        frame = piercing_orb_frames[self.frame_idx]
-        draw_x = int(self.x - frame.get_width() // 2)
-        draw_y = int(self.y - frame.get_height() // 2)
-        surface.blit(frame, (draw_x, draw_y))
-
-    def get_circle(self):
-        return (self.x, self.y, self.radius)
+            queue.add(frame, (draw_x, draw_y), LAYER_EFFECTS)
 
 class Item:
     def __init__(self, x, y, kind="egg"):
@@ -697,41 +2090,950 @@ class Item:
             self.frame = heart_full
         else:
             raise ValueError("Unknown item kind: " + kind)
-        self.lifetime = 7.0  # seconds on ground (tweak as needed)
         self.flicker_timer = 0.0
+        self.lifetime_timer = timers.after(7.0, self.despawn)  # seconds on ground (tweak as needed)
+
+    @property
+    def lifetime(self):
+        return self.lifetime_timer.remaining
+
+    @lifetime.setter
+    def lifetime(self, seconds):
+        self.lifetime_timer.cancel()
+        self.lifetime_timer = timers.after(seconds, self.despawn)
+
+    def despawn(self):
+        if self in items:  # Unless it was picked up first
+            items.remove(self)
 
     def update(self, dt):
-        self.lifetime -= dt
         self.update_flicker(dt)
 
     def should_flicker(self):
         return self.lifetime <= FLICKER_START
 
-    def is_gone(self):
-        return self.lifetime <= 0
-
     def update_flicker(self, dt):
         if self.should_flicker():
             t = max(0, min(1, 1 - self.lifetime / FLICKER_START))
             flicker_speed = (1 - t) * FLICKER_MIN_SPEED + t * FLICKER_MAX_SPEED
             self.flicker_timer += dt * flicker_speed * 2 * math.pi
 
-    def draw(self, surface):
+    def draw(self, queue):
         if self.should_flicker():
             if math.sin(self.flicker_timer) > 0:
-                surface.blit(self.frame, (int(self.x), int(self.y)))
+                queue.add(self.frame, (int(self.x), int(self.y)), LAYER_ITEMS)
         else:
-            surface.blit(self.frame, (int(self.x), int(self.y)))
+            queue.add(self.frame, (int(self.x), int(self.y)), LAYER_ITEMS)
+
+    def get_hitbox(self):
+        return (FRAME_HITBOXES[self.frame], self.x, self.y)
 
     def get_rect(self):
-        w, h = self.frame.get_width(), self.frame.get_height()
-        return pygame.Rect(self.x, self.y, w, h)
+        hitbox = FRAME_HITBOXES[self.frame]
+        return hitbox.rect.move(int(self.x), int(self.y))
+
+    def get_bounds(self):
+        return sprite_bounds(self.x, self.y, self.frame)
+
+# === PROJECTILES ===
+# Fireballs and golden orbs are rows of a projectiles.ProjectileStore, not
+# objects, so moving thousands of them, dropping those that leave the view
+# or run out of time and finding what they hit are each a few whole-array
+# steps. The store needs numpy, which is slow to import, so it is made on
+# the first shot; by then the import started after the first frame has
+# usually finished.
+BULLET_SPEED = 200         # px/s
+ORB_LIFETIME = 2.0         # seconds
+SUPER_ORB_LIFETIME = 2.5
+
+if importlib.util.find_spec("numpy") is None:
+    # Not sys.exit, so rl_env and other importers get an ImportError
+    raise ImportError("The game needs numpy for its projectiles: pip install numpy", name="numpy")
+
+projectiles = None
+projectile_store = None
+
+def load_projectiles():
+    start = time.perf_counter()
+    import projectiles
+    startup_profile.add("projectiles", time.perf_counter() - start, "numpy")
+
+def get_projectile_store():
+    global projectiles, projectile_store
+    if projectile_store is None:
+        import projectiles as module  # Waits for load_projectiles if it is still importing
+        projectiles = module
+        projectile_store = module.ProjectileStore(
+            clips=((FIREBALL_CLIP.length, FIREBALL_CLIP.fps), (ORB_CLIP.length, ORB_CLIP.fps)),  # BULLET, ORB
+            bullet_circles=[[(hitbox.cx, hitbox.cy, hitbox.radius) for hitbox in map(FRAME_HITBOXES.get, frames)]
+                            for frames in fireball_variants])
+    return projectile_store
+
+def spawn_orb(x, y, dx, dy, super_mode, speed):
+    radius = FRAME_WIDTH * SCALE * 1.5 if super_mode else FRAME_WIDTH * SCALE
+    get_projectile_store().add(projectiles.ORB, x, y, dx * speed, dy * speed, sim_time, radius=radius,
+                               life=SUPER_ORB_LIFETIME if super_mode else ORB_LIFETIME, pierce=True)
+
+def projectile_sprites():
+    # (id, frame, world position) of every projectile, oldest first
+    store = projectile_store
+    if store is None or not store.count:
+        return
+    n = store.count
+    for ident, kind, stage, frame, x, y in zip(
+            store.ident[:n].tolist(), store.kind[:n].tolist(), store.stage[:n].tolist(),
+            store.frame_indices(sim_time).tolist(), store.x[:n].tolist(), store.y[:n].tolist()):
+        if kind == projectiles.BULLET:
+            yield ident, fireball_variants[stage][frame], (int(x), int(y))
+        else:
+            surface = piercing_orb_frames[frame]
+            yield ident, surface, (int(x - surface.get_width() // 2), int(y - surface.get_height() // 2))
+
+def projectile_hitbox(row, frame):
+    # Hitbox and its origin, as get_hitbox() gives them for entities
+    store = projectile_store
+    x, y = float(store.x[row]), float(store.y[row])
+    if store.kind[row] == projectiles.BULLET:
+        return FRAME_HITBOXES[fireball_variants[store.stage[row]][frame]], x, y
+    hitbox = get_orb_hitbox(float(store.radius[row]))
+    return hitbox, x - hitbox.cx, y - hitbox.cy
+
+# === CONTACTS ===
+# Collisions between two groups are kept as pairs from one frame to the
+# next. ContactLayer.update sorts the frame's pairs into entered (touching
+# now, not last frame), stayed, and exited (touching last frame, not now,
+# or one side has gone), and gameplay reacts to those. A pair found apart
+# remembers its clearance: the gap between the two get_bounds() circles,
+# which hold the hitbox in every animation frame. Until the two have
+# travelled that far between them they cannot touch, and the pair is
+# skipped without even a broadphase test. Travel is measured from bounds
+# centres once per frame, so pushes and clamps count as well as movement.
+class ContactMotion:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.current = {}   # entity -> (x, y, radius, travel) this frame
+        self.previous = {}
+
+    def begin_frame(self):
+        # Entities not seen this frame are dropped
+        self.previous, self.current = self.current, {}
+
+    def get(self, entity):
+        entry = self.current.get(entity)
+        if entry is None:
+            x, y, radius = entity.get_bounds()
+            last = self.previous.get(entity)
+            travel = last[3] + math.hypot(x - last[0], y - last[1]) if last is not None else 0.0
+            entry = self.current[entity] = (x, y, radius, travel)
+        return entry
+
+contact_motion = ContactMotion()
+
+class ContactLayer:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.touching = {}  # (a, b) -> whether the contact began this frame
+        self.apart = {}     # (a, b) -> combined travel at which the pair could touch
+        self.entered = []
+        self.exited = []
+        self.tests = 0
+        self.skipped = 0
+
+    @property
+    def stayed(self):
+        return [pair for pair, new in self.touching.items() if not new]
+
+    def update(self, group_a, group_b):
+        touching = {}
+        apart = {}
+        entered = []
+        tests = skipped = 0
+        motions_b = [(b, contact_motion.get(b)) for b in group_b]
+        for a in group_a:
+            ax, ay, ar, a_travel = contact_motion.get(a)
+            for b, (bx, by, br, b_travel) in motions_b:
+                pair = (a, b)
+                limit = self.apart.get(pair)
+                if limit is not None and a_travel + b_travel < limit:
+                    apart[pair] = limit
+                    skipped += 1
+                    continue
+                tests += 1
+                if collides(a, b):
+                    new = pair not in self.touching
+                    touching[pair] = new
+                    if new:
+                        entered.append(pair)
+                else:
+                    gap = math.hypot(bx - ax, by - ay) - ar - br
+                    if gap > 0:
+                        apart[pair] = gap + a_travel + b_travel
+        self.exited = [pair for pair in self.touching if pair not in touching]
+        self.touching = touching
+        self.apart = apart
+        self.entered = entered
+        self.tests = tests
+        self.skipped = skipped
+
+player_enemy_contacts = ContactLayer()
+player_item_contacts = ContactLayer()
+CONTACT_LAYERS = (player_enemy_contacts, player_item_contacts)
+
+def clear_contacts():
+    # For when every entity is replaced at once
+    contact_motion.clear()
+    for layer in CONTACT_LAYERS:
+        layer.clear()
+
+# === ARENA ===
+# With --arena the world is bigger than the view. The camera keeps the player
+# in the middle of the view, stopping at the arena edges, and the world is
+# cut into ARENA_CHUNK_SIZE squares. Only enemies within ARENA_AWAKE_MARGIN
+# chunks of the view are in chickens, geese and crabs, which everything else
+# walks; the rest wait in a bucket per chunk. Buckets up to
+# ARENA_DROWSY_MARGIN chunks out are drowsy: their enemies walk towards the
+# player, each chunk once every ARENA_DROWSY_INTERVAL frames with the time
+# saved up. Beyond that they are dormant and cost nothing. A frame then
+# costs about what is near the player, however big the arena or crowd.
+# Geese and crabs drop their charge cycle while asleep and start a fresh one
+# when woken.
+ARENA_CHUNK_SIZE = 64        # Game pixels
+ARENA_AWAKE_MARGIN = 1       # Chunks
+ARENA_DROWSY_MARGIN = 3      # Chunks
+ARENA_DROWSY_INTERVAL = 8    # Frames
+ARENA_DROWSY_MAX_STEP = 0.5  # seconds; time spent dormant is not made up
+ARENA_GRID_COLOR = (40, 40, 50)
+
+# Where a run starts: the screen positions of the fixed-screen game, with the
+# view in the middle of the arena
+PLAYER_START = (GAME_WIDTH // 2 + (ARENA_WIDTH - VIEW_WIDTH) // 2,
+                GAME_HEIGHT // 2 + (ARENA_HEIGHT - VIEW_HEIGHT) // 2)
+
+def update_camera():
+    global camera_x, camera_y
+    cx = player.x + FRAME_WIDTH * SCALE // 2
+    cy = player.y + FRAME_HEIGHT * SCALE // 2
+    camera_x = int(clamp(cx - VIEW_WIDTH // 2, 0, ARENA_WIDTH - VIEW_WIDTH))
+    camera_y = int(clamp(cy - VIEW_HEIGHT // 2, 0, ARENA_HEIGHT - VIEW_HEIGHT))
+
+def draw_arena_grid(queue):
+    # Chunk borders, so there is something to see the view move against
+    size = ARENA_CHUNK_SIZE
+    for x in range(-(-camera_x // size) * size, camera_x + VIEW_WIDTH, size):
+        queue.add_line(ARENA_GRID_COLOR, (x, camera_y), (x, camera_y + VIEW_HEIGHT), 1, LAYER_GROUND)
+    for y in range(-(-camera_y // size) * size, camera_y + VIEW_HEIGHT, size):
+        queue.add_line(ARENA_GRID_COLOR, (camera_x, y), (camera_x + VIEW_WIDTH, y), 1, LAYER_GROUND)
+
+class ChunkStreamer:
+    def __init__(self):
+        self.cols = -(-ARENA_WIDTH // ARENA_CHUNK_SIZE)
+        self.rows = -(-ARENA_HEIGHT // ARENA_CHUNK_SIZE)
+        self.clear()
+
+    def clear(self):
+        self.buckets = {}   # (col, row) -> enemies asleep there
+        self.asleep = 0
+        self.window = None  # (col0, row0, col1, row1) of the awake chunks
+        self.frame = 0      # Picks the drowsy chunks whose turn it is
+
+    def reset(self):
+        self.clear()
+        self.populate(ARENA_POPULATION)
+
+    def populate(self, count):
+        # Chickens anywhere but the view; they wake as the player nears
+        w = FRAME_WIDTH * SCALE
+        h = FRAME_HEIGHT * SCALE
+        for _ in range(count):
+            while True:
+                x = random.uniform(0, ARENA_WIDTH - w)
+                y = random.uniform(0, ARENA_HEIGHT - h)
+                if not (camera_x - w < x < camera_x + VIEW_WIDTH and camera_y - h < y < camera_y + VIEW_HEIGHT):
+                    break
+            chicken = Enemy(x, y, chicken_frames_right, chicken_frames_left, "chicken")
+            chicken.tick_time = sim_time
+            self.buckets.setdefault(self.chunk_of(chicken), []).append(chicken)
+            self.asleep += 1
+        self.window = None  # Wake whatever landed in the awake chunks
+
+    def chunk_of(self, enemy):
+        w, h = enemy.frames_right[0].get_size()
+        col = min(max(int(enemy.x + w / 2) // ARENA_CHUNK_SIZE, 0), self.cols - 1)
+        row = min(max(int(enemy.y + h / 2) // ARENA_CHUNK_SIZE, 0), self.rows - 1)
+        return (col, row)
+
+    def span(self, margin):
+        size = ARENA_CHUNK_SIZE
+        return (max(camera_x // size - margin, 0), max(camera_y // size - margin, 0),
+                min((camera_x + VIEW_WIDTH - 1) // size + margin, self.cols - 1),
+                min((camera_y + VIEW_HEIGHT - 1) // size + margin, self.rows - 1))
+
+    def is_awake(self, chunk):
+        col0, row0, col1, row1 = self.window
+        return col0 <= chunk[0] <= col1 and row0 <= chunk[1] <= row1
+
+    def wake(self, enemy):
+        self.asleep -= 1
+        enemy_list(enemy).append(enemy)
+        if enemy.type != "chicken":
+            schedule_charge_phase(enemy)
+
+    def sleep(self, enemy, chunk):
+        enemy.tick_time = sim_time
+        if enemy.type != "chicken":
+            enemy.phase_timer.cancel()
+            enemy.is_charging = False
+            enemy.is_winding_up = False
+        self.buckets.setdefault(chunk, []).append(enemy)
+        self.asleep += 1
+
+    def stream(self):
+        # Wakes the chunks the view has come near and puts enemies that have
+        # left the awake chunks to sleep. Call after the camera has moved.
+        window = self.span(ARENA_AWAKE_MARGIN)
+        if window != self.window:
+            self.window = window
+            col0, row0, col1, row1 = window
+            for row in range(row0, row1 + 1):
+                for col in range(col0, col1 + 1):
+                    for enemy in self.buckets.pop((col, row), ()):
+                        self.wake(enemy)
+        for group in (chickens, geese, crabs):
+            awake = []
+            for enemy in group:
+                chunk = self.chunk_of(enemy)
+                if self.is_awake(chunk):
+                    awake.append(enemy)
+                else:
+                    self.sleep(enemy, chunk)
+            if len(awake) != len(group):
+                group[:] = awake
+
+    def tick_drowsy(self):
+        self.frame += 1
+        phase = self.frame % ARENA_DROWSY_INTERVAL
+        col0, row0, col1, row1 = self.span(ARENA_DROWSY_MARGIN)
+        moved = []
+        for row in range(row0, row1 + 1):
+            # Chunks whose (col + row) falls on this phase; the awake ones
+            # have empty buckets
+            for col in range(col0 + (phase - col0 - row) % ARENA_DROWSY_INTERVAL, col1 + 1, ARENA_DROWSY_INTERVAL):
+                bucket = self.buckets.get((col, row))
+                if not bucket:
+                    continue
+                stay = []
+                for enemy in bucket:
+                    dt = min(sim_time - enemy.tick_time, ARENA_DROWSY_MAX_STEP)
+                    enemy.tick_time = sim_time
+                    enemy.update(dt, player.x, player.y)
+                    chunk = self.chunk_of(enemy)
+                    if chunk == (col, row):
+                        stay.append(enemy)
+                    else:
+                        moved.append((enemy, chunk))
+                if stay:
+                    bucket[:] = stay
+                else:
+                    del self.buckets[(col, row)]
+        for enemy, chunk in moved:
+            if self.is_awake(chunk):
+                self.wake(enemy)
+            else:
+                self.buckets.setdefault(chunk, []).append(enemy)
+
+    def save_state(self):
+        return (self.frame, tuple((col, row, tuple(pack_enemy(e) + (e.tick_time,) for e in bucket))
+                                  for (col, row), bucket in self.buckets.items()))
+
+    def load_state(self, state):
+        self.clear()
+        self.frame, buckets = state
+        for col, row, enemy_states in buckets:
+            bucket = self.buckets[(col, row)] = []
+            for enemy_state in enemy_states:
+                enemy, _ = unpack_enemy(enemy_state[:-1])
+                enemy.tick_time = enemy_state[-1]
+                bucket.append(enemy)
+            self.asleep += len(bucket)
+
+# === SNAPSHOTS ===
+# save_snapshot() packs the whole simulation into a marshal blob of plain
+# tuples and load_snapshot() rebuilds it. Frames are looked up again from the
+# enemy type. Sleeping enemies are stored by chunk, and a snapshot only
+# loads into an arena of the size it was taken in. Particles are cosmetic and
+# are dropped on load. Contacts are not stored; they are found again on the
+# next frame.
+SNAPSHOT_VERSION = 7
+SNAPSHOT_FILE = "run_snapshot.bin"
+SNAPSHOT_AUTOSAVE_INTERVAL = 10.0  # seconds
+RESUME_ENABLED = "--resume" in sys.argv
+
+SNAPSHOT_GLOBALS = (
+    "score", "player_health", "egg_inventory",
+    "goose_pending_spawn", "crab_pending_spawn",
+    "golden_power", "sim_time",
+    "game_over", "game_over_timer", "debug_explosion_circle",
+)
+
+# Timer globals are stored as seconds left (None when idle) and scheduled
+# again on load with these callbacks
+SNAPSHOT_TIMERS = {
+    "invincibility_timer": None,
+    "chicken_spawn_timer": spawn_chicken,
+    "goose_spawn_timer": start_goose_warning,
+    "goose_warning_timer": spawn_goose,
+    "crab_spawn_timer": start_crab_warning,
+    "crab_warning_timer": spawn_crab,
+}
+
+PLAYER_SNAPSHOT_FIELDS = (
+    "x", "y", "facing", "moving", "anim_start", "speed",
+    "firing", "fire_start",
+    "charging", "charge_timer", "charge_stage", "charge_anim_start",
+    "pending_bullet_stage", "facing_locked", "facing_locked_dir", "pending_fire", "fire_press_time",
+)
+
+ENEMY_CHARGE_FIELDS = (
+    "is_charging", "charge_dx", "charge_dy", "is_winding_up", "charge_target_x", "charge_target_y",
+)
+
+def get_enemy_frames(kind):
+    if kind == "goose":
+        return goose_frames_right, goose_frames_left
+    if kind == "crab":
+        return crab_frames_right, crab_frames_left
+    return chicken_frames_right, chicken_frames_left
+
+def pack_enemy(e):
+    charge = None
+    if hasattr(e, "is_charging"):
+        charge = tuple(getattr(e, name) for name in ENEMY_CHARGE_FIELDS) + (e.phase_timer.remaining,)
+    return (e.type, e.x, e.y, e.facing, e.moving, e.anim_start, e.speed, charge)
+
+def unpack_enemy(state):
+    # Returns the enemy and the time left in its charge phase, if it has one;
+    # the caller schedules that
+    kind, x, y, facing, moving, anim_start, speed, charge = state
+    frames_right, frames_left = get_enemy_frames(kind)
+    enemy = Enemy(x, y, frames_right, frames_left, kind, speed=speed)
+    enemy.facing = facing
+    enemy.moving = moving
+    enemy.anim_start = anim_start
+    if charge is None:
+        return enemy, None
+    for name, value in zip(ENEMY_CHARGE_FIELDS, charge):
+        setattr(enemy, name, value)
+    return enemy, charge[-1]
+
+def save_snapshot():
+    g = globals()
+    enemies = chickens + geese + crabs
+    state = (
+        SNAPSHOT_VERSION,
+        tuple(g[name] for name in SNAPSHOT_GLOBALS),
+        tuple(g[name].remaining if g[name] is not None and g[name].active else None
+              for name in SNAPSHOT_TIMERS),
+        tuple(getattr(player, name) for name in PLAYER_SNAPSHOT_FIELDS)
+            + (tuple(player.charge_sfx_played),),
+        tuple(pack_enemy(e) for e in enemies),
+        (len(chickens), len(geese)),
+        projectile_store.state() if projectile_store is not None else None,
+        tuple((e.x, e.y, e.start, e.frame_step, e.scale) for e in explosions),
+        tuple((e.x, e.y, e.start, e.frame_step) for e in orb_explosions),
+        tuple((i.kind, i.x, i.y, i.lifetime, i.flicker_timer) for i in items),
+        (ARENA_WIDTH, ARENA_HEIGHT, chunk_streamer.save_state() if chunk_streamer is not None else None),
+        random.getstate(),
+    )
+    return marshal.dumps(state)
+
+def load_snapshot(blob):
+    global player, chickens, geese, crabs, explosions, orb_explosions, items
+    # Checked before unpacking, since older versions have other layouts
+    state = marshal.loads(blob)
+    if not isinstance(state, tuple) or not state or state[0] != SNAPSHOT_VERSION:
+        version = state[0] if isinstance(state, tuple) and state else None
+        raise ValueError("Unsupported snapshot version: " + str(version))
+    if len(state) != 12:
+        raise ValueError("Malformed snapshot")
+    (version, values, timer_values, player_state, enemy_states, (num_chickens, num_geese),
+     projectile_state, explosion_states, orb_explosion_states,
+     item_states, (arena_width, arena_height, streamer_state), rng_state) = state
+    if (arena_width, arena_height) != (ARENA_WIDTH, ARENA_HEIGHT):
+        raise ValueError(f"Snapshot is for a {arena_width}x{arena_height} arena")
+
+    globals().update(zip(SNAPSHOT_GLOBALS, values))
+    clear_contacts()
+    if particle_system is not None:
+        particle_system.clear()
+    # Everything on the wheel belongs to the state being replaced
+    timers.clear()
+    for (name, callback), time_left in zip(SNAPSHOT_TIMERS.items(), timer_values):
+        globals()[name] = timers.after(time_left, callback) if time_left is not None else None
+
+    player = Player(0, 0)
+    for name, value in zip(PLAYER_SNAPSHOT_FIELDS, player_state):
+        setattr(player, name, value)
+    player.charge_sfx_played = list(player_state[-1])
+    update_camera()
+
+    enemies = []
+    restored_phases = []
+    for enemy_state in enemy_states:
+        enemy, time_left = unpack_enemy(enemy_state)
+        enemies.append(enemy)
+        if time_left is not None:
+            restored_phases.append((enemy, time_left))
+    chickens = enemies[:num_chickens]
+    geese = enemies[num_chickens:num_chickens + num_geese]
+    crabs = enemies[num_chickens + num_geese:]
+    for enemy, time_left in restored_phases:
+        schedule_charge_phase(enemy, time_left)
+    if chunk_streamer is not None:
+        chunk_streamer.load_state(streamer_state)
+
+    if projectile_state is not None:
+        get_projectile_store().load_state(projectile_state)
+    elif projectile_store is not None:
+        projectile_store.clear()
+
+    explosions = []
+    for x, y, start, frame_step, scale in explosion_states:
+        explosion = Explosion(x, y, scale=scale)
+        explosion.start = start
+        explosion.frame_step = frame_step
+        explosions.append(explosion)
+
+    orb_explosions = []
+    for x, y, start, frame_step in orb_explosion_states:
+        explosion = OrbExplosion(x, y)
+        explosion.start = start
+        explosion.frame_step = frame_step
+        orb_explosions.append(explosion)
+
+    items = []
+    for kind, x, y, lifetime, flicker_timer in item_states:
+        item = Item(x, y, kind=kind)
+        item.lifetime = lifetime
+        item.flicker_timer = flicker_timer
+        items.append(item)
+
+    random.setstate(rng_state)
+
+def save_snapshot_file(path=SNAPSHOT_FILE):
+    # Write then rename so a crash mid-write never leaves a torn file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(save_snapshot())
+    os.replace(tmp_path, path)
+
+def load_snapshot_file(path=SNAPSHOT_FILE):
+    with open(path, "rb") as f:
+        load_snapshot(f.read())
+
+# === INPUT ===
+# Events are stamped with perf_counter when they are taken off SDL's queue.
+# FramePacer polls every INPUT_POLL_INTERVAL or faster while it waits, so a
+# stamp is within about that much of the key actually changing, rather than
+# rounded to the next frame. read_input turns stamps into ages (how long
+# before the end of the frame an event happened) for the charge logic, and
+# show_frame measures input-to-display latency from them.
+INPUT_POLL_INTERVAL = 0.001  # seconds
+
+# Window state, kept up to date from the events InputQueue sees go by
+window_visible = True
+window_exposed = False   # The window needs repainting in full
+window_focus_lost = False  # Set on losing focus, cleared by pause_requested
+
+def note_window_event(event):
+    global window_visible, window_exposed, window_focus_lost
+    if event.type in (pygame.WINDOWHIDDEN, pygame.WINDOWMINIMIZED):
+        window_visible = False
+    elif event.type in (pygame.WINDOWSHOWN, pygame.WINDOWRESTORED, pygame.WINDOWEXPOSED):
+        window_visible = True
+        window_exposed = True
+    elif event.type == pygame.WINDOWFOCUSLOST:
+        window_focus_lost = True
+
+WINDOW_EVENTS = (pygame.WINDOWHIDDEN, pygame.WINDOWMINIMIZED, pygame.WINDOWSHOWN,
+                 pygame.WINDOWRESTORED, pygame.WINDOWEXPOSED, pygame.WINDOWFOCUSLOST)
+
+class InputQueue:
+    def __init__(self):
+        self.events = []
+
+    def poll(self):
+        now = time.perf_counter()
+        for event in pygame.event.get():
+            event.time = now
+            if event.type in WINDOW_EVENTS:
+                note_window_event(event)
+            self.events.append(event)
+
+    def wait(self, timeout):
+        # Sleeps in SDL until an event arrives or timeout seconds pass
+        event = pygame.event.wait(int(timeout * 1000))
+        if event.type != pygame.NOEVENT:
+            event.time = time.perf_counter()
+            if event.type in WINDOW_EVENTS:
+                note_window_event(event)
+            self.events.append(event)
+        self.poll()
+
+    def take(self):
+        self.poll()
+        events, self.events = self.events, []
+        return events
+
+input_queue = InputQueue()
+input_latency = SampleWindow()  # Milliseconds from key event to the frame showing it
+metrics.track("input_latency_ms", input_latency)
+frame_input_times = ()  # Stamps of the key events read for the frame being simulated
+
+def event_time(event, dt):
+    # Sim time at which an event read for this frame happened. Called before
+    # simulate_frame advances sim_time, so the frame ends at sim_time + dt.
+    return sim_time + dt - event.age
+
+# === REPLAYS ===
+# A replay is a snapshot of the starting state plus each frame's input: dt,
+# key events, held movement keys and the governor level, which changes
+# spawns. --record PATH writes one when the game exits and --replay PATH plays
+# it back in place of the keyboard, quitting at the end.
+REPLAY_VERSION = 7
+RECORD_FILE = arg_value("--record")
+REPLAY_FILE = arg_value("--replay")
+REPLAY_KEYS = (
+    pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN,
+    pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s,
+)
+
+class ReplayKeys:
+    # Stands in for pygame.key.get_pressed() during playback
+    def __init__(self, pressed):
+        self.pressed = pressed
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+class InputRecorder:
+    def __init__(self):
+        self.highscore = highscore
+        self.snapshot = save_snapshot()
+        self.frames = []
+
+    def record(self, dt, events, keys, level):
+        if any(e.type == pygame.QUIT for e in events):
+            return  # The loop stops before simulating this frame
+        key_events = tuple((e.type, e.key, e.age) for e in events if e.type in (pygame.KEYDOWN, pygame.KEYUP))
+        held = tuple(key for key in REPLAY_KEYS if keys[key])
+        self.frames.append((dt, key_events, held, level))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            marshal.dump((REPLAY_VERSION, self.highscore, self.snapshot, self.frames), f)
+
+class InputReplay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            version, self.highscore, self.snapshot, self.frames = marshal.load(f)
+        if version != REPLAY_VERSION:
+            raise ValueError("Unsupported replay version: " + str(version))
+        self.index = 0
+
+    @property
+    def finished(self):
+        return self.index >= len(self.frames)
+
+    def next_frame(self):
+        frame = self.frames[self.index]
+        self.index += 1
+        return frame
+
+def read_input(dt):
+    # Returns (dt, events, keys) for this frame, from the keyboard, the
+    # replay or the autopilot
+    global frame_input_times
+    if autopilot_driver is not None:
+        events, keys = read_autopilot(dt)
+        if input_recorder is not None:
+            input_recorder.record(dt, events, keys, governor.level)
+        return dt, events, keys
+    if input_replay is None:
+        events = input_queue.take()
+        keys = pygame.key.get_pressed()
+        now = time.perf_counter()
+        for event in events:
+            # A fixed step has no tie to the wall clock, so events land at the frame's end
+            event.age = 0.0 if FIXED_STEP else min(now - event.time, dt)
+        frame_input_times = tuple(e.time for e in events if e.type in (pygame.KEYDOWN, pygame.KEYUP))
+        if input_recorder is not None:
+            input_recorder.record(dt, events, keys, governor.level)
+        return dt, events, keys
+
+    # Only QUIT is taken from the real event queue during playback
+    quit_events = [event for event in input_queue.take() if event.type == pygame.QUIT]
+    dt, key_events, held, level = input_replay.next_frame()
+    governor.level = level
+    events = quit_events + [pygame.event.Event(kind, key=key, age=age) for kind, key, age in key_events]
+    return dt, events, ReplayKeys(held)
+
+# === CAPTURE ===
+# --capture PATH streams raw RGB frames of game_surface to a file, FIFO or
+# stdout ("-"); --capture-ring PATH writes them into a memory-mapped ring.
+# See capture.py. Capturing, like --headless, runs on a fixed step without
+# waiting on the clock, so footage renders as fast as the CPU allows.
+CAPTURE_FILE = arg_value("--capture")
+CAPTURE_RING = arg_value("--capture-ring")
+FIXED_STEP = HEADLESS or CAPTURE_FILE is not None or CAPTURE_RING is not None
+
+# === SPECTATORS ===
+# With --spectate, every frame's world state is streamed to connected
+# viewers (python spectator.py). Entities are recorded through their own draw
+# methods, so viewers see exactly the sprites the game draws. --spectate-port
+# picks the port; if it is taken the game runs without spectators.
+SPECTATE_ENABLED = "--spectate" in sys.argv
+SPECTATE_PORT = int(arg_value("--spectate-port", spectator.SPECTATOR_PORT))
+SPECTATOR_EGG_BOMB_SCALE = 4  # Egg bomb explosions, see the K_q handler
+
+SPRITE_CODES = spectator.sprite_codes({
+    "player_run_right": frames_run_right, "player_run_left": frames_run_left,
+    "player_fire_right": frames_fire_right, "player_fire_left": frames_fire_left,
+    "player_charge_right": frames_charge_right, "player_charge_left": frames_charge_left,
+    "chicken_right": chicken_frames_right, "chicken_left": chicken_frames_left,
+    "goose_right": goose_frames_right, "goose_left": goose_frames_left,
+    "crab_right": crab_frames_right, "crab_left": crab_frames_left,
+    "fireball_0": fireball_variants[0], "fireball_1": fireball_variants[1], "fireball_2": fireball_variants[2],
+    "explosion": frames_explosion,
+    "explosion_x4": get_scaled_frames(frames_explosion, SPECTATOR_EGG_BOMB_SCALE),
+    "orb": piercing_orb_frames, "orb_explosion": piercing_orb_explosion_frames,
+    "egg": egg_frames, "golden_egg": golden_egg_frames, "heart": [heart_full],
+})
+
+def publish_spectators():
+    if spectator_publisher is None or not spectator_publisher.accept_viewers():
+        return
+    recorder = RenderQueue()
+    entities = []
+
+    def record(entity):
+        for _, _, op, args in recorder.take():
+            code = SPRITE_CODES.get(args[0]) if op == DRAW_BLIT else None
+            if code is not None:
+                entities.append((entity, code, args[1][0], args[1][1]))
+
+    player.draw(recorder, invincibility_left() > 0, player.firing)
+    record(player)
+    for group in (chickens, geese, crabs):
+        for entity in group:
+            entity.draw(recorder)
+            record(entity)
+    for ident, frame, position in projectile_sprites():
+        recorder.add(frame, position, LAYER_PROJECTILES)
+        record(("projectile", ident))
+    for group in (explosions, orb_explosions, items):
+        for entity in group:
+            entity.draw(recorder)
+            record(entity)
+
+    flags = 0
+    if goose_warning_timer is not None:
+        flags |= spectator.HUD_GOOSE_WARNING
+    if crab_warning_timer is not None:
+        flags |= spectator.HUD_CRAB_WARNING
+    if game_over:
+        flags |= spectator.HUD_GAME_OVER
+    hud = (score, highscore, egg_inventory, player_health, golden_power, flags)
+    spectator_publisher.publish(entities, hud)
+    metrics.set("spectator_viewers", len(spectator_publisher.clients))
+    metrics.set("spectator_bytes_sent", spectator_publisher.bytes_sent)
+
+# === EVENT LOG ===
+# --event-log PATH records gameplay for per-cabinet statistics, see
+# eventlog.py; --cabinet NAME labels the records (the host name by default).
+# log_event only queues a record, and the file is written from a background
+# thread. Events, with their fields:
+#   session    cabinet, pid, arena, replay,    once, before the first run
+#              autopilot                       the bot's policy, or null
+#   run_start  cabinet
+#   shot       stage                           0 for a tap
+#   kill       enemy, weapon, stage            weapon is bullet, orb or egg_bomb;
+#                                              stage only for bullets
+#   damage     cause, health                   cause is the enemy type
+#   pickup     item, bonus                     bonus: an egg with the inventory full
+#   egg_bomb   kills
+#   orb_burst  super
+#   run_end    reason, cabinet, score, seconds, and the run's tallies below
+EVENT_LOG_FILE = arg_value("--event-log")
+
+# Events counted in the run_end summary, with the field that breaks each down
+EVENT_TALLIES = {
+    "kill": "enemy", "shot": "stage", "damage": "cause", "pickup": "item",
+    "egg_bomb": None, "orb_burst": None,
+}
+
+event_log = None
+CABINET = None
+if EVENT_LOG_FILE:
+    import eventlog
+    import platform
+    event_log = eventlog.EventLog(EVENT_LOG_FILE)
+    CABINET = arg_value("--cabinet") or platform.node()
+run_number = 0
+run_start = 0.0
+run_tallies = {}
+
+def log_event(event, **fields):
+    if event_log is None:
+        return
+    event_log.log(event, sim_time, run_number, fields)
+    if event in EVENT_TALLIES:
+        key = EVENT_TALLIES[event]
+        if key is None:
+            run_tallies[event] = run_tallies.get(event, 0) + 1
+        else:
+            counts = run_tallies.setdefault(event, {})
+            name = str(fields[key])  # JSON object keys are strings
+            counts[name] = counts.get(name, 0) + 1
+
+def start_run():
+    global run_number, run_start, run_tallies
+    run_number += 1
+    run_start = sim_time
+    run_tallies = {}
+    log_event("run_start", cabinet=CABINET)
+
+def end_run(reason):
+    seconds = round(sim_time - run_start, 2)
+    log_event("run_end", reason=reason, cabinet=CABINET, score=score, seconds=seconds, **run_tallies)
+    if leaderboard_client is not None and score > 0:
+        leaderboard_client.submit({"cabinet": CABINET, "score": score, "seconds": seconds, "reason": reason,
+                                   "time": round(time.time()), "bot": AUTOPILOT_ENABLED})
+
+# === LEADERBOARD ===
+# --leaderboard URL sends each finished run that scored to a shared
+# leaderboard, and the game over screen shows the global top list; see
+# leaderboard.py. The client keeps a file outbox and talks to the server
+# from a background thread, so handing it a run is all the game does.
+# Runs carry the same cabinet name as the event log. Replays send nothing,
+# and autopilot runs are sent marked as bots, which the top list leaves out.
+LEADERBOARD_URL = arg_value("--leaderboard")
+LEADERBOARD_TOP_COLOR = (255, 255, 100)
+
+leaderboard_client = None
+if LEADERBOARD_URL and not REPLAY_FILE:
+    import leaderboard
+    import platform
+    leaderboard_client = leaderboard.LeaderboardClient(LEADERBOARD_URL)
+    CABINET = arg_value("--cabinet") or platform.node()
+
+# === AUTOPILOT ===
+# --autopilot lets a bot play, for soak tests and load that looks like real
+# play; see autopilot.py. --autopilot-policy NAME picks how it plays (kite
+# by default, or module:Class), and --autopilot-runs N quits once N runs are
+# over (0 plays on until the window is closed). The bot's key events go
+# through read_input like the keyboard's, so --record works with it.
+AUTOPILOT_ENABLED = "--autopilot" in sys.argv
+AUTOPILOT_POLICY = arg_value("--autopilot-policy", "kite")
+AUTOPILOT_RUNS = int(arg_value("--autopilot-runs", 0))
+
+autopilot_driver = None
+if AUTOPILOT_ENABLED:
+    if REPLAY_FILE:
+        sys.exit("--autopilot and --replay both want the controls")
+    import autopilot
+    autopilot_driver = autopilot.Pilot(autopilot.load_policy(AUTOPILOT_POLICY))
+
+def read_autopilot(dt):
+    # Like read_input, with the bot's keys in place of the keyboard's
+    events = [event for event in input_queue.take() if event.type == pygame.QUIT]
+    if AUTOPILOT_RUNS and game_over and run_number >= AUTOPILOT_RUNS:
+        events.append(pygame.event.Event(pygame.QUIT))
+    key_events, held = autopilot_driver.frame(sys.modules[__name__], dt)
+    events += [pygame.event.Event(kind, key=key, age=0.0) for kind, key in key_events]
+    return events, ReplayKeys(held)
+
+# === POWER SAVING ===
+# An idle game should leave the CPU alone:
+#   - P or ESC pauses, and so does the window losing focus. The simulation
+#     does not tick at all while paused, so recordings and replays never
+#     see the pause; the loop sleeps in SDL until the next event.
+#   - present_frame skips draw lists equal to the last one, so static
+#     screens (game over, the pause screen) are drawn once, not every frame.
+#   - After a skipped frame the pacer naps rather than polling and spinning.
+#   - With the window hidden nothing is drawn, and replays and the autopilot
+#     slow to BACKGROUND_TICK_RATE ticks a second. Each tick is still a full
+#     step, so they go on in slow motion rather than coarser.
+# Only play at the keyboard pauses; replays, the autopilot and fixed-step
+# runs play straight through.
+PAUSE_KEYS = (pygame.K_p, pygame.K_ESCAPE)
+PAUSE_WAIT = 1.0           # seconds; longest sleep in SDL while paused
+BACKGROUND_TICK_RATE = 10
+paused = False
+
+def pause_allowed():
+    return not FIXED_STEP and input_replay is None and autopilot_driver is None
+
+def pause_requested():
+    # Checks the input waiting for the next frame for a reason to pause
+    global window_focus_lost
+    if not pause_allowed():
+        return False
+    input_queue.poll()
+    lost, window_focus_lost = window_focus_lost, False
+    for event in input_queue.events:
+        if event.type == pygame.KEYDOWN and event.key in PAUSE_KEYS:
+            input_queue.events.remove(event)
+            return True
+    return lost or not window_visible
+
+def run_paused():
+    # Shows the pause screen until P or ESC is pressed again. Keys let go of
+    # meanwhile are handed to the first frame after, so nothing stays held.
+    # Returns False if the window was closed.
+    global paused
+    paused = True
+    released = []
+    render_queue.entries.extend(last_presented or ())
+    text = render_text("PAUSED", (255, 255, 255))
+    render_queue.add(text, (GAME_WIDTH // 2 - text.get_width() // 2,
+                            GAME_HEIGHT // 2 - text.get_height() // 2), LAYER_HUD)
+    screen_entries = render_queue.take()
+    while True:
+        # Drawn once; after that present_frame finds nothing has changed
+        render_queue.entries.extend(screen_entries)
+        present_frame()
+        input_queue.wait(PAUSE_WAIT)
+        for event in input_queue.take():
+            if event.type == pygame.QUIT:
+                return False
+            if event.type == pygame.KEYDOWN and event.key in PAUSE_KEYS:
+                paused = False
+            elif event.type == pygame.KEYUP:
+                released.append(event)
+        if not paused:
+            input_queue.events[:0] = released
+            return True
 
 # === GAME STATE ===
 game_surface = pygame.Surface((GAME_WIDTH, GAME_HEIGHT))
+render_queue = RenderQueue()
+dirty_tracker = DirtyTracker()
+frame_capture = None
+if CAPTURE_FILE or CAPTURE_RING:
+    import capture
+    if CAPTURE_FILE:
+        frame_capture = capture.StreamCapture(CAPTURE_FILE, (GAME_WIDTH, GAME_HEIGHT))
+    else:
+        frame_capture = capture.RingCapture(CAPTURE_RING, (GAME_WIDTH, GAME_HEIGHT))
+frame_pipeline = FramePipeline(render_frame) if PIPELINED else None
 running = True
 
-player = Player(GAME_WIDTH // 2, GAME_HEIGHT // 2)
+player = Player(*PLAYER_START)
+update_camera()
 
 PLAYER_MOVE_SPEED = 120
 PLAYER_SHOOT_MOVE_MULT = 0.2   # 0 = stand still while firing, try 0.2 for micro adjust
@@ -740,21 +3042,18 @@ PLAYER_CHARGE_MOVE_MULT = 0.1  # 0 = stand still while charging, try 0.15 for mi
 CHARGE_STAGE_1 = 0.4    # seconds
 CHARGE_STAGE_2 = 0.75    # seconds
 
-bullets = []
-
 explosions = []
 orb_explosions = []
-piercing_orbs = []
 items = []
 armored_enemies = []
 
 # DEBUG
-items.append(Item(GAME_WIDTH // 2, GAME_HEIGHT // 2, kind="golden_egg"))
+items.append(Item(*PLAYER_START, kind="golden_egg"))
 
 egg_inventory = 0
 score = 0
 player_health = MAX_HEALTH
-invincibility_timer = 0.0
+invincibility_timer = None
 
 SCORE_CHICKEN = 1
 SCORE_GOOSE = 2
@@ -762,11 +3061,16 @@ SCORE_CRAB = 5
 
 chickens = [spawn_entity_outside(chicken_frames_right, chicken_frames_left, "chicken") for _ in range(BASE_MAX_CHICKENS)]
 CHICKEN_SPAWN_INTERVAL = 1.0  # seconds (adjust as you like)
-chicken_spawn_timer = CHICKEN_SPAWN_INTERVAL
+chicken_spawn_timer = None
 
 geese = []
 crabs = []
 
+chunk_streamer = None
+if ARENA_SCROLLS:
+    chunk_streamer = ChunkStreamer()
+    chunk_streamer.reset()
+
 GOOSE_MIN_SCORE = 10
 GOOSE_SPEED = 45  
 GOOSE_SPAWN_INTERVAL = 7.0   # seconds between goose appearances (tweak as you like)
@@ -775,8 +3079,8 @@ GOOSE_CHARGE_COOLDOWN = (0.9, 1.2)  # Min/max seconds between charges
 GOOSE_CHARGE_DURATION = 0.3        # How long the charge lasts
 GOOSE_CHARGE_SPEED = 650            # Goose charge speed (pixels/sec)
 GOOSE_CHARGE_WINDUP = 0.4             # Time goose stands still before charging
-goose_spawn_timer = GOOSE_SPAWN_INTERVAL
-goose_warning_timer = 0
+goose_spawn_timer = None
+goose_warning_timer = None
 goose_pending_spawn = False
 
 CRAB_MIN_SCORE = 0
@@ -788,15 +3092,14 @@ CRAB_CHARGE_DURATION = 3.0              # How long the charge lasts (tweak)
 CRAB_CHARGE_SPEED = 120                  # Crab charge speed (pixels/sec)
 CRAB_CHARGE_WINDUP = 0.15                 # Time crab stands still before charging
 CRAB_CHARGE_DEGREE_LIMIT = 5            # Crab's charge can deviate ±10 degrees from horizontal
-crab_spawn_timer = CRAB_SPAWN_INTERVAL
-crab_warning_timer = 0
-crab_pending_spawn = True
+crab_spawn_timer = None
+crab_warning_timer = None
+crab_pending_spawn = False
+reset_spawn_timers()
 
 # Golden power
 GOLDEN_POWER_REQUIRED = 3
 golden_power = 0
-charge_anim_timer = 0.0
-charge_anim_idx = 0
 
 # Game over
 GAME_OVER_DISPLAY_TIME = 5.0
@@ -804,14 +3107,59 @@ game_over = False
 game_over_timer = 0.0
 debug_explosion_circle = None
 
-# === MAIN LOOP ===
-while running:
-    dt = clock.tick(60) / 1000
-
-    for event in pygame.event.get():
+if RESUME_ENABLED and os.path.exists(SNAPSHOT_FILE):
+    try:
+        load_snapshot_file()
+    except (ValueError, TypeError, EOFError) as error:
+        # From an older version or another arena size. load_snapshot checks
+        # those before it changes anything, so the fresh run is intact.
+        print(f"Cannot resume from {SNAPSHOT_FILE} ({error}); starting a new run")
+        os.remove(SNAPSHOT_FILE)
+snapshot_autosave_timer = SNAPSHOT_AUTOSAVE_INTERVAL
+
+input_recorder = None
+input_replay = None
+if REPLAY_FILE:
+    input_replay = InputReplay(REPLAY_FILE)
+    highscore = input_replay.highscore
+    load_snapshot(input_replay.snapshot)
+elif RECORD_FILE:
+    input_recorder = InputRecorder()
+# Replays and training environments (rl_env.py) must not touch the real file
+persist_highscore = input_replay is None
+
+spectator_publisher = None
+if SPECTATE_ENABLED:
+    try:
+        spectator_publisher = spectator.SpectatorPublisher((
+            GAME_WIDTH, GAME_HEIGHT, PANEL_HEIGHT, FRAME_WIDTH, FRAME_HEIGHT, SCALE,
+            MAX_HEALTH, MAX_EGG_INVENTORY, GOLDEN_POWER_REQUIRED,
+        ), port=SPECTATE_PORT)
+    except OSError as error:
+        print(f"Spectators disabled: cannot listen on port {SPECTATE_PORT} ({error})")
+
+log_event("session", cabinet=CABINET, pid=os.getpid(), arena=[ARENA_WIDTH, ARENA_HEIGHT],
+          replay=input_replay is not None,
+          autopilot=AUTOPILOT_POLICY if AUTOPILOT_ENABLED else None)
+start_run()
+
+# === SIMULATION ===
+def simulate_frame(dt, frame_events, keys):
+    # One tick of the game: handles the frame's events, advances the world by
+    # dt and leaves the frame's draw list in render_queue. Returns False once
+    # the game should quit.
+    global explosions, orb_explosions, items
+    global score, highscore, player_health, invincibility_timer, egg_inventory
+    global golden_power, sim_time
+    global chicken_spawn_timer, goose_spawn_timer, goose_warning_timer, goose_pending_spawn
+    global crab_spawn_timer, crab_warning_timer, crab_pending_spawn
+    global game_over, game_over_timer, debug_explosion_circle, snapshot_autosave_timer
+    global loop_phase
+
+    loop_phase = "events"
+    for event in frame_events:
         if event.type == pygame.QUIT:
-            running = False
-            break
+            return False
         if not game_over:
             if event.type == pygame.KEYDOWN:
                 if not player.charging and not player.firing:
@@ -823,32 +3171,32 @@ while running:
             if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                 if not player.firing and not player.charging and not player.pending_fire:
                     player.pending_fire = True
-                    player.fire_key_timer = 0.0
+                    player.fire_press_time = event_time(event, dt)
 
             if event.type == pygame.KEYUP and event.key == pygame.K_SPACE:
-                if player.pending_fire and not player.charging:
+                # Held time comes from the two event stamps, so the stage does
+                # not depend on which frames the press and release landed in
+                held = event_time(event, dt) - player.fire_press_time
+                if player.pending_fire and held < CHARGE_INPUT_THRESHOLD:
                     player.facing_locked = True
                     player.facing_locked_dir = player.facing
 
                     player.pending_fire = False
-                    player.firing = True
-                    player.fire_frame = 0
-                    player.fire_timer = 0.0
+                    player.start_firing()
                     player.pending_bullet_stage = 0
                     fire_sound.play()
-                elif player.charging:
-                    stage = player.charge_stage
+                    log_event("shot", stage=0)
+                elif player.pending_fire:
+                    stage = charge_stage_after(held - CHARGE_INPUT_THRESHOLD)
                     player.charging = False
                     player.charge_timer = 0.0
                     player.charge_stage = 0
                     player.facing_locked = False
-                    player.firing = True
-                    player.fire_frame = 0
-                    player.fire_timer = 0.0
+                    player.start_firing()
                     player.pending_bullet_stage = stage
                     fire_sound.play()
+                    log_event("shot", stage=stage)
                 player.pending_fire = False
-                player.fire_key_timer = 0.0
 
             if event.type == pygame.KEYDOWN and event.key == pygame.K_e:
                     if golden_power > 0:
@@ -863,12 +3211,13 @@ while running:
                             for angle in angles:
                                 dx = math.cos(angle)
                                 dy = math.sin(angle)
-                                piercing_orbs.append(PiercingOrb(
-                                    player.x + FRAME_WIDTH * SCALE // 2, player.y + FRAME_WIDTH * SCALE // 2, (dx, dy), 
-                                    super_mode=(golden_power == GOLDEN_POWER_REQUIRED), 
-                                    custom_speed=speed
-                                ))
+                                spawn_orb(
+                                    player.x + FRAME_WIDTH * SCALE // 2, player.y + FRAME_WIDTH * SCALE // 2, dx, dy,
+                                    super_mode=(golden_power == GOLDEN_POWER_REQUIRED),
+                                    speed=speed
+                                )
 
+                        log_event("orb_burst", super=golden_power == GOLDEN_POWER_REQUIRED)
                         if golden_power == GOLDEN_POWER_REQUIRED:
                             golden_power = 0
                         else:
@@ -889,6 +3238,8 @@ while running:
                     explosion_scale = explosion_radius * 2 // frames_explosion[0].get_width()
                     explosions.append(Explosion(px - explosion_radius, py - explosion_radius, scale=explosion_scale))
                     explosion_sound.play()
+                    if particle_system is not None:
+                        particle_system.shockwave(px, py, explosion_radius)
                     #debug_explosion_circle = (px, py, explosion_radius, 0.2)
 
                     chickens_to_remove = set()
@@ -896,7 +3247,7 @@ while running:
                         cx, cy, cr = chicken.get_circle()
                         dist_sq = (px - cx) ** 2 + (py - cy) ** 2
                         if dist_sq <= explosion_radius ** 2:
-                            handle_enemy_death(chicken, "chicken", items, explosions)
+                            handle_enemy_death(chicken, "chicken", items, explosions, weapon="egg_bomb")
                             chickens_to_remove.add(chicken)
                     for chicken in chickens_to_remove:
                         if chicken in chickens:
@@ -907,7 +3258,7 @@ while running:
                         gx, gy, gr = goose.get_circle()
                         dist_sq = (px - gx) ** 2 + (py - gy) ** 2
                         if dist_sq <= explosion_radius ** 2:
-                            handle_enemy_death(goose, "goose", items, explosions)
+                            handle_enemy_death(goose, "goose", items, explosions, weapon="egg_bomb")
 
                             geese_to_remove.add(goose)
 
@@ -915,14 +3266,17 @@ while running:
                         if goose in geese:
                             geese.remove(goose)
 
+                    # Crabs shrug it off; one thud however many are caught
+                    thud = False
                     for crab in crabs:
                         cx, cy, cr = crab.get_circle()
                         dist_sq = (px - cx) ** 2 + (py - cy) ** 2
                         if dist_sq <= explosion_radius ** 2:
-                            dull_hit_sound.play()
-
-    if not running:
-        break
+                            emit_particles("sparks", cx, cy)
+                            thud = True
+                    if thud:
+                        dull_hit_sound.play()
+                    log_event("egg_bomb", kills=len(chickens_to_remove) + len(geese_to_remove))
 
     # --- Game Over Logic ---
     if game_over:
@@ -932,20 +3286,30 @@ while running:
             reset_game()
             game_over = False
         
-        game_surface.fill((32, 32, 40))
-
-        msg = font.render("GAME OVER", False, (255, 60, 60))
+        msg = render_text("GAME OVER", (255, 60, 60))
         msg_x = GAME_WIDTH // 2 - msg.get_width() // 2
         msg_y = GAME_HEIGHT // 2 - msg.get_height() // 2
-        game_surface.blit(msg, (msg_x, msg_y))
-
-        scaled_surface = pygame.transform.scale(game_surface, (WINDOW_WIDTH, WINDOW_HEIGHT))
-        screen.blit(scaled_surface, (0, 0))
-        pygame.display.flip()
-        continue
-
-    if invincibility_timer > 0:
-        invincibility_timer -= dt
+        if leaderboard_client is not None and leaderboard_client.top:
+            msg_y = 40
+            y = msg_y + msg.get_height() + 16
+            for rank, (cabinet, best) in enumerate(leaderboard_client.top, 1):
+                line = render_text(f"{rank}. {best:>5} {cabinet[:12]}", LEADERBOARD_TOP_COLOR)
+                render_queue.add(line, (GAME_WIDTH // 2 - 132, y), LAYER_HUD)
+                y += 16
+        render_queue.add(msg, (msg_x, msg_y), LAYER_HUD)
+        return True
+
+    loop_phase = "world"
+    sim_time += dt
+    if particle_system is not None:
+        particle_system.update(dt)
+        metrics.set("particles", particle_system.count)
+
+    if RESUME_ENABLED:
+        snapshot_autosave_timer -= dt
+        if snapshot_autosave_timer <= 0:
+            save_snapshot_file()
+            snapshot_autosave_timer = SNAPSHOT_AUTOSAVE_INTERVAL
 
     if debug_explosion_circle:
         cx, cy, rad, timer = debug_explosion_circle
@@ -955,29 +3319,18 @@ while running:
         else:
             debug_explosion_circle = (cx, cy, rad, timer)
 
-    keys = pygame.key.get_pressed()
-
     if player.pending_fire:
-        player.fire_key_timer += dt
-        if player.fire_key_timer >= CHARGE_INPUT_THRESHOLD and not player.charging:
+        charge_start = player.fire_press_time + CHARGE_INPUT_THRESHOLD
+        if sim_time >= charge_start and not player.charging:
             player.charging = True
-            player.charge_timer = 0.0
-            player.charge_stage = 0
-            player.charge_anim_frame = 0
-            player.charge_anim_timer = 0.0
+            player.charge_anim_start = charge_start
             player.facing_locked = True
             player.facing_locked_dir = player.facing
             player.charge_sfx_played = [False, False]   # <-- RESET HERE!
 
     if player.charging:
-        player.charge_timer += dt
-
-        if player.charge_timer >= CHARGE_STAGE_2:
-            player.charge_stage = 2
-        elif player.charge_timer >= CHARGE_STAGE_1:
-            player.charge_stage = 1
-        else:
-            player.charge_stage = 0
+        player.charge_timer = sim_time - player.charge_anim_start
+        player.charge_stage = charge_stage_after(player.charge_timer)
 
         if player.charge_stage == 1 and not player.charge_sfx_played[0]:
             charge1_sound.play()
@@ -986,34 +3339,52 @@ while running:
             charge2_sound.play()
             player.charge_sfx_played[1] = True
 
-        player.charge_anim_timer += dt
-        if player.charge_anim_timer >= 1 / ANIMATION_FPS:
-            player.charge_anim_timer -= 1 / ANIMATION_FPS
-            player.charge_anim_frame = (player.charge_anim_frame + 1) % NUM_FRAMES
-    else:
-        player.charge_anim_frame = 0
-        player.charge_anim_timer = 0.0
-
     player.update(dt, keys, firing_allowed=not player.firing, is_charging=player.charging)
 
-    if player.update_firing(dt):
+    if player.update_firing():
         if player.pending_bullet_stage is not None:
             spawn_fireball(player, player.facing_locked_dir, player.pending_bullet_stage)
             player.pending_bullet_stage = None
         player.facing_locked = False
 
+    update_camera()
+    flow_window = None
+    if chunk_streamer is not None:
+        col0, row0, col1, row1 = chunk_streamer.span(ARENA_AWAKE_MARGIN)
+        flow_window = (col0 * ARENA_CHUNK_SIZE, row0 * ARENA_CHUNK_SIZE,
+                       (col1 + 1) * ARENA_CHUNK_SIZE, (row1 + 1) * ARENA_CHUNK_SIZE)
+    flow_field.update(player.x + FRAME_WIDTH * SCALE // 2, player.y + FRAME_HEIGHT * SCALE // 2, flow_window)
+    if chunk_streamer is not None:
+        chunk_streamer.stream()
+        chunk_streamer.tick_drowsy()
+        metrics.set("arena_awake", len(chickens) + len(geese) + len(crabs))
+        metrics.set("arena_asleep", chunk_streamer.asleep)
     for chicken in chickens:
         chicken.update(dt, player.x, player.y)
-    for bullet in bullets:
-        bullet.update(dt)
-    for explosion in explosions:
-        explosion.update(dt)
+    if projectile_store is not None:
+        projectile_store.update(dt)
     explosions = [e for e in explosions if not e.finished]
 
     # --- Chicken-Chicken Collision Resolution ---
+    # Pairs come from a grid as wide as two chickens, so each chicken is only
+    # compared with its neighbours. Pushes that bring a new pair together
+    # are left for the next frame.
+    cell_size = CHICKEN_SEPARATION_CELL
+    cells = {}
+    starts = []
+    for i, chicken in enumerate(chickens):
+        x, y, _ = chicken.get_circle()
+        cell = (int(x // cell_size), int(y // cell_size))
+        cells.setdefault(cell, []).append(i)
+        starts.append(cell)
     for i, a in enumerate(chickens):
+        col, row = starts[i]
+        near = [j for dc in (-1, 0, 1) for dr in (-1, 0, 1) for j in cells.get((col + dc, row + dr), ()) if j > i]
+        if not near:
+            continue
+        near.sort()
         ax, ay, ar = a.get_circle()
-        for j in range(i + 1, len(chickens)):
+        for j in near:
             b = chickens[j]
             bx, by, br = b.get_circle()
             dx = bx - ax
@@ -1029,366 +3400,337 @@ while running:
                 b.x += nx * overlap / 2
                 b.y += ny * overlap / 2
 
-    for orb in piercing_orbs:
-        orb.update(dt)
-    piercing_orbs = [o for o in piercing_orbs if o.alive]
-
-    for exp in orb_explosions:
-        exp.update(dt)
     orb_explosions = [e for e in orb_explosions if not e.finished]
 
-    if score >= GOOSE_MIN_SCORE:
-        if not goose_pending_spawn:
-            goose_spawn_timer -= dt
-            if goose_spawn_timer <= 0:
-                goose_warning_timer = GOOSE_WARNING_TIME
-                goose_pending_spawn = True
-                goose_spawn_timer = GOOSE_SPAWN_INTERVAL
-        else:
-            goose_warning_timer -= dt
-            if goose_warning_timer <= 0:
-                new_goose = spawn_entity_outside(goose_frames_right, goose_frames_left, "goose", speed=GOOSE_SPEED)
-                new_goose.charge_timer = random.uniform(*GOOSE_CHARGE_COOLDOWN)
-                new_goose.is_charging = False
-                new_goose.charge_dx = 0.0
-                new_goose.charge_dy = 0.0
-                new_goose.charge_time_left = 0.0
-                new_goose.is_winding_up = False
-                new_goose.windup_time_left = 0.0
-                new_goose.charge_target_x = 0.0
-                new_goose.charge_target_y = 0.0
-                geese.append(new_goose)
-                goose_pending_spawn = False
-
-    if goose_warning_timer > 0:
-        goose_warning_timer -= dt
-
-    if crab_warning_timer > 0:
-        crab_warning_timer -= dt
+    # Spawns, warnings, charge phases and lifetimes that run out this frame
+    timers.advance(dt)
+
+    if score >= GOOSE_MIN_SCORE and not goose_pending_spawn and goose_spawn_timer is None:
+        goose_spawn_timer = timers.after(GOOSE_SPAWN_INTERVAL * governor.spawn_interval_scale, start_goose_warning)
+    if score >= CRAB_MIN_SCORE and not crab_pending_spawn and crab_spawn_timer is None:
+        crab_spawn_timer = timers.after(CRAB_SPAWN_INTERVAL * governor.spawn_interval_scale, start_crab_warning)
 
     for goose in geese[:]:
-        handle_enemy_charge(goose, player.x, player.y, dt,
-            charge_cooldown_range=GOOSE_CHARGE_COOLDOWN,
-            charge_duration=GOOSE_CHARGE_DURATION,
-            charge_speed=GOOSE_CHARGE_SPEED,
-            charge_windup=GOOSE_CHARGE_WINDUP,
-            charge_degree_limit=None 
-        )
+        handle_enemy_charge(goose, player.x, player.y, dt)
         push_chickens_away_from_enemy(goose, chickens)
 
     for crab in crabs:
-        handle_enemy_charge(crab, player.x, player.y, dt,
-            charge_cooldown_range=CRAB_CHARGE_COOLDOWN,
-            charge_duration=CRAB_CHARGE_DURATION,
-            charge_speed=CRAB_CHARGE_SPEED,
-            charge_windup=CRAB_CHARGE_WINDUP,
-            charge_degree_limit=CRAB_CHARGE_DEGREE_LIMIT 
-        )
+        handle_enemy_charge(crab, player.x, player.y, dt)
         push_chickens_away_from_enemy(crab, chickens)
 
-    if score >= CRAB_MIN_SCORE:
-        if not crab_pending_spawn:
-            crab_spawn_timer -= dt
-            if crab_spawn_timer <= 0:
-                crab_warning_timer = CRAB_WARNING_TIME
-                crab_pending_spawn = True
-                crab_spawn_timer = CRAB_SPAWN_INTERVAL
-        else:
-            crab_warning_timer -= dt
-            if crab_warning_timer <= 0:
-                new_crab = spawn_entity_outside(crab_frames_right, crab_frames_left, "crab", speed=CRAB_SPEED)
-                new_crab.charge_timer = random.uniform(*CRAB_CHARGE_COOLDOWN)
-                new_crab.is_charging = False
-                new_crab.charge_dx = 0.0
-                new_crab.charge_dy = 0.0
-                new_crab.charge_time_left = 0.0
-                new_crab.is_winding_up = False
-                new_crab.windup_time_left = 0.0
-                new_crab.charge_target_x = 0.0
-                new_crab.charge_target_y = 0.0
-                crabs.append(new_crab)
-                crab_pending_spawn = False
-
-    # --- Collisions: Player <-> Chickens ---
-    pcx, pcy, pr = player.get_circle()
-    chicken_hit_player = False
-    for chicken in chickens:
-        cx, cy, cr = chicken.get_circle()
-        dist_sq = (pcx - cx) ** 2 + (pcy - cy) ** 2
-        if dist_sq <= (pr + cr) ** 2:
-            chicken_hit_player = True
-            break
+    contact_motion.begin_frame()
 
-    goose_hit_player = False
-    for goose in geese:
-        gx, gy, gr = goose.get_circle()
-        dist_sq = (pcx - gx) ** 2 + (pcy - gy) ** 2
-        if dist_sq <= (pr + gr) ** 2:
-            goose_hit_player = True
-            break
-
-    crab_hit_player = False
-    for crab in crabs:
-        cx, cy, cr = crab.get_circle()
-        dist_sq = (pcx - cx) ** 2 + (pcy - cy) ** 2
-        if dist_sq <= (pr + cr) ** 2:
-            crab_hit_player = True
-            break
-
-    if (chicken_hit_player or goose_hit_player or crab_hit_player) and invincibility_timer <= 0:
+    # --- Collisions: Player <-> Enemies ---
+    loop_phase = "collisions"
+    # Touching at all counts, so a hit lands again when invincibility runs out
+    player_enemy_contacts.update((player,), chickens + geese + crabs)
+    if player_enemy_contacts.touching and invincibility_left() <= 0:
         player_health -= 1
-        invincibility_timer = INVINCIBILITY_TIME
+        invincibility_timer = timers.after(INVINCIBILITY_TIME)
         hurt_sound.play()
         if player_health < 0:
             player_health = 0
+        _, attacker = next(iter(player_enemy_contacts.touching))
+        log_event("damage", cause=attacker.type, health=player_health)
         if player_health <= 0 and not game_over:
             game_over = True
             game_over_timer = GAME_OVER_DISPLAY_TIME
+            end_run("game_over")
             if score > highscore:
                 highscore = score
-                save_highscore(highscore)
-
-    # --- Collisions: Bullet <-> Chickens ---
-    bullets_to_remove = set()
-    chickens_to_remove = set()
-    for bullet in bullets[:]:
-        bullet_hit = False
-        bx, by, br = bullet.get_circle()
-        for chicken in chickens[:]:
-            if chicken in bullet.hit_enemies:
+                if persist_highscore:
+                    save_highscore(highscore)
+            if RESUME_ENABLED and os.path.exists(SNAPSHOT_FILE):
+                os.remove(SNAPSHOT_FILE)  # The run is over, nothing to resume
+
+    # --- Collisions: Projectiles <-> Enemies ---
+    # Every hit ends the pair, as either the enemy dies or the projectile
+    # stops, so touching at all counts and a piercing shot still hits each
+    # enemy once. Fireballs go before orbs.
+    killed = set()
+    if projectile_store is not None and projectile_store.count:
+        enemies = chickens + geese + crabs
+        rows, hits = projectile_store.contacts(sim_time, [enemy.get_circle() for enemy in enemies])
+        frames = projectile_store.frame_indices(sim_time)
+        spent = set()
+        for row, index in zip(rows.tolist(), hits.tolist()):
+            enemy = enemies[index]
+            if row in spent or enemy in killed:
                 continue
-            cx, cy, cr = chicken.get_circle()
-            if (bx - cx) ** 2 + (by - cy) ** 2 <= (br + cr) ** 2:
-                bullet.hit_enemies.add(chicken)
-                chickens_to_remove.add(chicken)
-                handle_enemy_death(chicken, "chicken", items, explosions)
-                if not bullet.piercing:
-                    bullets_to_remove.add(bullet)
-                    bullet_hit = True
-                    break  # Only break for non-piercing bullets
-
-        if not bullet_hit:
-            for goose in geese:
-                gx, gy, gr = goose.get_circle()
-                dist_sq = (bx - gx) ** 2 + (by - gy) ** 2
-                if dist_sq <= (br + gr) ** 2:
-                    if bullet.charge_stage >= 1:
-                        handle_enemy_death(goose, "goose", items, explosions)
-                        geese.remove(goose)
-                    else:
-                        dull_hit_sound.play()
-                    bullets_to_remove.add(bullet)
-                    bullet_hit = True
-                    break
-
-        if not bullet_hit:
-            for crab in crabs:
-                cx, cy, cr = crab.get_circle()
-                dist_sq = (bx - cx) ** 2 + (by - cy) ** 2
-                if dist_sq <= (br + cr) ** 2:
-                    if bullet.charge_stage >= 2:
-                        handle_enemy_death(crab, "crab", items, explosions)
-                        crabs.remove(crab)
-                    else:
-                        dull_hit_sound.play()
-                    bullets_to_remove.add(bullet)
-                    bullet_hit = True
-                    break
-                
-    for bullet in bullets_to_remove:
-        if bullet in bullets:
-            bullets.remove(bullet)
-    for chicken in chickens_to_remove:
-        if chicken in chickens:
-            chickens.remove(chicken)
-
-    # Collision Orb --> Enemies
-    for orb in piercing_orbs:
-        ox, oy, orad = orb.get_circle()
-
-        for chicken in list(chickens):
-            cx, cy, cr = chicken.get_circle()
-            dist_sq = (ox - cx)**2 + (oy - cy)**2
-            if dist_sq <= (orad + cr)**2 and chicken not in orb.enemies_hit:
-                orb.enemies_hit.add(chicken)
-                chickens.remove(chicken)
-                handle_enemy_death(chicken, "chicken", items, explosions, "orb")
-        
-        for goose in list(geese):
-            if goose not in orb.enemies_hit:
-                gx, gy, gr = goose.get_circle()
-                dist_sq = (ox - gx) ** 2 + (oy - gy) ** 2
-                if dist_sq <= (orad + gr) ** 2:
-                    orb.enemies_hit.add(goose)
-                    geese.remove(goose)
-                    handle_enemy_death(goose, "goose", items, explosions, "orb")
-
-        for crab in list(crabs):
-            if crab not in orb.enemies_hit:
-                cx, cy, cr = crab.get_circle()
-                dist_sq = (ox - cx) ** 2 + (oy - cy) ** 2
-                if dist_sq <= (orad + cr) ** 2:
-                    orb.enemies_hit.add(crab)
-                    crabs.remove(crab)
-                    handle_enemy_death(crab, "crab", items, explosions, "orb")
+            if not hitboxes_overlap(*projectile_hitbox(row, frames[row]), *enemy.get_hitbox()):
+                continue
+            if projectile_store.kind[row] == projectiles.ORB:
+                killed.add(enemy)
+                handle_enemy_death(enemy, enemy.type, items, explosions, "orb", weapon="orb")
+                continue
+            stage = int(projectile_store.stage[row])
+            if enemy.type == "chicken":
+                killed.add(enemy)
+                handle_enemy_death(enemy, "chicken", items, explosions, stage=stage)
+                if not projectile_store.pierce[row]:
+                    spent.add(row)
+                continue
+            # Geese need a charged shot and crabs a full one; anything less
+            # bounces off. Either way the bullet stops here.
+            if stage >= (1 if enemy.type == "goose" else 2):
+                killed.add(enemy)
+                handle_enemy_death(enemy, enemy.type, items, explosions, stage=stage)
+            else:
+                dull_hit_sound.play()
+                hitbox, x, y = projectile_hitbox(row, frames[row])
+                emit_particles("sparks", x + hitbox.cx, y + hitbox.cy)
+            spent.add(row)
+        projectile_store.remove(spent)
+        metrics.set("projectile_tests", projectile_store.tests)
+    for enemy in killed:
+        enemy_list(enemy).remove(enemy)
 
     # --- Collisions: Player <-> Items ---
+    # Checked while touching, so a heart is taken once health drops
+    player_item_contacts.update((player,), items)
     items_to_remove = []
-    for item in items:
-        item_rect = item.get_rect()
-        dx = (item_rect.centerx - pcx)
-        dy = (item_rect.centery - pcy)
-        if (dx**2 + dy**2) <= (pr + item_rect.width // 2) ** 2:
-            if item.kind == "egg":
-                if egg_inventory < MAX_EGG_INVENTORY:
-                    egg_inventory += 1
-                    pickup_sound.play()
-                    items_to_remove.append(item)
-                else:
-                    score += 1  # Or show a "Bonus!" message
-                    pickup_sound.play()
-                    items_to_remove.append(item)
-
-            elif item.kind == "golden_egg":
+    for (_, item), new in player_item_contacts.touching.items():
+        if item.kind == "egg":
+            bonus = egg_inventory >= MAX_EGG_INVENTORY
+            if not bonus:
+                egg_inventory += 1
+            else:
+                score += 1  # Or show a "Bonus!" message
+            pickup_sound.play()
+            items_to_remove.append(item)
+            log_event("pickup", item="egg", bonus=bonus)
+
+        elif item.kind == "golden_egg":
+            if golden_power < GOLDEN_POWER_REQUIRED:
+                golden_power += 1
+                items_to_remove.append(item)
+                charge_full_sound.play()
+                log_event("pickup", item="golden_egg")
+            elif new:
                 charge_full_sound.play()
-                if golden_power < GOLDEN_POWER_REQUIRED:
-                    golden_power += 1
-                    items_to_remove.append(item)
 
-            elif item.kind == "heart":
-                if player_health < MAX_HEALTH:
-                    player_health += 1
-                    pickup_sound.play()
-                    items_to_remove.append(item)
+        elif item.kind == "heart":
+            if player_health < MAX_HEALTH:
+                player_health += 1
+                pickup_sound.play()
+                items_to_remove.append(item)
+                log_event("pickup", item="heart")
 
     for item in items_to_remove:
         items.remove(item)
 
-    bullets = [b for b in bullets if 0 <= b.x <= GAME_WIDTH and 0 <= b.y <= GAME_HEIGHT]
+    metrics.set("contact_tests", sum(layer.tests for layer in CONTACT_LAYERS))
+    metrics.set("contact_pairs_skipped", sum(layer.skipped for layer in CONTACT_LAYERS))
+
+    if projectile_store is not None:
+        projectile_store.cull(camera_x, camera_y, GAME_WIDTH, GAME_HEIGHT)
+        metrics.set("projectiles", projectile_store.count)
 
-    max_chickens = min(BASE_MAX_CHICKENS + score // 5, MAX_CHICKENS_CAP)
+    max_chickens = governor.chicken_cap(min(BASE_MAX_CHICKENS + score // 5, MAX_CHICKENS_CAP))
+    metrics.set("max_chickens", max_chickens)
 
+    # The countdown only runs while below the cap and restarts when dropping under it
     if len(chickens) < max_chickens:
-        chicken_spawn_timer -= dt
-        if chicken_spawn_timer <= 0:
-            chickens.append(spawn_entity_outside(chicken_frames_right, chicken_frames_left, "chicken"))
-            chicken_spawn_timer = CHICKEN_SPAWN_INTERVAL 
-    else:
-        chicken_spawn_timer = CHICKEN_SPAWN_INTERVAL 
+        if chicken_spawn_timer is None:
+            chicken_spawn_timer = timers.after(CHICKEN_SPAWN_INTERVAL * governor.spawn_interval_scale, spawn_chicken)
+    elif chicken_spawn_timer is not None:
+        chicken_spawn_timer.cancel()
+        chicken_spawn_timer = None
 
-    # Update items on ground
+    # Update items on ground; they despawn through their lifetime timers
     for item in items:
         item.update(dt)
-    items = [item for item in items if not item.is_gone()]
 
     # --- DRAW ---
-    game_surface.fill((32, 32, 40))
-
-    player.draw(game_surface, invincibility_timer > 0, player.firing)
-
-    if player.charging:
-        base_frame = charge_anim_frames[player.charge_anim_frame]
-
-        charge_stage = player.charge_stage  # 0, 1, or 2
-        charge_color = CHARGE_FIREBALL_COLORS[charge_stage]
-
-        col_frame = colorize_frame(base_frame, charge_color)
-
-        fx = int(player.x + FRAME_WIDTH * SCALE // 2 - col_frame.get_width() // 2)
-        fy = int(player.y + FRAME_HEIGHT * SCALE // 2 - col_frame.get_height() // 2)
-        game_surface.blit(col_frame, (fx, fy))
-
-    if False:
-        pcx, pcy, pr = player.get_circle()
-        pygame.draw.circle(game_surface, (0,255,255), (int(pcx), int(pcy)), int(pr), 1)
-
-    for chicken in chickens:
-        chicken.draw(game_surface)
+    loop_phase = "draw"
+    if ARENA_SCROLLS:
+        draw_arena_grid(render_queue)
+    for x, y, w, h in ARENA_WALLS:
+        if x < camera_x + VIEW_WIDTH and x + w > camera_x and y < camera_y + VIEW_HEIGHT and y + h > camera_y:
+            render_queue.add_fill(WALL_COLOR, (x, y, w, h), LAYER_GROUND)
 
     for goose in geese:
-        goose.draw(game_surface)
-        if getattr(goose, 'is_winding_up', False):
+        if governor.show_telegraphs and getattr(goose, 'is_winding_up', False):
             line_length = int(GOOSE_CHARGE_SPEED * GOOSE_CHARGE_DURATION)
             gx = int(goose.x + goose_frames_right[0].get_width() // 2)
             gy = int(goose.y + goose_frames_right[0].get_height() // 2)
             tx = int(gx + goose.charge_dx * line_length)
             ty = int(gy + goose.charge_dy * line_length)
-            pygame.draw.line(game_surface, (255, 32, 32), (gx, gy), (tx, ty), 3)
+            render_queue.add_line((255, 32, 32), (gx, gy), (tx, ty), 3, LAYER_TELEGRAPH)
 
     for crab in crabs:
-        crab.draw(game_surface)
-        if getattr(crab, 'is_winding_up', False):
+        if governor.show_telegraphs and getattr(crab, 'is_winding_up', False):
             line_length = int(CRAB_CHARGE_SPEED * CRAB_CHARGE_DURATION)
             cx = int(crab.x + crab_frames_right[0].get_width() // 2)
             cy = int(crab.y + crab_frames_right[0].get_height() // 2)
             tx = int(cx + crab.charge_dx * line_length)
             ty = int(cy + crab.charge_dy * line_length)
-            pygame.draw.line(game_surface, (32, 255, 200), (cx, cy), (tx, ty), 3)
+            render_queue.add_line((32, 255, 200), (cx, cy), (tx, ty), 3, LAYER_TELEGRAPH)
+
+    player.draw(render_queue, invincibility_left() > 0, player.firing)
+
+    if player.charging and governor.show_charge_effect:
+        base_frame = charge_anim_frames[player.charge_anim_frame]
 
-    for bullet in bullets:
-        bullet.draw(game_surface)
-    for orb in piercing_orbs:
-        orb.draw(game_surface)
+        charge_stage = player.charge_stage  # 0, 1, or 2
+        charge_color = CHARGE_FIREBALL_COLORS[charge_stage]
+
+        col_frame = colorize_frame(base_frame, charge_color)
+
+        fx = int(player.x + FRAME_WIDTH * SCALE // 2 - col_frame.get_width() // 2)
+        fy = int(player.y + FRAME_HEIGHT * SCALE // 2 - col_frame.get_height() // 2)
+        render_queue.add(col_frame, (fx, fy), LAYER_CHARGE_EFFECT)
+
+    for chicken in chickens:
+        chicken.draw(render_queue)
+    for goose in geese:
+        goose.draw(render_queue)
+    for crab in crabs:
+        crab.draw(render_queue)
+    for _, frame, position in projectile_sprites():
+        render_queue.add(frame, position, LAYER_PROJECTILES)
     for explosion in explosions:
-        explosion.draw(game_surface)
+        explosion.draw(render_queue)
     for exp in orb_explosions:
-        exp.draw(game_surface)
+        exp.draw(render_queue)
+    if particle_system is not None:
+        render_queue.add_particles(particle_system, LAYER_EFFECTS)
+    for item in items:
+        item.draw(render_queue)
+
+    if False:
+        pcx, pcy, pr = player.get_circle()
+        render_queue.add_circle((0,255,255), (int(pcx) - camera_x, int(pcy) - camera_y), int(pr), 1, LAYER_DEBUG)
 
     if debug_explosion_circle:
         pass
         cx, cy, rad, timer = debug_explosion_circle
-        pygame.draw.circle(game_surface, (255,255,0), (int(cx), int(cy)), int(rad), 2)
+        render_queue.add_circle((255,255,0), (int(cx) - camera_x, int(cy) - camera_y), int(rad), 2, LAYER_DEBUG)
 
-    for item in items:
-        item.draw(game_surface)
+    metrics.set("sprites_culled", render_queue.culled)
 
-    if goose_warning_timer > 0:
-        warning = font.render("GOOSE!", False, (255, 255, 0))
-        game_surface.blit(warning, (GAME_WIDTH//2 - warning.get_width()//2, 110))
+    panel_rect = (0, GAME_HEIGHT - PANEL_HEIGHT, GAME_WIDTH, PANEL_HEIGHT)
+    render_queue.add_fill((48,48,64), panel_rect, LAYER_PANEL)
 
-    if crab_warning_timer > 0:
-        warning = font.render("CRAB!", False, (255, 255, 0))
-        game_surface.blit(warning, (GAME_WIDTH//2 - warning.get_width()//2, 110))
+    base_y = GAME_HEIGHT - PANEL_HEIGHT
 
-    panel_rect = pygame.Rect(0, GAME_HEIGHT - PANEL_HEIGHT, GAME_WIDTH, PANEL_HEIGHT)
-    pygame.draw.rect(game_surface, (48,48,64), panel_rect)
+    if goose_warning_timer is not None:
+        warning = render_text("GOOSE!", (255, 255, 0))
+        render_queue.add(warning, (GAME_WIDTH//2 - warning.get_width()//2, 110), LAYER_HUD)
 
-    base_y = GAME_HEIGHT - PANEL_HEIGHT
+    if crab_warning_timer is not None:
+        warning = render_text("CRAB!", (255, 255, 0))
+        render_queue.add(warning, (GAME_WIDTH//2 - warning.get_width()//2, 110), LAYER_HUD)
 
-    score_text = font.render(f"Score: {score}", False, (255, 255, 255))
-    highscore_text = font.render(f"High Score: {highscore}", False, (255, 255, 100))
-    game_surface.blit(score_text, (2, base_y + 2))
-    game_surface.blit(highscore_text, (2, base_y + 16))  # Just below the score
+    score_text = render_text(f"Score: {score}", (255, 255, 255))
+    highscore_text = render_text(f"High Score: {highscore}", (255, 255, 100))
+    render_queue.add(score_text, (2, base_y + 2), LAYER_HUD)
+    render_queue.add(highscore_text, (2, base_y + 16), LAYER_HUD)  # Just below the score
 
-    egg_text = font.render(f"Eggs: {egg_inventory} / {MAX_EGG_INVENTORY}", False, (255,255,0))
-    game_surface.blit(egg_text, (2, base_y + 30))   # 18px down from previous, tweak as needed
+    egg_text = render_text(f"Eggs: {egg_inventory} / {MAX_EGG_INVENTORY}", (255,255,0))
+    render_queue.add(egg_text, (2, base_y + 30), LAYER_HUD)   # 18px down from previous, tweak as needed
 
-    difficulty_text = font.render(f"Difficulty: {score // 5}", False, (180,180,255))
-    game_surface.blit(difficulty_text, (2, base_y + 44))  # another ~18px down
+    difficulty_text = render_text(f"Difficulty: {score // 5}", (180,180,255))
+    render_queue.add(difficulty_text, (2, base_y + 44), LAYER_HUD)  # another ~18px down
 
     for i in range(MAX_HEALTH):
         x = 200 + i * (heart_full.get_width() + 4)
         y = base_y + 10  
         if i < player_health:
-            game_surface.blit(heart_full, (x, y))
+            render_queue.add(heart_full, (x, y), LAYER_HUD)
         else:
-            game_surface.blit(heart_empty, (x, y))
+            render_queue.add(heart_empty, (x, y), LAYER_HUD)
 
     battery_x = GAME_WIDTH - 96  
     battery_y = GAME_HEIGHT - PANEL_HEIGHT + 8
 
     if golden_power == GOLDEN_POWER_REQUIRED:
-        charge_anim_timer += dt
-        if charge_anim_timer >= 0.15:
-            charge_anim_timer -= 0.15
-            charge_anim_idx = (charge_anim_idx + 1) % len(charge_full_anim)
-        frame = charge_full_anim[charge_anim_idx]
+        frame = charge_full_anim[CHARGE_FULL_CLIP.index(0.0)]
     else:
         frame = charge_frames[golden_power]
-        charge_anim_idx = 0
-        charge_anim_timer = 0
-    game_surface.blit(frame, (battery_x, battery_y))
+    render_queue.add(frame, (battery_x, battery_y), LAYER_HUD)
+    return True
+
+startup_profile.lap("game setup")
+
+# === MAIN LOOP ===
+# Importing main (see rl_env.py) sets the game up without running it
+if __name__ == "__main__":
+    frame_pacer = None
+    if not FIXED_STEP:
+        frame_pacer = FramePacer(PACING_MODE if PACING_MODE != "vsync" or vsync_enabled else "hybrid", TICK_RATE)
+    presented = True
+    while running:
+        loop_phase = "pacing"
+        if FIXED_STEP:
+            dt = FRAME_BUDGET
+        else:
+            dt = frame_pacer.tick(idle=not presented, background=not window_visible)
+        frame_start = time.perf_counter()
+
+        if input_replay is not None and input_replay.finished:
+            break
+        if pause_requested():
+            loop_phase = "paused"
+            if not run_paused():
+                break
+            frame_pacer.restart()
+            continue
+        loop_phase = "input"
+        dt, frame_events, keys = read_input(dt)
+        if not simulate_frame(dt, frame_events, keys):
+            break
 
-    scaled_surface = pygame.transform.scale(game_surface, (WINDOW_WIDTH, WINDOW_HEIGHT))
-    screen.blit(scaled_surface, (0, 0))
-    pygame.display.flip()
\ No newline at end of file
+        loop_phase = "present"
+        publish_spectators()
+        presented = present_frame()
+        if not startup_profile.reported:
+            startup_profile.lap("first frame")
+            startup_profile.reported = True
+            if PROFILE_STARTUP:
+                startup_profile.report()
+            threading.Thread(target=warm_sounds, name="sounds", daemon=True).start()
+            threading.Thread(target=load_projectiles, name="projectiles", daemon=True).start()
+            if PARTICLES_ENABLED:
+                threading.Thread(target=load_particles, name="particles", daemon=True).start()
+
+        loop_phase = "bookkeeping"
+        governor.record(time.perf_counter() - frame_start)
+        if sampling_profiler is not None:
+            metrics.set("profile_samples", sampling_profiler.samples)
+        if event_log is not None:
+            metrics.set("events_logged", event_log.written)
+            metrics.set("events_dropped", event_log.dropped + event_log.failed)
+        if leaderboard_client is not None:
+            metrics.set("leaderboard_queued", leaderboard_client.queued)
+            metrics.set("leaderboard_sent", leaderboard_client.sent)
+        if METRICS_ENABLED:
+            metrics.maybe_print()
+        if memory_monitor is not None:
+            memory_monitor.maybe_report()
+        if frame_capture is not None and frame_capture.closed:
+            running = False  # The encoder or ring reader went away
+
+    loop_phase = "shutdown"
+    if frame_pipeline is not None:
+        finished = frame_pipeline.stop()
+        if finished is not None:
+            show_frame(*finished)
+    if frame_capture is not None:
+        frame_capture.close()
+    if input_recorder is not None:
+        input_recorder.save(RECORD_FILE)
+    if spectator_publisher is not None:
+        spectator_publisher.close()
+    if not game_over:
+        end_run("quit")
+    if event_log is not None:
+        event_log.close()
+    if leaderboard_client is not None:
+        leaderboard_client.close()
+    if METRICS_ENABLED:
+        metrics.print_report()
+    if sampling_profiler is not None:
+        sampling_profiler.stop()
+        print(f"Sample profile: {sampling_profiler.samples} samples ({sampling_profiler.missed} missed) "
+              f"in {SAMPLE_PROFILE_FILE}, sampler used {sampling_profiler.overhead():.2%} of a core")
@@ -0,0 +1,171 @@
+"""Particle effects: feathers, shell shards, impact sparks and the egg-bomb shockwave.
+
+Every live particle is a row across a set of preallocated NumPy arrays, so
+ParticleSystem.update integrates and culls all of them with a handful of
+whole-array operations, however many there are. Dead rows are squeezed out
+by copying the survivors to the front; nothing is allocated per particle.
+
+snapshot() hands the renderer a ParticleBatch: positions already in view
+pixels and colours as palette indices, copied out so the simulation can
+carry on while a render thread draws the last frame. draw_batch() writes a
+batch into a surface through a surfarray view, one fancy-indexed store per
+pixel of the particle size rather than a blit per particle.
+
+Particles are cosmetic. They draw from their own random generator, so the
+game's RNG and therefore replays are untouched, and snapshots leave them
+out. Needs numpy.
+"""
+import numpy
+import pygame
+
+CAPACITY = 32768  # Bursts past this are cut short
+
+# Colour ramps, brightest first. A particle walks down its ramp as it ages.
+RAMP_LENGTH = 4
+RAMPS = {
+    "feather": ((255, 255, 255), (235, 235, 240), (205, 205, 215), (160, 160, 175)),
+    "goose": ((245, 245, 245), (200, 200, 200), (150, 150, 155), (105, 105, 115)),
+    "shell": ((255, 150, 100), (235, 100, 65), (185, 65, 45), (125, 40, 30)),
+    "spark": ((255, 255, 210), (255, 230, 120), (255, 170, 60), (200, 90, 30)),
+    "shockwave": ((255, 255, 225), (255, 220, 130), (255, 160, 70), (190, 85, 45)),
+}
+RAMP_NAMES = tuple(RAMPS)
+PALETTE = [color for name in RAMP_NAMES for color in RAMPS[name]]
+
+# name: (ramp, count, speed range px/s, lifetime range s, drag 1/s, fall px/s^2, size px)
+EFFECTS = {
+    "feathers": ("feather", 28, (20, 90), (0.6, 1.2), 3.0, 40.0, 2),
+    "goose_feathers": ("goose", 40, (25, 110), (0.7, 1.4), 3.0, 40.0, 2),
+    "shell_shards": ("shell", 20, (60, 180), (0.3, 0.6), 5.0, 0.0, 2),
+    "sparks": ("spark", 10, (80, 220), (0.12, 0.3), 8.0, 0.0, 1),
+}
+SHOCKWAVE_COUNT = 128
+SHOCKWAVE_LIFETIME = 0.3  # seconds to reach the edge of the blast
+
+class ParticleBatch:
+    # One frame's visible particles, in view pixels. Hashed by identity, so
+    # the dirty-rect tracker sees a new batch every frame.
+    def __init__(self, xs, ys, colors, large):
+        self.xs = xs
+        self.ys = ys
+        self.colors = colors
+        self.large = large  # Mask of the 2x2 particles
+        self.rect = pygame.Rect(int(xs.min()), int(ys.min()),
+                                int(xs.max() - xs.min()) + 2, int(ys.max() - ys.min()) + 2)
+
+class ParticleSystem:
+    def __init__(self, capacity=CAPACITY, seed=None):
+        self.rng = numpy.random.default_rng(seed)
+        self.x = numpy.zeros(capacity, numpy.float32)
+        self.y = numpy.zeros(capacity, numpy.float32)
+        self.vx = numpy.zeros(capacity, numpy.float32)
+        self.vy = numpy.zeros(capacity, numpy.float32)
+        self.fall = numpy.zeros(capacity, numpy.float32)
+        self.drag = numpy.zeros(capacity, numpy.float32)
+        self.age = numpy.zeros(capacity, numpy.float32)
+        self.life = numpy.ones(capacity, numpy.float32)
+        self.ramp = numpy.zeros(capacity, numpy.uint8)   # Palette index of the ramp's first colour
+        self.size = numpy.ones(capacity, numpy.uint8)
+        self.arrays = (self.x, self.y, self.vx, self.vy, self.fall, self.drag,
+                       self.age, self.life, self.ramp, self.size)
+        self.count = 0
+
+    def clear(self):
+        self.count = 0
+
+    def allocate(self, count):
+        # Rows for up to count new particles, or None when full
+        start = self.count
+        count = min(count, len(self.x) - start)
+        if count <= 0:
+            return None
+        self.count = start + count
+        return slice(start, start + count)
+
+    def spawn(self, rows, x, y, speeds, angles, lifetimes, ramp, drag, fall, size):
+        self.x[rows] = x
+        self.y[rows] = y
+        self.vx[rows] = numpy.cos(angles) * speeds
+        self.vy[rows] = numpy.sin(angles) * speeds
+        self.age[rows] = 0.0
+        self.life[rows] = lifetimes
+        self.ramp[rows] = RAMP_NAMES.index(ramp) * RAMP_LENGTH
+        self.drag[rows] = drag
+        self.fall[rows] = fall
+        self.size[rows] = size
+
+    def burst(self, effect, x, y):
+        ramp, count, speed_range, life_range, drag, fall, size = EFFECTS[effect]
+        rows = self.allocate(count)
+        if rows is None:
+            return
+        n = rows.stop - rows.start
+        rng = self.rng
+        self.spawn(rows, x, y, rng.uniform(*speed_range, n), rng.uniform(0.0, 2 * numpy.pi, n),
+                   rng.uniform(*life_range, n), ramp, drag, fall, size)
+
+    def shockwave(self, x, y, radius):
+        # An evenly spaced ring that reaches radius as it fades out
+        rows = self.allocate(SHOCKWAVE_COUNT)
+        if rows is None:
+            return
+        n = rows.stop - rows.start
+        angles = numpy.arange(n) * (2 * numpy.pi / SHOCKWAVE_COUNT)
+        self.spawn(rows, x, y, radius / SHOCKWAVE_LIFETIME, angles, SHOCKWAVE_LIFETIME,
+                   "shockwave", 0.0, 0.0, 1)
+
+    def update(self, dt):
+        n = self.count
+        if not n:
+            return
+        self.age[:n] += dt
+        alive = self.age[:n] < self.life[:n]
+        if not alive.all():
+            n = int(numpy.count_nonzero(alive))
+            for array in self.arrays:
+                array[:n] = array[:self.count][alive]
+            self.count = n
+        damping = numpy.exp(-self.drag[:n] * dt)
+        self.vx[:n] *= damping
+        self.vy[:n] *= damping
+        self.vy[:n] += self.fall[:n] * dt
+        self.x[:n] += self.vx[:n] * dt
+        self.y[:n] += self.vy[:n] * dt
+
+    def snapshot(self, left, top, width, height):
+        # The particles inside the given view, or None when there are none
+        n = self.count
+        if not n:
+            return None
+        xs = self.x[:n].astype(numpy.int32) - left
+        ys = self.y[:n].astype(numpy.int32) - top
+        visible = (xs >= 0) & (ys >= 0) & (xs < width - 1) & (ys < height - 1)
+        if not visible.any():
+            return None
+        shade = numpy.minimum(self.age[:n] / self.life[:n] * RAMP_LENGTH, RAMP_LENGTH - 1).astype(numpy.uint8)
+        colors = self.ramp[:n] + shade
+        return ParticleBatch(xs[visible], ys[visible], colors[visible], self.size[:n][visible] > 1)
+
+palette_cache = {}  # Surface pixel format -> PALETTE mapped to that format
+
+def mapped_palette(target):
+    key = (target.get_bitsize(), target.get_masks())
+    palette = palette_cache.get(key)
+    if palette is None:
+        palette = numpy.array([target.map_rgb(color) for color in PALETTE], numpy.uint32)
+        palette_cache[key] = palette
+    return palette
+
+def draw_batch(target, batch):
+    # Honours the clip rect, since dirty-rect repaints replay into clipped regions
+    clip = target.get_clip()
+    colors = mapped_palette(target)[batch.colors]
+    pixels = pygame.surfarray.pixels2d(target)
+    for dx, dy, only_large in ((0, 0, False), (1, 0, True), (0, 1, True), (1, 1, True)):
+        xs = batch.xs + dx
+        ys = batch.ys + dy
+        inside = (xs >= clip.left) & (xs < clip.right) & (ys >= clip.top) & (ys < clip.bottom)
+        if only_large:
+            inside &= batch.large
+        pixels[xs[inside], ys[inside]] = colors[inside]
+    del pixels  # Unlocks the surface
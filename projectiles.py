@@ -0,0 +1,188 @@
+"""Projectiles: the player's fireballs and the golden orbs.
+
+Every projectile in flight is a row across a set of NumPy arrays, the way
+particles.py keeps particles, so moving, culling and hit-testing all of them
+is a handful of whole-array operations however many there are. Dead rows are
+squeezed out by copying the survivors to the front, which keeps rows in the
+order they were fired; the arrays double when they fill up.
+
+A row's position is where main.py draws from: a fireball's sprite corner, an
+orb's centre. contacts() finds the projectile and enemy hit circles that
+come close enough to touch. It sorts the enemies by x, so each projectile is
+only measured against the enemies in its own column, and leaves the pixel
+masks to main.py for the few pairs it returns.
+
+The arrays are float64, the same arithmetic as Python floats, so a replay
+moves every projectile exactly as the recording did. Needs numpy.
+"""
+import numpy
+
+BULLET = 0
+ORB = 1
+
+CAPACITY = 1024  # Rows to start with
+CONTACT_SLACK = 2.0  # Added to every reach, as positions are cut to whole pixels before masks meet
+
+class ProjectileStore:
+    def __init__(self, clips, bullet_circles, capacity=CAPACITY):
+        # clips: (frame count, frames per second) of each kind's animation.
+        # bullet_circles: [stage][frame] -> (cx, cy, radius), a fireball's
+        # hit circle relative to its sprite corner.
+        self.frame_counts = numpy.array([length for length, _ in clips], numpy.int64)
+        self.frame_rates = numpy.array([fps for _, fps in clips], numpy.float64)
+        self.bullet_circles = numpy.array(bullet_circles, numpy.float64)
+        self.count = 0
+        self.next_id = 0
+        self.tests = 0  # Pairs measured by the last contacts()
+        self.allocate_arrays(capacity)
+
+    def allocate_arrays(self, capacity):
+        self.x = numpy.zeros(capacity, numpy.float64)
+        self.y = numpy.zeros(capacity, numpy.float64)
+        self.vx = numpy.zeros(capacity, numpy.float64)
+        self.vy = numpy.zeros(capacity, numpy.float64)
+        self.radius = numpy.zeros(capacity, numpy.float64)  # Orbs only
+        self.life = numpy.zeros(capacity, numpy.float64)    # Seconds left; inf for fireballs
+        self.born = numpy.zeros(capacity, numpy.float64)    # Game clock at launch, for the animation
+        self.stage = numpy.zeros(capacity, numpy.int64)     # Charge stage; fireballs only
+        self.kind = numpy.zeros(capacity, numpy.int64)
+        self.pierce = numpy.zeros(capacity, numpy.bool_)    # Carries on through what it kills
+        self.ident = numpy.zeros(capacity, numpy.int64)     # Never reused, for spectators
+        self.arrays = (self.x, self.y, self.vx, self.vy, self.radius, self.life, self.born,
+                       self.stage, self.kind, self.pierce, self.ident)
+
+    def grow(self):
+        old = self.arrays
+        self.allocate_arrays(len(self.x) * 2)
+        for array, values in zip(self.arrays, old):
+            array[:self.count] = values[:self.count]
+
+    def add(self, kind, x, y, vx, vy, born, stage=0, radius=0.0, life=numpy.inf, pierce=False):
+        if self.count == len(self.x):
+            self.grow()
+        row = self.count
+        self.x[row] = x
+        self.y[row] = y
+        self.vx[row] = vx
+        self.vy[row] = vy
+        self.radius[row] = radius
+        self.life[row] = life
+        self.born[row] = born
+        self.stage[row] = stage
+        self.kind[row] = kind
+        self.pierce[row] = pierce
+        self.ident[row] = self.next_id
+        self.next_id += 1
+        self.count = row + 1
+
+    def keep(self, alive):
+        # Drops the rows where alive is False, keeping the order of the rest
+        n = int(numpy.count_nonzero(alive))
+        if n == self.count:
+            return
+        for array in self.arrays:
+            array[:n] = array[:self.count][alive]
+        self.count = n
+
+    def remove(self, rows):
+        if rows:
+            alive = numpy.ones(self.count, numpy.bool_)
+            alive[list(rows)] = False
+            self.keep(alive)
+
+    def clear(self, kind=None):
+        if kind is None:
+            self.count = 0
+        else:
+            self.keep(self.kind[:self.count] != kind)
+
+    def update(self, dt):
+        n = self.count
+        if not n:
+            return
+        self.x[:n] += self.vx[:n] * dt
+        self.y[:n] += self.vy[:n] * dt
+        self.life[:n] -= dt
+
+    def cull(self, left, top, width, height):
+        # Drops what has run out of time, and what is outside the view by
+        # more than its radius
+        n = self.count
+        if not n:
+            return
+        x, y, margin = self.x[:n], self.y[:n], self.radius[:n]
+        alive = ((x >= left - margin) & (x <= left + width + margin)
+                 & (y >= top - margin) & (y <= top + height + margin)
+                 & (self.life[:n] > 0))
+        self.keep(alive)
+
+    def frame_indices(self, now):
+        # Each row's animation frame at game time now; the animations loop
+        n = self.count
+        kind = self.kind[:n]
+        periods = ((now - self.born[:n]) * self.frame_rates[kind] + 1e-6).astype(numpy.int64)
+        return periods % self.frame_counts[kind]
+
+    def circles(self, now):
+        # Hit circle centres and radii of every row
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        bullets = self.kind[:n] == BULLET
+        circles = self.bullet_circles[self.stage[:n], self.frame_indices(now) % self.bullet_circles.shape[1]]
+        cx = numpy.where(bullets, x + circles[:, 0], x)
+        cy = numpy.where(bullets, y + circles[:, 1], y)
+        radius = numpy.where(bullets, circles[:, 2], self.radius[:n])
+        return cx, cy, radius
+
+    def contacts(self, now, enemy_circles):
+        # (rows, indices into enemy_circles) of the pairs whose hit circles
+        # touch, give or take CONTACT_SLACK: fireballs before orbs, then by
+        # row, then by enemy
+        n = self.count
+        self.tests = 0
+        if not n or not enemy_circles:
+            empty = numpy.zeros(0, numpy.int64)
+            return empty, empty
+        enemy_circles = numpy.array(enemy_circles, numpy.float64)
+        enemy_x, enemy_y, enemy_radius = enemy_circles[:, 0], enemy_circles[:, 1], enemy_circles[:, 2]
+        cx, cy, radius = self.circles(now)
+
+        # Each row's run of enemies in x order that its reach spans
+        order = numpy.argsort(enemy_x, kind="stable")
+        sorted_x = enemy_x[order]
+        reach = radius + enemy_radius.max() + CONTACT_SLACK
+        first = numpy.searchsorted(sorted_x, cx - reach, "left")
+        last = numpy.searchsorted(sorted_x, cx + reach, "right")
+        spans = last - first
+        total = int(spans.sum())
+        self.tests = total
+        if not total:
+            empty = numpy.zeros(0, numpy.int64)
+            return empty, empty
+        rows = numpy.repeat(numpy.arange(n), spans)
+        within = numpy.arange(total) - numpy.repeat(numpy.cumsum(spans) - spans, spans)
+        enemies = order[numpy.repeat(first, spans) + within]
+
+        dx = enemy_x[enemies] - cx[rows]
+        dy = enemy_y[enemies] - cy[rows]
+        limit = radius[rows] + enemy_radius[enemies] + CONTACT_SLACK
+        touching = dx * dx + dy * dy <= limit * limit
+        rows = rows[touching]
+        enemies = enemies[touching]
+        order = numpy.lexsort((enemies, rows, self.kind[rows]))
+        return rows[order], enemies[order]
+
+    def state(self):
+        # Plain lists, for snapshots
+        n = self.count
+        return (self.next_id, tuple(array[:n].tolist() for array in self.arrays))
+
+    def load_state(self, state):
+        next_id, columns = state
+        n = len(columns[0])
+        while len(self.x) < n:
+            self.grow()
+        for array, values in zip(self.arrays, columns):
+            array[:n] = values
+        self.count = n
+        self.next_id = next_id
@@ -0,0 +1,379 @@
+"""Gym-style training environment over the game simulation.
+
+WizardEnv imports main.py headless and calls simulate_frame() directly, with
+reset(seed) -> (obs, info) and step(action) -> (obs, reward, terminated,
+truncated, info). The game lives in main's module globals, so there is one
+WizardEnv per process; VectorWizardEnv runs several in worker processes and
+returns batched observations through shared memory.
+
+Actions are a flat index below ACTION_COUNT: MOVES[action // len(BUTTONS)]
+picks the held movement keys and BUTTONS[action % len(BUTTONS)] what happens
+with SPACE, Q and E. A charge shot is SPACE held over several steps, fired by
+the first action that lets go of it. Each step runs FRAME_SKIP frames.
+
+Observations are a dict holding one or both of:
+  "features"  float32 (FEATURE_SIZE,): player state, then the MAX_ENTITIES
+              nearest entities as a one-hot kind, position relative to the
+              player and whether they are winding up or charging
+  "pixels"    uint8 (height, width, 3) RGB of the frame, PIXEL_DOWNSCALE
+              times smaller than game_surface
+The arrays are reused every step; copy them to keep them. Needs numpy.
+"""
+import math
+import multiprocessing
+import os
+import random
+import sys
+from multiprocessing import shared_memory
+
+import numpy
+
+# Training runs headless; set before pygame is first imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import capture
+
+FRAME_SKIP = 4
+MAX_EPISODE_STEPS = 10_000
+HURT_PENALTY = 5.0     # reward lost per heart
+PIXEL_DOWNSCALE = 4
+
+MOVES = [(0, 0), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+BUTTON_NONE = 0
+BUTTON_TAP_FIRE = 1    # Press and release SPACE, a plain shot
+BUTTON_HOLD_FIRE = 2   # Keep SPACE down to charge
+BUTTON_EGG_BOMB = 3    # Q
+BUTTON_SUPER = 4       # E
+BUTTONS = [BUTTON_NONE, BUTTON_TAP_FIRE, BUTTON_HOLD_FIRE, BUTTON_EGG_BOMB, BUTTON_SUPER]
+ACTION_COUNT = len(MOVES) * len(BUTTONS)
+
+ENTITY_KINDS = ["chicken", "goose", "crab", "bullet", "orb", "egg", "golden_egg", "heart"]
+PLAYER_FEATURES = 9
+ENTITY_FEATURES = len(ENTITY_KINDS) + 3
+MAX_ENTITIES = 32
+FEATURE_SIZE = PLAYER_FEATURES + MAX_ENTITIES * ENTITY_FEATURES
+
+OBS_TYPES = {
+    "features": ("features",),
+    "pixels": ("pixels",),
+    "both": ("features", "pixels"),
+}
+
+game = None  # main.py, imported by the first WizardEnv
+
+def load_game():
+    global game
+    if game is None:
+        # Import from the game folder, since assets load by relative path.
+        # main reads its flags from sys.argv as it loads, so it gets none:
+        # the trainer's own command line is not for the game.
+        cwd = os.getcwd()
+        argv = sys.argv
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        sys.argv = argv[:1]
+        try:
+            import main
+        finally:
+            sys.argv = argv
+            os.chdir(cwd)
+        game = main
+    return game
+
+class WizardEnv:
+    active = False
+
+    def __init__(self, obs_type="features", frame_skip=FRAME_SKIP, max_steps=MAX_EPISODE_STEPS):
+        if WizardEnv.active:
+            raise RuntimeError("One WizardEnv per process; use VectorWizardEnv for more")
+        WizardEnv.active = True
+        load_game()
+        pygame = game.pygame
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.obs_keys = OBS_TYPES[obs_type]
+        self.action_count = ACTION_COUNT
+        self.move_keys = [self.keys_for_move(dx, dy) for dx, dy in MOVES]
+
+        self.arena_height = game.GAME_HEIGHT - game.PANEL_HEIGHT
+        pixel_size = (game.GAME_WIDTH // PIXEL_DOWNSCALE, game.GAME_HEIGHT // PIXEL_DOWNSCALE)
+        self.obs = {}
+        if "features" in self.obs_keys:
+            self.obs["features"] = numpy.zeros(FEATURE_SIZE, numpy.float32)
+        if "pixels" in self.obs_keys:
+            self.obs["pixels"] = numpy.zeros((pixel_size[1], pixel_size[0], 3), numpy.uint8)
+            self.small_surface = pygame.Surface(pixel_size, 0, game.game_surface)
+
+        game.persist_highscore = False
+        self.start_state = game.save_snapshot()
+        self.held = set()
+        self.pending_events = []
+        self.steps = 0
+        self.last_score = 0
+        self.last_health = 0
+
+    @staticmethod
+    def keys_for_move(dx, dy):
+        pygame = game.pygame
+        keys = set()
+        if dx < 0:
+            keys.add(pygame.K_LEFT)
+        elif dx > 0:
+            keys.add(pygame.K_RIGHT)
+        if dy < 0:
+            keys.add(pygame.K_UP)
+        elif dy > 0:
+            keys.add(pygame.K_DOWN)
+        return keys
+
+    def reset(self, seed=None):
+        # Every episode starts from the state the game had when it was
+        # imported; the random stream carries on unless a seed is given
+        rng_state = random.getstate()
+        game.load_snapshot(self.start_state)
+        if seed is None:
+            random.setstate(rng_state)
+        else:
+            random.seed(seed)
+        game.render_queue.take()
+        self.held = set()
+        self.pending_events = []
+        self.steps = 0
+        self.last_score = game.score
+        self.last_health = game.player_health
+        self.observe(None)
+        return self.obs, self.info()
+
+    def step(self, action):
+        pygame = game.pygame
+        move_keys = self.move_keys[action // len(BUTTONS)]
+        button = BUTTONS[action % len(BUTTONS)]
+
+        # Turn the action into the key events a player would have produced
+        events = self.pending_events
+        self.pending_events = []
+        held = set(move_keys)
+        for key in move_keys - self.held:
+            events.append((pygame.KEYDOWN, key))
+        for key in (self.held - move_keys) - {pygame.K_SPACE}:
+            events.append((pygame.KEYUP, key))
+        release = []
+        if pygame.K_SPACE in self.held:
+            if button == BUTTON_HOLD_FIRE:
+                held.add(pygame.K_SPACE)
+            else:
+                events.append((pygame.KEYUP, pygame.K_SPACE))
+        elif button == BUTTON_HOLD_FIRE:
+            events.append((pygame.KEYDOWN, pygame.K_SPACE))
+            held.add(pygame.K_SPACE)
+        elif button == BUTTON_TAP_FIRE:
+            events.append((pygame.KEYDOWN, pygame.K_SPACE))
+            release.append((pygame.KEYUP, pygame.K_SPACE))
+        if button == BUTTON_EGG_BOMB:
+            events.append((pygame.KEYDOWN, pygame.K_q))
+        elif button == BUTTON_SUPER:
+            events.append((pygame.KEYDOWN, pygame.K_e))
+        self.held = held
+        if self.frame_skip == 1:
+            self.pending_events = release
+            release = []
+
+        keys = game.ReplayKeys(held)
+        terminated = False
+        for frame in range(self.frame_skip):
+            frame_events = [pygame.event.Event(kind, key=key, age=0.0) for kind, key in events]
+            events = release if frame == 0 else []
+            game.simulate_frame(game.FRAME_BUDGET, frame_events, keys)
+            if game.game_over:
+                terminated = True
+                break
+            if frame < self.frame_skip - 1:
+                game.render_queue.take()
+
+        self.steps += 1
+        reward = (game.score - self.last_score) + HURT_PENALTY * (game.player_health - self.last_health)
+        self.last_score = game.score
+        self.last_health = game.player_health
+        self.observe(game.render_queue.take())
+        truncated = not terminated and self.steps >= self.max_steps
+        return self.obs, reward, terminated, truncated, self.info()
+
+    def info(self):
+        return {"score": game.score, "health": game.player_health, "steps": self.steps}
+
+    def observe(self, entries):
+        if "features" in self.obs:
+            self.write_features(self.obs["features"])
+        if "pixels" in self.obs:
+            if entries is None:
+                # Nothing simulated yet this episode; run a zero-length frame
+                # for the draw list
+                game.simulate_frame(0.0, [], game.ReplayKeys(()))
+                entries = game.render_queue.take()
+            game.draw_entries(game.game_surface, entries)
+            game.pygame.transform.scale(game.game_surface, self.small_surface.get_size(), self.small_surface)
+            capture.copy_rgb(self.small_surface, self.obs["pixels"])
+
+    def write_features(self, out):
+        player = game.player
+        px, py, _ = player.get_circle()
+        width, height = game.GAME_WIDTH, self.arena_height
+        out[:PLAYER_FEATURES] = (
+            px / width, py / height,
+            game.player_health / game.MAX_HEALTH,
+            game.egg_inventory / game.MAX_EGG_INVENTORY,
+            game.golden_power / game.GOLDEN_POWER_REQUIRED,
+            game.invincibility_left() > 0,
+            player.charging,
+            player.charge_stage / 2,
+            player.facing == "right",
+        )
+
+        nearby = []
+        for kind, group in ((0, game.chickens), (1, game.geese), (2, game.crabs)):
+            for entity in group:
+                x, y, _ = entity.get_circle()
+                busy = getattr(entity, "is_charging", False) or getattr(entity, "is_winding_up", False)
+                nearby.append(((x - px) ** 2 + (y - py) ** 2, kind, x - px, y - py, busy))
+        store = game.projectile_store
+        if store is not None and store.count:
+            xs, ys, _ = store.circles(game.sim_time)
+            kinds = numpy.where(store.kind[:store.count] == game.projectiles.BULLET, 3, 4)
+            for kind, x, y in zip(kinds.tolist(), xs.tolist(), ys.tolist()):
+                nearby.append(((x - px) ** 2 + (y - py) ** 2, kind, x - px, y - py, False))
+        for item in game.items:
+            hitbox, x, y = item.get_hitbox()
+            x += hitbox.cx - px
+            y += hitbox.cy - py
+            nearby.append((x * x + y * y, ENTITY_KINDS.index(item.kind), x, y, False))
+        nearby.sort(key=lambda entry: entry[0])
+
+        table = out[PLAYER_FEATURES:].reshape(MAX_ENTITIES, ENTITY_FEATURES)
+        table.fill(0)
+        for row, (_, kind, dx, dy, busy) in zip(table, nearby):
+            row[kind] = 1
+            row[-3:] = (dx / width, dy / height, busy)
+
+    def close(self):
+        pass
+
+# === VECTOR ENV ===
+CMD_STEP = b"s"
+CMD_RESET = b"r"
+CMD_CLOSE = b"c"
+
+def attach_shared(names):
+    arrays = {}
+    blocks = []
+    for key, (name, shape, dtype) in names.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = numpy.ndarray(shape, dtype, buffer=block.buf)
+    return arrays, blocks
+
+def run_worker(index, conn, obs_type, frame_skip, max_steps):
+    env = WizardEnv(obs_type, frame_skip, max_steps)
+    conn.send({key: (array.shape, array.dtype.str) for key, array in env.obs.items()})
+    arrays, blocks = attach_shared(conn.recv())
+    # Observations are written straight into this worker's row
+    env.obs = {key: arrays[key][index] for key in env.obs}
+    while True:
+        command = conn.recv_bytes()
+        if command == CMD_STEP:
+            _, reward, terminated, truncated, info = env.step(int(arrays["actions"][index]))
+            arrays["rewards"][index] = reward
+            arrays["terminated"][index] = terminated
+            arrays["truncated"][index] = truncated
+            arrays["score"][index] = info["score"]
+            if terminated or truncated:
+                env.reset()  # The returned observation starts the next episode
+        elif command == CMD_RESET:
+            seed = int(arrays["seeds"][index])
+            _, info = env.reset(seed if seed >= 0 else None)
+            arrays["score"][index] = info["score"]
+        else:
+            break
+        conn.send_bytes(b"")
+    env.obs = {}
+    arrays = None
+    for block in blocks:
+        block.close()
+    conn.close()
+
+class VectorWizardEnv:
+    def __init__(self, num_envs, obs_type="features", frame_skip=FRAME_SKIP, max_steps=MAX_EPISODE_STEPS):
+        self.num_envs = num_envs
+        self.action_count = ACTION_COUNT
+        context = multiprocessing.get_context("spawn")
+        self.pipes = []
+        self.workers = []
+        for index in range(num_envs):
+            parent_end, child_end = context.Pipe()
+            worker = context.Process(target=run_worker, name="env-" + str(index),
+                                     args=(index, child_end, obs_type, frame_skip, max_steps), daemon=True)
+            worker.start()
+            child_end.close()
+            self.pipes.append(parent_end)
+            self.workers.append(worker)
+
+        specs = [pipe.recv() for pipe in self.pipes]
+        layout = {key: (tuple(shape), dtype) for key, (shape, dtype) in specs[0].items()}
+        self.obs_keys = tuple(layout)
+        layout.update({
+            "actions": ((), "<i4"), "seeds": ((), "<i8"), "rewards": ((), "<f4"),
+            "terminated": ((), "|b1"), "truncated": ((), "|b1"), "score": ((), "<i4"),
+        })
+        self.blocks = []
+        self.arrays = {}
+        names = {}
+        for key, (shape, dtype) in layout.items():
+            shape = (num_envs,) + shape
+            size = max(1, math.prod(shape) * numpy.dtype(dtype).itemsize)
+            block = shared_memory.SharedMemory(create=True, size=size)
+            self.blocks.append(block)
+            self.arrays[key] = numpy.ndarray(shape, dtype, buffer=block.buf)
+            names[key] = (block.name, shape, dtype)
+        for pipe in self.pipes:
+            pipe.send(names)
+        self.obs = {key: self.arrays[key] for key in self.obs_keys}
+
+    def broadcast(self, command):
+        for pipe in self.pipes:
+            pipe.send_bytes(command)
+        for pipe in self.pipes:
+            pipe.recv_bytes()
+
+    def reset(self, seed=None):
+        # Environment i gets seed + i
+        if seed is None:
+            self.arrays["seeds"][:] = -1
+        else:
+            self.arrays["seeds"][:] = numpy.arange(seed, seed + self.num_envs)
+        self.broadcast(CMD_RESET)
+        return self.obs, {"score": self.arrays["score"].copy()}
+
+    def step(self, actions):
+        # Finished environments reset themselves; their row of the returned
+        # observations is already the first of the next episode
+        self.arrays["actions"][:] = actions
+        self.broadcast(CMD_STEP)
+        return (self.obs, self.arrays["rewards"].copy(), self.arrays["terminated"].copy(),
+                self.arrays["truncated"].copy(), {"score": self.arrays["score"].copy()})
+
+    def close(self):
+        if not self.pipes:
+            return
+        for pipe in self.pipes:
+            pipe.send_bytes(CMD_CLOSE)
+        for worker in self.workers:
+            worker.join()
+        for pipe in self.pipes:
+            pipe.close()
+        self.obs = {}
+        self.arrays = {}
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.pipes = []
+        self.workers = []
@@ -0,0 +1,121 @@
+"""Sampling profiler for the game loop.
+
+main.py --sample-profile PATH samples the main thread's stack SAMPLE_RATE
+times a second (--sample-rate HZ) and writes the counts in the collapsed
+stack format that flame graph tools read, one stack per line, root first:
+
+    [world];main.py:<module>;main.py:simulate_frame;main.py:update 212
+
+The root of every stack is the loop phase the game was in when the sample
+was taken, from the markers main.py sets as it goes round the loop, so
+time spent in the same function can be told apart by phase. Render with
+e.g. flamegraph.pl PATH > flame.svg, or load PATH into speedscope.
+
+Unlike cProfile nothing runs on the main thread: a background thread wakes
+up, reads sys._current_frames() and walks the frame chain, keying counts by
+the code objects themselves so that no strings are built until the file is
+written. A sample itself takes a couple of microseconds, but waking up and
+waiting on the GIL cost more. At the default 100 Hz the sampler thread
+measured 1.2% to 1.8% of a core over 30 to 40 second runs with the
+autopilot playing, both in the paced 60 fps loop and headless at full
+speed. At 200 Hz, paced, it measured 2.2% to 3.9%. main.py reports the
+figure for each run at the end. The file is rewritten every
+WRITE_INTERVAL, so a long run on a cabinet keeps its profile if it is
+killed.
+"""
+import os
+import sys
+import threading
+import time
+
+SAMPLE_RATE = 100       # Hz
+WRITE_INTERVAL = 30.0   # seconds
+MAX_DEPTH = 128         # Deeper stacks are cut at the root end
+
+class SamplingProfiler:
+    def __init__(self, path, rate=SAMPLE_RATE, phase_of=None):
+        self.path = path
+        self.interval = 1.0 / rate
+        self.phase_of = phase_of  # Returns the main thread's current phase
+        self.thread_id = threading.main_thread().ident
+        self.counts = {}          # (phase, code objects leaf first) -> samples
+        self.samples = 0
+        self.missed = 0           # Ticks skipped because the sampler fell behind
+        self.cpu_time = 0.0       # Seconds of CPU the sampler thread has used
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()  # Between the sampler and write()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="sampler", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        next_sample = time.perf_counter()
+        next_write = next_sample + WRITE_INTERVAL
+        cpu_start = time.thread_time()
+        while True:
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay < 0:
+                # Fell behind (a stall, or the GIL was held); skip the lost
+                # ticks rather than taking a burst of samples to catch up
+                skipped = int(-delay / self.interval) + 1
+                self.missed += skipped
+                next_sample += skipped * self.interval
+                delay += skipped * self.interval
+            if self.stopping.wait(delay):
+                break
+            self.sample()
+            self.cpu_time = time.thread_time() - cpu_start
+            if next_sample >= next_write:
+                next_write = next_sample + WRITE_INTERVAL
+                self.write()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        codes = []
+        while frame is not None and len(codes) < MAX_DEPTH:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        key = (self.phase_of() if self.phase_of else "", tuple(codes))
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def collapsed(self):
+        # The counts as collapsed stack lines; stacks that differ only in
+        # code objects with the same name are merged
+        with self.lock:
+            counts = list(self.counts.items())
+        merged = {}
+        names = {}
+        for (phase, codes), count in counts:
+            frames = ["[" + phase + "]"] if phase else []
+            for code in reversed(codes):
+                name = names.get(code)
+                if name is None:
+                    name = f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(";", ":")
+                    names[code] = name
+                frames.append(name)
+            stack = ";".join(frames)
+            merged[stack] = merged.get(stack, 0) + count
+        return [f"{stack} {count}" for stack, count in sorted(merged.items())]
+
+    def write(self):
+        # Written to a temporary file first, so readers never see half a profile
+        lines = self.collapsed()
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            f.write("\n".join(lines) + "\n" if lines else "")
+        os.replace(temporary, self.path)
+
+    def overhead(self):
+        # Share of one core the sampler has used so far
+        elapsed = time.perf_counter() - self.started
+        return self.cpu_time / elapsed if elapsed > 0 else 0.0
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        self.write()
@@ -0,0 +1,411 @@
+"""Live spectator stream for lobby screens and remote monitors.
+
+The game runs a SpectatorPublisher (main.py --spectate) that sends world
+state over TCP: a keyframe every KEYFRAME_INTERVAL frames or when a viewer
+joins, and small deltas in between. Entities are sent as sprite codes and
+integer positions, so the viewer only needs the sprite sheets, not the game.
+
+Watch a running game with:  python spectator.py [host] [port]
+"""
+import select
+import socket
+import struct
+import sys
+
+SPECTATOR_HOST = "127.0.0.1"
+SPECTATOR_PORT = 7777
+KEYFRAME_INTERVAL = 120      # frames
+MAX_CLIENT_BACKLOG = 256 * 1024  # bytes queued for a viewer before it is dropped
+
+MSG_HELLO = 0
+MSG_KEYFRAME = 1
+MSG_DELTA = 2
+
+HUD_GOOSE_WARNING = 1
+HUD_CRAB_WARNING = 2
+HUD_GAME_OVER = 4
+
+HEADER = struct.Struct("<IB")            # body length, message type
+HELLO = struct.Struct("<HHHBBBBBB")      # game w/h, panel h, frame w/h, scale, max health, max eggs, golden power
+FRAME_HEAD = struct.Struct("<I")         # frame number
+HUD = struct.Struct("<IIBBBB")           # score, high score, eggs, health, golden power, flags
+COUNT = struct.Struct("<H")
+ENTITY = struct.Struct("<HHhh")          # net id, sprite code, x, y
+MOVED = struct.Struct("<HbbH")           # net id, dx, dy, sprite code
+NET_ID = struct.Struct("<H")
+
+# Sprite sets both ends agree on. A sprite code is set index * 16 + frame.
+SPRITE_SETS = [
+    # name, image, row, frames, scale multiplier, tint
+    ("player_run_right", "player.png", 0, 4, 1, None),
+    ("player_run_left", "player.png", 1, 4, 1, None),
+    ("player_fire_right", "player.png", 2, 4, 1, None),
+    ("player_fire_left", "player.png", 3, 4, 1, None),
+    ("player_charge_right", "player.png", 4, 4, 1, None),
+    ("player_charge_left", "player.png", 5, 4, 1, None),
+    ("chicken_right", "chicken.png", 0, 4, 1, None),
+    ("chicken_left", "chicken.png", 1, 4, 1, None),
+    ("goose_right", "goose.png", 0, 4, 1, None),
+    ("goose_left", "goose.png", 1, 4, 1, None),
+    ("crab_right", "crab.png", 0, 4, 1, None),
+    ("crab_left", "crab.png", 1, 4, 1, None),
+    ("fireball_0", "fireball.png", 0, 4, 1, (255, 255, 255)),
+    ("fireball_1", "fireball.png", 0, 4, 1, (255, 120, 40)),
+    ("fireball_2", "fireball.png", 0, 4, 1, (100, 200, 255)),
+    ("explosion", "fireball.png", 1, 4, 1, None),
+    ("explosion_x4", "fireball.png", 1, 4, 4, None),
+    ("orb", "fireball.png", 2, 4, 1, None),
+    ("orb_explosion", "fireball.png", 3, 4, 1, None),
+    ("egg", "egg.png", 0, 1, 1, None),
+    ("golden_egg", "egg.png", 1, 1, 1, None),
+    ("heart", "heart.png", 0, 1, 1, None),
+]
+SPRITE_SET_INDEX = {entry[0]: i for i, entry in enumerate(SPRITE_SETS)}
+
+def sprite_codes(named_frames):
+    # {set name: frames} -> {frame surface: sprite code}, for the publisher
+    codes = {}
+    for name, frames in named_frames.items():
+        base = SPRITE_SET_INDEX[name] * 16
+        for i, frame in enumerate(frames):
+            codes[frame] = base + i
+    return codes
+
+def quantize(v):
+    return max(-32768, min(32767, int(round(v))))
+
+def pack_message(msg_type, body):
+    return HEADER.pack(len(body) + 1, msg_type) + body
+
+
+# === PUBLISHER ===
+class SpectatorConnection:
+    def __init__(self, sock, hello):
+        self.sock = sock
+        self.backlog = bytearray(hello)
+
+class SpectatorPublisher:
+    def __init__(self, hello, host=SPECTATOR_HOST, port=SPECTATOR_PORT,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.server.bind((host, port))
+            self.server.listen()
+        except OSError:
+            self.server.close()
+            raise
+        self.server.setblocking(False)
+        self.hello = pack_message(MSG_HELLO, HELLO.pack(*hello))
+        self.keyframe_interval = keyframe_interval
+        self.clients = []
+        self.net_ids = {}       # key -> net id, for the keys in the last frame
+        self.next_id = 0
+        self.prev = {}          # net id -> (sprite code, x, y)
+        self.prev_hud = None
+        self.frame_no = 0
+        self.since_keyframe = keyframe_interval
+        self.bytes_sent = 0
+
+    @property
+    def address(self):
+        return self.server.getsockname()
+
+    def accept_viewers(self):
+        # Non-blocking; returns True when anyone is watching
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                break
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.clients.append(SpectatorConnection(sock, self.hello))
+            self.since_keyframe = self.keyframe_interval  # New viewers need a keyframe
+        return bool(self.clients)
+
+    def publish(self, entities, hud):
+        # entities: iterable of (key, sprite code, x, y), where key is
+        # anything hashable that stays the same for as long as the thing it
+        # stands for is on screen; hud: HUD tuple
+        self.frame_no += 1
+        current = {}
+        net_ids = {}
+        for key, code, x, y in entities:
+            net_id = self.net_ids.get(key)
+            if net_id is None:
+                net_id = self.allocate_id(current)
+            net_ids[key] = net_id
+            current[net_id] = (code, quantize(x), quantize(y))
+        self.net_ids = net_ids  # What left the screen gets a new id if it comes back
+
+        if self.since_keyframe >= self.keyframe_interval:
+            message = self.encode_keyframe(current, hud)
+            self.since_keyframe = 0
+        else:
+            message = self.encode_delta(current, hud)
+            self.since_keyframe += 1
+        self.prev = current
+        self.prev_hud = hud
+        self.send(message)
+
+    def allocate_id(self, current):
+        # Ids are 16 bits and wrap, so one still on screen last frame, or
+        # already given out this frame, is skipped rather than handed out twice
+        while True:
+            net_id = self.next_id
+            self.next_id = (net_id + 1) & 0xFFFF
+            if net_id not in self.prev and net_id not in current:
+                return net_id
+
+    def encode_keyframe(self, current, hud):
+        parts = [FRAME_HEAD.pack(self.frame_no), HUD.pack(*hud), COUNT.pack(len(current))]
+        parts.extend(ENTITY.pack(net_id, code, x, y) for net_id, (code, x, y) in current.items())
+        return pack_message(MSG_KEYFRAME, b"".join(parts))
+
+    def encode_delta(self, current, hud):
+        prev = self.prev
+        removed = [net_id for net_id in prev if net_id not in current]
+        full = []
+        moved = []
+        for net_id, state in current.items():
+            old = prev.get(net_id)
+            if old == state:
+                continue
+            code, x, y = state
+            if old is not None:
+                dx, dy = x - old[1], y - old[2]
+                if -128 <= dx <= 127 and -128 <= dy <= 127:
+                    moved.append(MOVED.pack(net_id, dx, dy, code))
+                    continue
+            full.append(ENTITY.pack(net_id, code, x, y))
+
+        parts = [FRAME_HEAD.pack(self.frame_no)]
+        if hud != self.prev_hud:
+            parts += [b"\x01", HUD.pack(*hud)]
+        else:
+            parts.append(b"\x00")
+        parts.append(COUNT.pack(len(removed)))
+        parts.extend(NET_ID.pack(net_id) for net_id in removed)
+        parts.append(COUNT.pack(len(full)))
+        parts.extend(full)
+        parts.append(COUNT.pack(len(moved)))
+        parts.extend(moved)
+        return pack_message(MSG_DELTA, b"".join(parts))
+
+    def send(self, message):
+        for client in self.clients[:]:
+            client.backlog += message
+            try:
+                sent = client.sock.send(client.backlog)
+                del client.backlog[:sent]
+                self.bytes_sent += sent
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self.drop(client)
+                continue
+            if len(client.backlog) > MAX_CLIENT_BACKLOG:
+                self.drop(client)  # Too slow to keep up; it can reconnect
+
+    def drop(self, client):
+        self.clients.remove(client)
+        client.sock.close()
+
+    def close(self):
+        for client in self.clients[:]:
+            self.drop(client)
+        self.server.close()
+
+
+# === CLIENT ===
+class SpectatorClient:
+    def __init__(self, host=SPECTATOR_HOST, port=SPECTATOR_PORT):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setblocking(False)
+        self.buffer = bytearray()
+        self.config = None
+        self.entities = {}      # net id -> (sprite code, x, y)
+        self.hud = None
+        self.frame_no = 0
+        self.synced = False     # Deltas are ignored until the first keyframe
+        self.connected = True
+        self.bytes_received = 0
+
+    def poll(self, timeout=0.0):
+        # Reads whatever has arrived and applies complete messages
+        readable, _, _ = select.select([self.sock], [], [], timeout)
+        if not readable:
+            return 0
+        try:
+            data = self.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return 0
+        if not data:
+            self.connected = False
+            return 0
+        self.bytes_received += len(data)
+        self.buffer += data
+
+        applied = 0
+        while len(self.buffer) >= HEADER.size:
+            length, msg_type = HEADER.unpack_from(self.buffer)
+            end = 4 + length
+            if len(self.buffer) < end:
+                break
+            self.apply(msg_type, memoryview(self.buffer)[HEADER.size:end])
+            del self.buffer[:end]
+            applied += 1
+        return applied
+
+    def apply(self, msg_type, body):
+        if msg_type == MSG_HELLO:
+            (game_w, game_h, panel_h, frame_w, frame_h, scale,
+             max_health, max_eggs, golden_required) = HELLO.unpack_from(body)
+            self.config = {
+                "game_width": game_w, "game_height": game_h, "panel_height": panel_h,
+                "frame_width": frame_w, "frame_height": frame_h, "scale": scale,
+                "max_health": max_health, "max_eggs": max_eggs, "golden_required": golden_required,
+            }
+            return
+
+        (self.frame_no,) = FRAME_HEAD.unpack_from(body)
+        offset = FRAME_HEAD.size
+        if msg_type == MSG_KEYFRAME:
+            self.hud = HUD.unpack_from(body, offset)
+            offset += HUD.size
+            (count,) = COUNT.unpack_from(body, offset)
+            offset += COUNT.size
+            self.entities = {}
+            for _ in range(count):
+                net_id, code, x, y = ENTITY.unpack_from(body, offset)
+                offset += ENTITY.size
+                self.entities[net_id] = (code, x, y)
+            self.synced = True
+            return
+
+        if not self.synced:
+            return
+        has_hud = body[offset]
+        offset += 1
+        if has_hud:
+            self.hud = HUD.unpack_from(body, offset)
+            offset += HUD.size
+        (count,) = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            (net_id,) = NET_ID.unpack_from(body, offset)
+            offset += NET_ID.size
+            self.entities.pop(net_id, None)
+        (count,) = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            net_id, code, x, y = ENTITY.unpack_from(body, offset)
+            offset += ENTITY.size
+            self.entities[net_id] = (code, x, y)
+        (count,) = COUNT.unpack_from(body, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            net_id, dx, dy, code = MOVED.unpack_from(body, offset)
+            offset += MOVED.size
+            _, x, y = self.entities[net_id]
+            self.entities[net_id] = (code, x + dx, y + dy)
+
+    def close(self):
+        self.sock.close()
+
+
+# === VIEWER ===
+VIEWER_SCALE = 2
+
+def load_sprite_sets(pygame, config):
+    fw, fh, scale = config["frame_width"], config["frame_height"], config["scale"]
+    sheets = {}
+    sets = []
+    for name, image, row, count, mult, tint in SPRITE_SETS:
+        if image not in sheets:
+            sheets[image] = pygame.image.load(image).convert_alpha()
+        frames = []
+        for i in range(count):
+            frame = pygame.transform.scale(
+                sheets[image].subsurface((i * fw, row * fh, fw, fh)),
+                (fw * scale * mult, fh * scale * mult)
+            )
+            if tint is not None:
+                frame.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+            frames.append(frame)
+        sets.append(frames)
+    return sets
+
+def run_viewer(host=SPECTATOR_HOST, port=SPECTATOR_PORT):
+    import pygame
+
+    client = SpectatorClient(host, port)
+    while client.config is None:
+        client.poll(1.0)
+        if not client.connected:
+            return
+    config = client.config
+    game_w, game_h = config["game_width"], config["game_height"]
+    panel_y = game_h - config["panel_height"]
+
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((game_w * VIEWER_SCALE, game_h * VIEWER_SCALE))
+    pygame.display.set_caption(f"Spectating {host}:{port}")
+    font = pygame.font.Font("PressStart2P.ttf", 12)
+    surface = pygame.Surface((game_w, game_h))
+    sets = load_sprite_sets(pygame, config)
+
+    fw, fh, scale = config["frame_width"], config["frame_height"], config["scale"]
+    heart_sheet = pygame.image.load("heart.png").convert_alpha()
+    hearts = [pygame.transform.scale(heart_sheet.subsurface((0, row * fh, fw, fh)), (fw * scale, fh * scale))
+              for row in (0, 1)]
+    meter_sheet = pygame.image.load("meter.png").convert_alpha()
+    meter = [pygame.transform.scale(meter_sheet.subsurface((i * fw, 0, fw, fh)), (fw * scale, fh * scale))
+             for i in range(4)]
+
+    clock = pygame.time.Clock()
+    while client.connected:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                client.close()
+                return
+        while client.poll():
+            pass
+
+        surface.fill((32, 32, 40))
+        if client.hud is not None and client.hud[5] & HUD_GAME_OVER:
+            msg = font.render("GAME OVER", False, (255, 60, 60))
+            surface.blit(msg, (game_w // 2 - msg.get_width() // 2, game_h // 2 - msg.get_height() // 2))
+        else:
+            sprites = sorted(client.entities.values(), key=lambda e: e[2])
+            surface.blits([(sets[code >> 4][code & 15], (x, y)) for code, x, y in sprites], doreturn=False)
+
+            surface.fill((48, 48, 64), (0, panel_y, game_w, config["panel_height"]))
+            if client.hud is not None:
+                score, highscore, eggs, health, golden_power, flags = client.hud
+                if flags & HUD_GOOSE_WARNING or flags & HUD_CRAB_WARNING:
+                    warning = font.render("GOOSE!" if flags & HUD_GOOSE_WARNING else "CRAB!", False, (255, 255, 0))
+                    surface.blit(warning, (game_w // 2 - warning.get_width() // 2, 110))
+                lines = [
+                    (f"Score: {score}", (255, 255, 255)),
+                    (f"High Score: {highscore}", (255, 255, 100)),
+                    (f"Eggs: {eggs} / {config['max_eggs']}", (255, 255, 0)),
+                    (f"Difficulty: {score // 5}", (180, 180, 255)),
+                ]
+                for i, (text, color) in enumerate(lines):
+                    surface.blit(font.render(text, False, color), (2, panel_y + 2 + i * 14))
+                for i in range(config["max_health"]):
+                    surface.blit(hearts[0 if i < health else 1], (200 + i * (hearts[0].get_width() + 4), panel_y + 10))
+                surface.blit(meter[min(golden_power, len(meter) - 1)], (game_w - 96, panel_y + 8))
+
+        pygame.transform.scale(surface, screen.get_size(), screen)
+        pygame.display.flip()
+        clock.tick(60)
+    client.close()
+
+if __name__ == "__main__":
+    host = sys.argv[1] if len(sys.argv) > 1 else SPECTATOR_HOST
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else SPECTATOR_PORT
+    run_viewer(host, port)
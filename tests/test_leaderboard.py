@@ -0,0 +1,132 @@
+"""Client and stand-in server of leaderboard.py, talking over localhost.
+
+Run from the repository root: python -m pytest tests (or python -m unittest
+discover tests).
+"""
+import http.client
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+import leaderboard
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+def run(score):
+    return {"cabinet": "test", "score": score, "seconds": 1.0, "reason": "game_over", "time": 0, "bot": False}
+
+class LeaderboardTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.outbox_path = os.path.join(self.directory.name, "outbox.ndjson")
+        self.saved = (leaderboard.RETRY_MIN, leaderboard.RETRY_MAX)
+        leaderboard.RETRY_MIN, leaderboard.RETRY_MAX = 0.05, 0.2
+        self.server = None
+
+    def tearDown(self):
+        leaderboard.RETRY_MIN, leaderboard.RETRY_MAX = self.saved
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.directory.cleanup()
+
+    def start_server(self, server):
+        self.server = server
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def outbox_lines(self):
+        try:
+            with open(self.outbox_path) as f:
+                return sum(1 for _ in f)
+        except FileNotFoundError:
+            return 0
+
+    def test_queued_runs_go_up_in_batches_once_the_server_is_up(self):
+        # A free port with nothing listening on it yet
+        probe = leaderboard.make_server("127.0.0.1", 0)
+        port = probe.server_address[1]
+        probe.server_close()
+
+        client = leaderboard.LeaderboardClient(f"http://127.0.0.1:{port}", self.outbox_path)
+        count = leaderboard.BATCH_SIZE * 2 + 20
+        for score in range(1, count + 1):
+            client.submit(run(score))
+        self.assertTrue(wait_for(lambda: self.outbox_lines() == count and client.failures > 0))
+        self.assertEqual(client.queued, count)
+        self.assertEqual(client.sent, 0)
+
+        server = leaderboard.make_server("127.0.0.1", port)
+        store = server.RequestHandlerClass.store
+        batches = []  # (runs in the batch, outbox lines when it arrived)
+        add = store.add
+        def recording_add(runs):
+            batches.append((len(runs), self.outbox_lines()))
+            return add(runs)
+        store.add = recording_add
+        connections = []
+        process_request = server.process_request
+        def counting_process_request(request, address):
+            connections.append(address)
+            process_request(request, address)
+        server.process_request = counting_process_request
+        self.start_server(server)
+
+        self.assertTrue(wait_for(lambda: client.queued == 0))
+        client.close()
+        self.assertEqual(client.sent, count)
+        self.assertEqual(len(store.runs), count)
+        self.assertEqual([size for size, _ in batches], [leaderboard.BATCH_SIZE, leaderboard.BATCH_SIZE, 20])
+        # Each batch is cut from the file once the server has taken it
+        self.assertEqual([lines for _, lines in batches], [count, count - leaderboard.BATCH_SIZE, 20])
+        self.assertEqual(self.outbox_lines(), 0)
+        # The batches and the top list fetch share one connection
+        self.assertEqual(len(connections), 1)
+        self.assertEqual(client.top[0], ("test", count))
+
+    def test_a_resent_run_is_only_accepted_once(self):
+        server = self.start_server(leaderboard.make_server("127.0.0.1", 0))
+        host, port = server.server_address
+        body = json.dumps({"runs": [dict(run(10), id="same"), dict(run(20), id="other")]})
+        accepted = []
+        for _ in range(2):
+            connection = http.client.HTTPConnection(host, port, timeout=5)
+            connection.request("POST", "/scores", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            accepted.append(json.loads(response.read())["accepted"])
+            connection.close()
+        self.assertEqual(accepted, [2, 0])
+        self.assertEqual(len(server.RequestHandlerClass.store.runs), 2)
+
+    def test_close_does_not_wait_on_a_server_that_never_answers(self):
+        # Takes connections into its backlog but never replies
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        try:
+            client = leaderboard.LeaderboardClient(f"http://127.0.0.1:{listener.getsockname()[1]}",
+                                                   self.outbox_path)
+            client.submit(run(5))
+            client.submit(run(6))
+            started = time.monotonic()
+            client.close(timeout=0.5)
+            self.assertLess(time.monotonic() - started, 2.0)
+            # Both runs wait in the outbox for the next start
+            with open(self.outbox_path) as f:
+                self.assertEqual(sorted(json.loads(line)["score"] for line in f), [5, 6])
+        finally:
+            listener.close()
+
+if __name__ == "__main__":
+    unittest.main()